@@ -8,6 +8,7 @@ import os
 from pathlib import Path
 from datetime import timedelta
 from decouple import config
+from django.core.exceptions import ImproperlyConfigured
 import dj_database_url
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -88,7 +89,10 @@ if config('DATABASE_URL', default=''):
     DATABASES = {
         'default': dj_database_url.config(
             default=config('DATABASE_URL'),
-            conn_max_age=600,
+            # Con ASGI cada vista síncrona corre en un hilo distinto: las conexiones
+            # persistentes no se reutilizan y se acumulan hasta agotar las de Postgres.
+            # Solo tiene sentido subirlo con un pooler (pgbouncer) delante.
+            conn_max_age=config('DB_CONN_MAX_AGE', default=0, cast=int),
             conn_health_checks=True,
         )
     }
@@ -180,6 +184,39 @@ SIMPLE_JWT = {
     'AUTH_HEADER_TYPES': ('Bearer',),
 }
 
+# Mantenimiento del mercado (rotación de agentes libres y ofertas automáticas)
+MERCADO_INTERVALO_MANTENIMIENTO = config('MERCADO_INTERVALO_MANTENIMIENTO', default=300, cast=int)
+
+# Flujo de eventos en tiempo real (SSE, servido con ASGI: backend.asgi:application).
+# BrokerLocal vive en el proceso: gunicorn.conf.py fija un único worker. Para escalar a
+# varios hay que cambiar EVENTOS_BROKER por uno compartido (Redis pub/sub, LISTEN/NOTIFY)
+EVENTOS_BROKER = config('EVENTOS_BROKER', default='fantasy.eventos.BrokerLocal')
+EVENTOS_LATIDO_SEGUNDOS = config('EVENTOS_LATIDO_SEGUNDOS', default=15, cast=int)
+
+# Caché compartida entre procesos (contadores de notificaciones, lote diario del mercado).
+# Sin REDIS_URL se usa la caché en memoria de cada proceso (requiere el paquete redis si se activa)
+REDIS_URL = config('REDIS_URL', default='')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+
+# Contadores de no leídas en caché. Sin caché compartida cada proceso tendría los suyos,
+# así que solo se activan con REDIS_URL; desactivados, se cuenta en la BD en cada lectura
+NOTIFICACIONES_CONTADORES = config('NOTIFICACIONES_CONTADORES', default=bool(REDIS_URL), cast=bool)
+if NOTIFICACIONES_CONTADORES and not REDIS_URL:
+    raise ImproperlyConfigured('NOTIFICACIONES_CONTADORES requiere una caché compartida (REDIS_URL)')
+
+# Segundos que vive un contador de no leídas antes de recalcularse desde la BD
+NOTIFICACIONES_CONTADOR_TTL = config('NOTIFICACIONES_CONTADOR_TTL', default=300, cast=int)
+
+# Retención de notificaciones (comando archivar_notificaciones)
+NOTIFICACIONES_RETENCION_DIAS = config('NOTIFICACIONES_RETENCION_DIAS', default=90, cast=int)
+NOTIFICACIONES_MAXIMO_POR_USUARIO = config('NOTIFICACIONES_MAXIMO_POR_USUARIO', default=200, cast=int)
+
 # Cookie settings for JWT
 SESSION_COOKIE_HTTPONLY = True
 SESSION_COOKIE_SECURE = config('COOKIE_SECURE', default=False, cast=bool)
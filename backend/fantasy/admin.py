@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Liga, Jugador, Equipo, Jornada, Puntuacion, EquipoReal, Partido
+from .models import Liga, Jugador, Equipo, Jornada, Puntuacion, EquipoReal, Partido, ClasificacionEquipo
 
 @admin.register(Liga)
 class LigaAdmin(admin.ModelAdmin):
@@ -21,6 +21,13 @@ class EquipoAdmin(admin.ModelAdmin):
         return obj.jugadores.count()
     total_jugadores.short_description = 'Jugadores'
     
+@admin.register(ClasificacionEquipo)
+class ClasificacionEquipoAdmin(admin.ModelAdmin):
+    list_display = ('posicion', 'equipo', 'liga', 'puntos_totales', 'ultima_jornada', 'fecha_actualizacion')
+    list_filter = ('liga',)
+    search_fields = ('equipo__nombre',)
+    ordering = ('liga', 'posicion')
+
 @admin.register(Puntuacion)
 class PuntuacionAdmin(admin.ModelAdmin):
     list_display = ('jugador', 'jornada', 'puntos')
@@ -42,7 +49,7 @@ class PartidoAdmin(admin.ModelAdmin):
 
 @admin.register(Jornada)
 class JornadaAdmin(admin.ModelAdmin):
-    list_display = ('numero', 'fecha', 'total_partidos')
+    list_display = ('numero', 'fecha', 'fecha_inicio', 'alineaciones_congeladas', 'total_partidos')
     search_fields = ('numero',)  
     
     def total_partidos(self, obj):
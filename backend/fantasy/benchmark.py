@@ -0,0 +1,118 @@
+"""
+Benchmark de los endpoints de lectura más usados.
+
+Genera un mundo sintético a la escala pedida, llama a cada endpoint varias
+veces con un usuario con equipo y registra el tiempo (mediana y mínimo) y el
+número de consultas SQL. Cada endpoint tiene un presupuesto de consultas que
+no debe depender del tamaño de los datos: si se supera, el benchmark falla.
+
+Se usa desde los tests (marcador benchmark) y desde el comando
+benchmark_endpoints, que además guarda el informe en JSON para comparar
+entre commits.
+"""
+import json
+import platform
+import statistics
+import subprocess
+import time
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from .models import Equipo
+from .sintetico import generar_mundo
+
+PREFIJO = 'bench'
+
+ESCALAS = {
+    'pequena': dict(ligas=1, equipos=20, equipos_reales=8, jugadores_libres=100, jornadas=5,
+                    pujas=50, ofertas=50, notificaciones=200),
+    'mediana': dict(ligas=4, equipos=200, equipos_reales=12, jugadores_libres=1000, jornadas=10,
+                    pujas=500, ofertas=500, notificaciones=5000),
+    'grande': dict(ligas=20, equipos=2000, equipos_reales=16, jugadores_libres=10000, jornadas=20,
+                   pujas=5000, ofertas=5000, notificaciones=50000),
+}
+
+# nombre -> (función que construye la URL a partir del equipo, presupuesto de consultas)
+ENDPOINTS = {
+    'mercado': (lambda equipo: f'/api/mercado/?liga_id={equipo.liga_id}', 8),
+    'clasificacion': (lambda equipo: f'/api/clasificacion/?liga_id={equipo.liga_id}', 4),
+    'datos_iniciales': (lambda equipo: '/api/datos-iniciales/', 18),
+    'plantilla_equipo': (lambda equipo: f'/api/equipos/{equipo.id}/plantilla/', 6),
+    'listar_notificaciones': (lambda equipo: '/api/notificaciones/usuario/', 4),
+    'goleadores': (lambda equipo: '/api/goleadores/', 3),
+    'clasificacion_equipos_reales': (lambda equipo: '/api/clasificacion-equipos-reales/', 4),
+}
+
+def preparar_datos(escala='pequena', semilla=42):
+    """Genera el mundo de la escala indicada y devuelve el equipo con el que se mide"""
+    generar_mundo(prefijo=PREFIJO, semilla=semilla, **ESCALAS[escala])
+    return Equipo.objects.select_related('usuario').filter(usuario__username__startswith=f'{PREFIJO}_').order_by('id').first()
+
+def medir_endpoint(cliente, url, repeticiones=5):
+    """Llama `repeticiones` veces a la URL y devuelve tiempos y consultas"""
+    tiempos, consultas, estado = [], 0, None
+    for _ in range(repeticiones):
+        with CaptureQueriesContext(connection) as capturadas:
+            inicio = time.perf_counter()
+            respuesta = cliente.get(url)
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        consultas = max(consultas, len(capturadas.captured_queries))
+        estado = respuesta.status_code
+    return {
+        'url': url,
+        'status': estado,
+        'consultas': consultas,
+        'ms_mediana': round(statistics.median(tiempos), 2),
+        'ms_minimo': round(min(tiempos), 2),
+    }
+
+def medir_endpoints(equipo, repeticiones=5, nombres=None):
+    """Mide los endpoints indicados (todos por defecto) con el usuario del equipo"""
+    cliente = APIClient()
+    cliente.force_authenticate(user=equipo.usuario)
+    resultados = {}
+    for nombre, (construir_url, presupuesto) in ENDPOINTS.items():
+        if nombres and nombre not in nombres:
+            continue
+        resultado = medir_endpoint(cliente, construir_url(equipo), repeticiones)
+        resultado['presupuesto_consultas'] = presupuesto
+        resultado['dentro_presupuesto'] = resultado['consultas'] <= presupuesto
+        resultados[nombre] = resultado
+    return resultados
+
+def incumplimientos(resultados):
+    """Mensajes de los endpoints que fallan o superan su presupuesto de consultas"""
+    mensajes = []
+    for nombre, resultado in resultados.items():
+        if resultado['status'] != 200:
+            mensajes.append(f"{nombre}: respuesta {resultado['status']}")
+        if not resultado['dentro_presupuesto']:
+            mensajes.append(
+                f"{nombre}: {resultado['consultas']} consultas (presupuesto {resultado['presupuesto_consultas']})"
+            )
+    return mensajes
+
+def _commit_actual():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def construir_informe(escala, repeticiones, resultados):
+    return {
+        'fecha': timezone.now().isoformat(),
+        'commit': _commit_actual(),
+        'base_de_datos': connection.vendor,
+        'python': platform.python_version(),
+        'escala': escala,
+        'parametros': ESCALAS[escala],
+        'repeticiones': repeticiones,
+        'endpoints': resultados,
+    }
+
+def guardar_informe(informe, ruta):
+    with open(ruta, 'w', encoding='utf-8') as fichero:
+        json.dump(informe, fichero, indent=2, ensure_ascii=False)
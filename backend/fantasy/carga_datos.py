@@ -0,0 +1,379 @@
+"""
+Carga masiva de datos (equipos reales, jugadores, partidos y puntuaciones)
+desde ficheros CSV, JSON o JSON Lines.
+
+Los ficheros se leen en streaming (también los .json, que se decodifican
+elemento a elemento) y se procesan por lotes: cada lote hace una lectura de lo
+que ya existe y un bulk_create/bulk_update. Los totales de los jugadores se
+acumulan en memoria como diferencias respecto a lo ya guardado y se escriben en
+la misma transacción que cada lote de puntuaciones, así que una carga
+interrumpida deja puntuaciones, totales y clasificación coherentes hasta el
+último lote confirmado, y volver a cargar el mismo fichero no duplica nada.
+
+Columnas esperadas por entidad:
+    equipos_reales: nombre
+    jugadores:      nombre, posicion, equipo_real, [valor]
+    partidos:       jornada, local, visitante, [goles_local, goles_visitante, fecha, jugado]
+    puntuaciones:   jugador, equipo_real, jornada, puntos, [goles]
+"""
+import csv
+import json
+import re
+import time
+from itertools import islice
+from pathlib import Path
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from .models import EquipoReal, Jugador, Jornada, Partido, Puntuacion, ClasificacionEquipo
+from .precios import calcular_valor
+
+TAMANO_LOTE = 2000
+ENTIDADES = ('equipos_reales', 'jugadores', 'partidos', 'puntuaciones')
+EXTENSIONES = ('.csv', '.jsonl', '.json')
+POSICIONES_VALIDAS = {codigo for codigo, _ in Jugador.POSICIONES}
+VALORES_VERDADEROS = {'1', 'true', 'si', 'sí', 'yes'}
+TAMANO_BLOQUE_JSON = 1 << 16
+ESPACIOS_JSON = re.compile(r'[ \t\n\r]*')
+
+def elementos_json(fichero, tamano_bloque=TAMANO_BLOQUE_JSON):
+    """Genera los elementos de un array JSON leyendo el fichero por bloques, sin cargarlo entero"""
+    decodificador = json.JSONDecoder()
+    buffer, posicion, fin_fichero = '', 0, False
+
+    def rellenar():
+        nonlocal buffer, posicion, fin_fichero
+        datos = fichero.read(tamano_bloque)
+        fin_fichero = not datos
+        buffer, posicion = buffer[posicion:] + datos, 0
+
+    def siguiente_caracter():
+        nonlocal posicion
+        while True:
+            posicion = ESPACIOS_JSON.match(buffer, posicion).end()
+            if posicion < len(buffer) or fin_fichero:
+                return buffer[posicion:posicion + 1]
+            rellenar()
+
+    if siguiente_caracter() != '[':
+        raise ValueError('El fichero JSON debe contener un array de objetos')
+    posicion += 1
+    primero = True
+    while True:
+        caracter = siguiente_caracter()
+        if caracter == ']':
+            return
+        if not primero:
+            if caracter != ',':
+                raise ValueError('JSON mal formado: array sin cerrar o elementos sin separar')
+            posicion += 1
+            siguiente_caracter()
+        while True:
+            try:
+                elemento, fin = decodificador.raw_decode(buffer, posicion)
+                # Un elemento que acaba justo en el borde del bloque puede estar cortado (p. ej. un número)
+                if fin < len(buffer) or fin_fichero:
+                    break
+            except json.JSONDecodeError:
+                if fin_fichero:
+                    raise
+            rellenar()
+        posicion = fin
+        primero = False
+        yield elemento
+
+def leer_filas(ruta):
+    """Genera (número de fila, dict) leyendo el fichero según su extensión"""
+    ruta = Path(ruta)
+    if ruta.suffix == '.csv':
+        with ruta.open(newline='', encoding='utf-8') as fichero:
+            yield from enumerate(csv.DictReader(fichero), start=2)
+    elif ruta.suffix == '.jsonl':
+        with ruta.open(encoding='utf-8') as fichero:
+            for numero, linea in enumerate(fichero, start=1):
+                if linea.strip():
+                    yield numero, json.loads(linea)
+    elif ruta.suffix == '.json':
+        with ruta.open(encoding='utf-8') as fichero:
+            yield from enumerate(elementos_json(fichero), start=1)
+    else:
+        raise ValueError(f'Formato no soportado: {ruta.name} (usa {", ".join(EXTENSIONES)})')
+
+def en_lotes(filas, tamano):
+    """Agrupa un iterable en listas de como máximo `tamano` elementos"""
+    filas = iter(filas)
+    while True:
+        lote = list(islice(filas, tamano))
+        if not lote:
+            return
+        yield lote
+
+def buscar_ficheros(directorio):
+    """Devuelve {entidad: ruta} con los ficheros <entidad>.csv/.jsonl/.json del directorio"""
+    directorio = Path(directorio)
+    ficheros = {}
+    for entidad in ENTIDADES:
+        for extension in EXTENSIONES:
+            ruta = directorio / f'{entidad}{extension}'
+            if ruta.exists():
+                ficheros[entidad] = ruta
+                break
+    return ficheros
+
+def _texto(fila, numero, campo):
+    valor = fila.get(campo)
+    if isinstance(valor, str):
+        valor = valor.strip()
+    if valor in (None, ''):
+        raise ValueError(f'Fila {numero}: falta "{campo}"')
+    return str(valor)
+
+def _entero(fila, numero, campo, defecto=None):
+    valor = fila.get(campo)
+    if valor in (None, ''):
+        if defecto is None:
+            raise ValueError(f'Fila {numero}: falta "{campo}"')
+        return defecto
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        raise ValueError(f'Fila {numero}: "{campo}" debe ser un entero ({valor!r})')
+
+def _booleano(valor):
+    if isinstance(valor, bool):
+        return valor
+    return str(valor or '').strip().lower() in VALORES_VERDADEROS
+
+class CargadorDatos:
+    """
+    Mantiene en memoria los índices (nombre → id) de lo cargado para no repetir
+    consultas entre lotes y entidades.
+    """
+
+    def __init__(self, tamano_lote=TAMANO_LOTE):
+        self.tamano_lote = tamano_lote
+        self.equipos_reales = dict(EquipoReal.objects.values_list('nombre', 'id'))
+        self.jornadas = dict(Jornada.objects.values_list('numero', 'id'))
+        self.jugadores = None
+        # jugador_id -> [puntos_totales, goles, equipo_id] de los jugadores con puntuaciones cargadas
+        self.totales = {}
+
+    def _cargar_indice_jugadores(self):
+        if self.jugadores is None:
+            self.jugadores = {
+                (nombre, equipo_real_id): jugador_id
+                for jugador_id, nombre, equipo_real_id in Jugador.objects.values_list('id', 'nombre', 'equipo_real_id')
+            }
+        return self.jugadores
+
+    def _asegurar_equipos_reales(self, nombres):
+        nuevos = set(nombres) - set(self.equipos_reales)
+        if not nuevos:
+            return 0
+        EquipoReal.objects.bulk_create([EquipoReal(nombre=nombre) for nombre in nuevos], ignore_conflicts=True)
+        self.equipos_reales.update(EquipoReal.objects.filter(nombre__in=nuevos).values_list('nombre', 'id'))
+        return len(nuevos)
+
+    def _asegurar_jornadas(self, numeros):
+        nuevas = set(numeros) - set(self.jornadas)
+        if not nuevas:
+            return
+        Jornada.objects.bulk_create([Jornada(numero=numero) for numero in nuevas], ignore_conflicts=True)
+        self.jornadas.update(Jornada.objects.filter(numero__in=nuevas).values_list('numero', 'id'))
+
+    def cargar_equipos_reales(self, filas):
+        informe = {'creados': 0, 'actualizados': 0}
+        for lote in en_lotes(filas, self.tamano_lote):
+            with transaction.atomic():
+                informe['creados'] += self._asegurar_equipos_reales(_texto(fila, numero, 'nombre') for numero, fila in lote)
+        return informe
+
+    def cargar_jugadores(self, filas):
+        indice = self._cargar_indice_jugadores()
+        informe = {'creados': 0, 'actualizados': 0}
+        for lote in en_lotes(filas, self.tamano_lote):
+            datos = {}
+            for numero, fila in lote:
+                posicion = _texto(fila, numero, 'posicion').upper()
+                if posicion not in POSICIONES_VALIDAS:
+                    raise ValueError(f'Fila {numero}: posición no válida ({posicion})')
+                # Sin columna valor: None, para no pisar el valor de los jugadores ya cargados
+                valor = fila.get('valor')
+                datos[(_texto(fila, numero, 'nombre'), _texto(fila, numero, 'equipo_real'))] = (
+                    posicion, None if valor in (None, '') else _entero(fila, numero, 'valor')
+                )
+
+            with transaction.atomic():
+                self._asegurar_equipos_reales(equipo for _, equipo in datos)
+                nuevos, con_valor, sin_valor = [], [], []
+                for (nombre, equipo), (posicion, valor) in datos.items():
+                    clave = (nombre, self.equipos_reales[equipo])
+                    jugador = Jugador(nombre=nombre, posicion=posicion, valor=valor, equipo_real_id=clave[1])
+                    if clave in indice:
+                        jugador.id = indice[clave]
+                        (sin_valor if valor is None else con_valor).append(jugador)
+                    else:
+                        if valor is None:
+                            jugador.valor = calcular_valor(0)
+                        nuevos.append(jugador)
+
+                # bulk_create no dispara señales: los jugadores nuevos son libres y no afectan a la clasificación
+                Jugador.objects.bulk_create(nuevos)
+                Jugador.objects.bulk_update(con_valor, ['posicion', 'valor'])
+                Jugador.objects.bulk_update(sin_valor, ['posicion'])
+
+            for jugador in nuevos:
+                indice[(jugador.nombre, jugador.equipo_real_id)] = jugador.id
+            informe['creados'] += len(nuevos)
+            informe['actualizados'] += len(con_valor) + len(sin_valor)
+        return informe
+
+    def cargar_partidos(self, filas):
+        informe = {'creados': 0, 'actualizados': 0}
+        ahora = timezone.now()
+        for lote in en_lotes(filas, self.tamano_lote):
+            datos = {}
+            for numero, fila in lote:
+                fecha = parse_datetime(fila['fecha']) if fila.get('fecha') else None
+                datos[(_entero(fila, numero, 'jornada'), _texto(fila, numero, 'local'), _texto(fila, numero, 'visitante'))] = {
+                    'goles_local': _entero(fila, numero, 'goles_local', defecto=0),
+                    'goles_visitante': _entero(fila, numero, 'goles_visitante', defecto=0),
+                    'jugado': _booleano(fila.get('jugado')),
+                    'fecha': fecha or ahora,
+                }
+
+            with transaction.atomic():
+                self._asegurar_jornadas(jornada for jornada, _, _ in datos)
+                self._asegurar_equipos_reales(equipo for clave in datos for equipo in clave[1:])
+                claves = {
+                    (self.jornadas[jornada], self.equipos_reales[local], self.equipos_reales[visitante]): campos
+                    for (jornada, local, visitante), campos in datos.items()
+                }
+                existentes = {
+                    (partido.jornada_id, partido.equipo_local_id, partido.equipo_visitante_id): partido
+                    for partido in Partido.objects.filter(jornada_id__in={clave[0] for clave in claves})
+                }
+
+                nuevos, modificados = [], []
+                for clave, campos in claves.items():
+                    partido = existentes.get(clave)
+                    if partido is None:
+                        partido = Partido(jornada_id=clave[0], equipo_local_id=clave[1], equipo_visitante_id=clave[2])
+                        nuevos.append(partido)
+                    else:
+                        modificados.append(partido)
+                    for campo, valor in campos.items():
+                        setattr(partido, campo, valor)
+
+                Partido.objects.bulk_create(nuevos)
+                Partido.objects.bulk_update(modificados, ['goles_local', 'goles_visitante', 'jugado', 'fecha'])
+
+            informe['creados'] += len(nuevos)
+            informe['actualizados'] += len(modificados)
+        return informe
+
+    def cargar_puntuaciones(self, filas):
+        indice = self._cargar_indice_jugadores()
+        informe = {'creados': 0, 'actualizados': 0}
+        for lote in en_lotes(filas, self.tamano_lote):
+            datos = {}
+            for numero, fila in lote:
+                clave_jugador = (_texto(fila, numero, 'jugador'), _texto(fila, numero, 'equipo_real'))
+                jugador_id = indice.get((clave_jugador[0], self.equipos_reales.get(clave_jugador[1])))
+                if jugador_id is None:
+                    raise ValueError(f'Fila {numero}: jugador desconocido {clave_jugador[0]} ({clave_jugador[1]})')
+                datos[(jugador_id, _entero(fila, numero, 'jornada'))] = (
+                    _entero(fila, numero, 'puntos'), _entero(fila, numero, 'goles', defecto=0)
+                )
+
+            with transaction.atomic():
+                self._asegurar_jornadas(jornada for _, jornada in datos)
+                jugador_ids = {jugador_id for jugador_id, _ in datos}
+                self._cargar_totales(jugador_ids - set(self.totales))
+
+                anteriores = {
+                    (jugador_id, jornada_id): (puntos, goles)
+                    for jugador_id, jornada_id, puntos, goles in Puntuacion.objects.filter(
+                        jugador_id__in=jugador_ids, jornada_id__in={self.jornadas[j] for _, j in datos}
+                    ).values_list('jugador_id', 'jornada_id', 'puntos', 'goles')
+                }
+
+                puntuaciones = []
+                for (jugador_id, jornada), (puntos, goles) in datos.items():
+                    jornada_id = self.jornadas[jornada]
+                    puntos_anteriores, goles_anteriores = anteriores.get((jugador_id, jornada_id), (0, 0))
+                    totales = self.totales[jugador_id]
+                    totales[0] += puntos - puntos_anteriores
+                    totales[1] += goles - goles_anteriores
+                    puntuaciones.append(Puntuacion(jugador_id=jugador_id, jornada_id=jornada_id, puntos=puntos, goles=goles))
+
+                Puntuacion.objects.bulk_create(
+                    puntuaciones,
+                    update_conflicts=True,
+                    unique_fields=['jugador', 'jornada'],
+                    update_fields=['puntos', 'goles']
+                )
+                # Los totales del lote se confirman junto con sus puntuaciones
+                self.guardar_totales(jugador_ids)
+
+            actualizados = sum(1 for clave in datos if (clave[0], self.jornadas[clave[1]]) in anteriores)
+            informe['creados'] += len(datos) - actualizados
+            informe['actualizados'] += actualizados
+        return informe
+
+    def _cargar_totales(self, jugador_ids):
+        for jugador_id, puntos, goles, equipo_id in Jugador.objects.filter(id__in=jugador_ids).values_list(
+            'id', 'puntos_totales', 'goles', 'equipo_id'
+        ):
+            self.totales[jugador_id] = [puntos, goles, equipo_id]
+
+    def guardar_totales(self, jugador_ids=None):
+        """Escribe los totales acumulados de `jugador_ids` (por defecto, todos) y actualiza la clasificación"""
+        totales = self.totales if jugador_ids is None else {jugador_id: self.totales[jugador_id] for jugador_id in jugador_ids}
+        jugadores = [
+            Jugador(id=jugador_id, puntos_totales=puntos, goles=goles, valor=calcular_valor(puntos))
+            for jugador_id, (puntos, goles, _) in totales.items()
+        ]
+        with transaction.atomic():
+            Jugador.objects.bulk_update(jugadores, ['puntos_totales', 'goles', 'valor'], batch_size=self.tamano_lote)
+            # bulk_update no dispara señales
+            ClasificacionEquipo.actualizar_equipos(equipo_id for _, _, equipo_id in totales.values())
+        return len(jugadores)
+
+def cargar_ficheros(ficheros, tamano_lote=TAMANO_LOTE):
+    """
+    Carga los ficheros indicados ({entidad: ruta}) en el orden de ENTIDADES.
+    Devuelve un informe por entidad con filas, creados, actualizados y filas por segundo.
+    """
+    desconocidas = set(ficheros) - set(ENTIDADES)
+    if desconocidas:
+        raise ValueError(f'Entidades desconocidas: {sorted(desconocidas)}')
+
+    cargador = CargadorDatos(tamano_lote)
+    informe = {}
+    for entidad in ENTIDADES:
+        if entidad not in ficheros:
+            continue
+        inicio = time.monotonic()
+        contador = {'filas': 0}
+
+        def contar(filas):
+            for fila in filas:
+                contador['filas'] += 1
+                yield fila
+
+        resultado = getattr(cargador, f'cargar_{entidad}')(contar(leer_filas(ficheros[entidad])))
+        duracion = time.monotonic() - inicio
+        resultado.update({
+            'filas': contador['filas'],
+            'segundos': round(duracion, 3),
+            'filas_por_segundo': round(contador['filas'] / duracion) if duracion else contador['filas'],
+        })
+        informe[entidad] = resultado
+        print(f"📥 {entidad}: {resultado['filas']} filas en {resultado['segundos']}s "
+              f"({resultado['filas_por_segundo']} filas/s)")
+
+    # Los totales ya se escribieron lote a lote con sus puntuaciones
+    if cargador.totales:
+        informe['jugadores_totalizados'] = len(cargador.totales)
+    return informe
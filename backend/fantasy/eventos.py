@@ -0,0 +1,134 @@
+"""
+Publicación/suscripción de eventos en tiempo real (notificaciones, pujas y traspasos).
+
+Los productores (helpers de notificaciones, pujas y aceptación de ofertas)
+publican con publicar_evento, siempre después del commit para no anunciar
+cambios que luego se deshacen. El endpoint de eventos (SSE, solo con ASGI)
+se suscribe a los canales del usuario y reenvía lo que llega.
+
+Canales:
+    publico          notificaciones públicas
+    mercado          pujas y traspasos
+    usuario:<id>     notificaciones privadas de un usuario
+
+El broker por defecto vive en el proceso (BrokerLocal): basta con un worker
+ASGI y para los tests. Con varios procesos se puede cambiar por otro con la
+misma interfaz (suscribir/desuscribir/publicar) mediante EVENTOS_BROKER.
+"""
+import asyncio
+import itertools
+import json
+import threading
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+TAMANO_COLA = 100
+CANAL_PUBLICO = 'publico'
+CANAL_MERCADO = 'mercado'
+
+def canal_usuario(usuario_id):
+    return f'usuario:{usuario_id}'
+
+class Suscripcion:
+    """Cola asyncio de un cliente conectado, alimentable desde cualquier hilo"""
+
+    def __init__(self, canales, loop=None):
+        self.canales = set(canales)
+        self.loop = loop or asyncio.get_running_loop()
+        self.cola = asyncio.Queue(maxsize=TAMANO_COLA)
+
+    def _encolar(self, evento):
+        if self.cola.full():
+            # Cliente lento: se descarta el evento más antiguo antes que bloquear al productor
+            self.cola.get_nowait()
+        self.cola.put_nowait(evento)
+
+    def entregar(self, evento):
+        self.loop.call_soon_threadsafe(self._encolar, evento)
+
+    async def siguiente(self, timeout=None):
+        return await asyncio.wait_for(self.cola.get(), timeout)
+
+class BrokerLocal:
+    """Broker en memoria del proceso: reparte cada evento a las suscripciones de su canal"""
+
+    def __init__(self):
+        self._suscripciones = set()
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def suscribir(self, canales, loop=None):
+        suscripcion = Suscripcion(canales, loop)
+        with self._lock:
+            self._suscripciones.add(suscripcion)
+        return suscripcion
+
+    def desuscribir(self, suscripcion):
+        with self._lock:
+            self._suscripciones.discard(suscripcion)
+
+    def publicar(self, canal, tipo, datos):
+        evento = {'id': next(self._ids), 'canal': canal, 'tipo': tipo, 'datos': datos}
+        with self._lock:
+            destinatarios = [s for s in self._suscripciones if canal in s.canales]
+        for suscripcion in destinatarios:
+            try:
+                suscripcion.entregar(evento)
+            except RuntimeError:
+                # El bucle del cliente ya se cerró
+                self.desuscribir(suscripcion)
+        return len(destinatarios)
+
+_broker = None
+_broker_lock = threading.Lock()
+
+def obtener_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(getattr(settings, 'EVENTOS_BROKER', 'fantasy.eventos.BrokerLocal'))()
+    return _broker
+
+def publicar_evento(canal, tipo, datos):
+    """Publica el evento cuando se confirme la transacción actual (o ya, si no hay ninguna)"""
+    transaction.on_commit(lambda: obtener_broker().publicar(canal, tipo, datos))
+
+def datos_notificacion(notificacion):
+    return {
+        'id': notificacion.id,
+        'tipo': notificacion.tipo,
+        'categoria': notificacion.categoria,
+        'titulo': notificacion.titulo,
+        'mensaje': notificacion.mensaje,
+        'fecha_creacion': notificacion.fecha_creacion.isoformat() if notificacion.fecha_creacion else None,
+    }
+
+def publicar_notificaciones(notificaciones):
+    """Anuncia notificaciones recién creadas en el canal público o en el de su destinatario"""
+    for notificacion in notificaciones:
+        canal = CANAL_PUBLICO if notificacion.tipo == 'publica' else canal_usuario(notificacion.destinatario_id)
+        publicar_evento(canal, 'notificacion', datos_notificacion(notificacion))
+
+def formatear_evento(evento):
+    """Mensaje Server-Sent Events para un evento del broker"""
+    return f"id: {evento['id']}\nevent: {evento['tipo']}\ndata: {json.dumps(evento['datos'], ensure_ascii=False)}\n\n"
+
+async def flujo_eventos(canales, latido=None):
+    """Generador SSE: reenvía los eventos de los canales y manda un latido si no llega nada"""
+    latido = latido or getattr(settings, 'EVENTOS_LATIDO_SEGUNDOS', 15)
+    broker = obtener_broker()
+    suscripcion = broker.suscribir(canales)
+    try:
+        # Primer mensaje: confirma la suscripción y fija el tiempo de reconexión del navegador
+        yield 'retry: 5000\n\n'
+        while True:
+            try:
+                evento = await suscripcion.siguiente(timeout=latido)
+            except asyncio.TimeoutError:
+                yield ': ping\n\n'
+                continue
+            yield formatear_evento(evento)
+    finally:
+        broker.desuscribir(suscripcion)
@@ -0,0 +1,186 @@
+"""
+Operaciones por jornada completa: congelación de las alineaciones de todos
+los equipos al inicio de la jornada y cierre (puntos y reparto de dinero).
+
+Todo se hace por lotes de equipos: una lectura de los titulares del lote,
+un bulk_create de los snapshots y otro de las filas de la tabla intermedia.
+La formación se comprueba en memoria.
+
+El cierre paga por diferencia: cada snapshot guarda cuánto dinero se ha
+abonado ya, así que repetirlo no paga dos veces y una corrección de
+puntuaciones solo abona (o descuenta) la diferencia.
+"""
+import time
+from collections import defaultdict
+from django.db import transaction
+from django.db.models import F, Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from .models import Equipo, Jornada, Jugador, AlineacionCongelada
+
+POSICIONES_MINIMAS = {'POR': 1, 'DEF': 2, 'DEL': 2}
+TAMANO_LOTE = 1000
+DINERO_POR_PUNTO = 100000
+
+def posiciones_faltantes(posiciones):
+    """Posiciones que no alcanzan el mínimo de titulares (1 POR, 2 DEF, 2 DEL)"""
+    cuenta = defaultdict(int)
+    for posicion in posiciones:
+        cuenta[posicion] += 1
+    return [posicion for posicion, minimo in POSICIONES_MINIMAS.items() if cuenta[posicion] < minimo]
+
+def _congelar_lote(jornada, equipo_ids):
+    """Crea los snapshots de un lote de equipos. Devuelve (snapshots, titulares, incompletas)."""
+    titulares = defaultdict(list)
+    for jugador_id, equipo_id, posicion in Jugador.objects.filter(
+        equipo_id__in=equipo_ids,
+        en_banquillo=False
+    ).values_list('id', 'equipo_id', 'posicion'):
+        titulares[equipo_id].append((jugador_id, posicion))
+
+    snapshots = []
+    for equipo_id in equipo_ids:
+        faltantes = posiciones_faltantes(posicion for _, posicion in titulares[equipo_id])
+        snapshots.append(AlineacionCongelada(
+            equipo_id=equipo_id,
+            jornada=jornada,
+            tiene_posiciones_completas=not faltantes,
+            posiciones_faltantes=faltantes
+        ))
+    AlineacionCongelada.objects.bulk_create(snapshots)
+
+    if any(snapshot.pk is None for snapshot in snapshots):
+        # Motores que no devuelven las claves tras bulk_create
+        ids = dict(AlineacionCongelada.objects.filter(
+            jornada=jornada, equipo_id__in=equipo_ids
+        ).values_list('equipo_id', 'id'))
+        for snapshot in snapshots:
+            snapshot.pk = ids[snapshot.equipo_id]
+
+    Titular = AlineacionCongelada.jugadores_titulares.through
+    Titular.objects.bulk_create([
+        Titular(alineacioncongelada_id=snapshot.pk, jugador_id=jugador_id)
+        for snapshot in snapshots
+        for jugador_id, _ in titulares[snapshot.equipo_id]
+    ])
+
+    incompletas = sum(1 for snapshot in snapshots if not snapshot.tiene_posiciones_completas)
+    return len(snapshots), sum(len(t) for t in titulares.values()), incompletas
+
+def congelar_jornada(jornada, tamano_lote=TAMANO_LOTE):
+    """
+    Congela la alineación titular de todos los equipos que aún no tienen snapshot
+    en la jornada. Es idempotente: los snapshots existentes no se tocan.
+    """
+    inicio = time.monotonic()
+    informe = {
+        'jornada': jornada.numero,
+        'equipos_congelados': 0,
+        'ya_congelados': 0,
+        'titulares': 0,
+        'incompletas': 0,
+    }
+
+    with transaction.atomic():
+        jornada = Jornada.objects.select_for_update().get(pk=jornada.pk)
+        congelados = AlineacionCongelada.objects.filter(jornada=jornada).values('equipo_id')
+        informe['ya_congelados'] = congelados.count()
+
+        pendientes = list(
+            Equipo.objects.exclude(id__in=congelados).order_by('id').values_list('id', flat=True)
+        )
+        for desde in range(0, len(pendientes), tamano_lote):
+            equipos, titulares, incompletas = _congelar_lote(jornada, pendientes[desde:desde + tamano_lote])
+            informe['equipos_congelados'] += equipos
+            informe['titulares'] += titulares
+            informe['incompletas'] += incompletas
+
+        if not jornada.alineaciones_congeladas:
+            jornada.alineaciones_congeladas = True
+            jornada.save(update_fields=['alineaciones_congeladas'])
+
+    informe['duracion_segundos'] = round(time.monotonic() - inicio, 3)
+    print(f"🧊 Jornada {jornada.numero}: {informe['equipos_congelados']} alineaciones congeladas "
+          f"({informe['incompletas']} incompletas) en {informe['duracion_segundos']}s")
+    return informe
+
+def congelar_jornadas_pendientes(ahora=None):
+    """Congela las jornadas cuyo inicio ya ha pasado y aún no están congeladas"""
+    ahora = ahora or timezone.now()
+    jornadas = Jornada.objects.filter(
+        fecha_inicio__isnull=False,
+        fecha_inicio__lte=ahora,
+        alineaciones_congeladas=False
+    ).order_by('numero')
+    return [congelar_jornada(jornada) for jornada in jornadas]
+
+def cerrar_jornada(jornada):
+    """
+    Calcula los puntos de todos los snapshots de la jornada con una sola agregación,
+    abona al presupuesto de cada equipo lo que aún no se le había pagado y publica
+    una notificación de distribución de dinero. Devuelve un informe.
+
+    Si una corrección baja los puntos, lo ya abonado no se descuenta: la diferencia
+    queda a 0 y el exceso se anota en el informe.
+    """
+    from .views.utils_views import crear_notificacion_distribucion_dinero
+
+    inicio = time.monotonic()
+    with transaction.atomic():
+        # Serializa cierres concurrentes de la misma jornada
+        jornada = Jornada.objects.select_for_update().get(pk=jornada.pk)
+
+        snapshots = list(
+            AlineacionCongelada.objects.filter(jornada=jornada).annotate(
+                puntos=Coalesce(Sum(
+                    'jugadores_titulares__puntuacion__puntos',
+                    filter=Q(jugadores_titulares__puntuacion__jornada=jornada)
+                ), 0)
+            ).only('id', 'equipo_id', 'puntos_obtenidos', 'dinero_ganado', 'dinero_abonado')
+        )
+
+        modificados = []
+        abonos = defaultdict(list)
+        sobrepagados = {}
+        for snapshot in snapshots:
+            dinero = snapshot.puntos * DINERO_POR_PUNTO
+            pendiente = dinero - snapshot.dinero_abonado
+            if snapshot.puntos_obtenidos == snapshot.puntos and snapshot.dinero_ganado == dinero and pendiente <= 0:
+                continue
+            snapshot.puntos_obtenidos = snapshot.puntos
+            snapshot.dinero_ganado = dinero
+            modificados.append(snapshot)
+            if pendiente < 0:
+                # Corrección a la baja: dinero_abonado sigue reflejando lo pagado
+                sobrepagados[snapshot.equipo_id] = -pendiente
+            elif pendiente:
+                snapshot.dinero_abonado = dinero
+                abonos[pendiente].append(snapshot.equipo_id)
+
+        AlineacionCongelada.objects.bulk_update(
+            modificados, ['puntos_obtenidos', 'dinero_ganado', 'dinero_abonado']
+        )
+        # Un UPDATE por importe distinto, no por equipo
+        for importe, equipo_ids in abonos.items():
+            Equipo.objects.filter(id__in=equipo_ids).update(presupuesto=F('presupuesto') + importe)
+
+        monto_total = sum(importe * len(equipo_ids) for importe, equipo_ids in abonos.items())
+        if monto_total > 0:
+            crear_notificacion_distribucion_dinero(monto_total, jornada)
+
+    informe = {
+        'jornada': jornada.numero,
+        'alineaciones': len(snapshots),
+        'actualizadas': len(modificados),
+        'equipos_abonados': sum(len(equipo_ids) for equipo_ids in abonos.values()),
+        'monto_total': monto_total,
+        'equipos_sobrepagados': len(sobrepagados),
+        'exceso_no_recuperado': sum(sobrepagados.values()),
+        'duracion_segundos': round(time.monotonic() - inicio, 3),
+    }
+    print(f"💰 Jornada {jornada.numero} cerrada: {informe['monto_total']}€ repartidos entre "
+          f"{informe['equipos_abonados']} equipos en {informe['duracion_segundos']}s")
+    if sobrepagados:
+        print(f"⚠️ Jornada {jornada.numero}: {len(sobrepagados)} equipos con puntos corregidos a la baja, "
+              f"{informe['exceso_no_recuperado']}€ ya abonados no se descuentan")
+    return informe
@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from fantasy.retencion import archivar_notificaciones, TAMANO_LOTE_RETENCION
+
+class Command(BaseCommand):
+    help = 'Archiva las notificaciones antiguas y las que exceden la ventana reciente de cada usuario'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=settings.NOTIFICACIONES_RETENCION_DIAS,
+                            help='Antigüedad a partir de la cual se archivan leídas y públicas')
+        parser.add_argument('--maximo-por-usuario', type=int, default=settings.NOTIFICACIONES_MAXIMO_POR_USUARIO,
+                            help='Privadas más recientes que se conservan por usuario')
+        parser.add_argument('--lote', type=int, default=TAMANO_LOTE_RETENCION, help='Notificaciones por lote')
+        parser.add_argument('--jsonl', help='Añadir a este fichero JSONL en lugar de a la tabla de archivo')
+        parser.add_argument('--dry-run', action='store_true', help='Solo informa, no mueve nada')
+
+    def handle(self, *args, **options):
+        informe = archivar_notificaciones(
+            dias=options['dias'],
+            maximo_por_usuario=options['maximo_por_usuario'],
+            tamano_lote=options['lote'],
+            ruta_jsonl=options['jsonl'],
+            aplicar=not options['dry_run']
+        )
+
+        for categoria, cantidad in sorted(informe['por_categoria'].items()):
+            self.stdout.write(f"📦 {categoria}: {cantidad}")
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {informe['antiguas']} antiguas y {informe['fuera_de_ventana']} fuera de ventana; "
+            f"{informe['archivadas']} archivadas en {informe['destino']} ({informe['lotes']} lotes), "
+            f"{informe['restantes']} siguen activas ({informe['duracion_segundos']}s)"
+        ))
@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from fantasy.benchmark import (
+    ESCALAS, ENDPOINTS, PREFIJO, preparar_datos, medir_endpoints, incumplimientos,
+    construir_informe, guardar_informe
+)
+from fantasy.sintetico import limpiar_mundo
+
+class Command(BaseCommand):
+    help = 'Mide tiempo y consultas SQL de los endpoints principales sobre un mundo sintético y guarda un informe JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--escala', choices=list(ESCALAS), default='mediana')
+        parser.add_argument('--repeticiones', type=int, default=5)
+        parser.add_argument('--endpoint', action='append', choices=list(ENDPOINTS), help='Solo estos endpoints (repetible)')
+        parser.add_argument('--salida', help='Fichero JSON donde guardar el informe')
+        parser.add_argument('--bd-actual', action='store_true',
+                            help='Usa la base de datos configurada en lugar de una de prueba (borra el mundo al terminar)')
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        nombre_original = None
+        if not options['bd_actual']:
+            # Base de datos desechable, como en los tests
+            nombre_original = connection.settings_dict['NAME']
+            connection.creation.create_test_db(verbosity=0, autoclobber=True)
+
+        try:
+            self.stdout.write(f"🧪 Generando mundo sintético '{options['escala']}'...")
+            equipo = preparar_datos(options['escala'])
+            resultados = medir_endpoints(equipo, options['repeticiones'], options['endpoint'])
+        finally:
+            if nombre_original is None:
+                limpiar_mundo(PREFIJO)
+            else:
+                connection.creation.destroy_test_db(nombre_original, verbosity=0)
+            teardown_test_environment()
+
+        for nombre, resultado in resultados.items():
+            marca = '✅' if resultado['dentro_presupuesto'] and resultado['status'] == 200 else '❌'
+            self.stdout.write(
+                f"{marca} {nombre:<30} {resultado['ms_mediana']:>9} ms  "
+                f"{resultado['consultas']:>4}/{resultado['presupuesto_consultas']} consultas"
+            )
+
+        if options['salida']:
+            guardar_informe(construir_informe(options['escala'], options['repeticiones'], resultados), options['salida'])
+            self.stdout.write(f"💾 Informe guardado en {options['salida']}")
+
+        errores = incumplimientos(resultados)
+        if errores:
+            raise CommandError('Presupuestos superados: ' + '; '.join(errores))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+from fantasy.carga_datos import cargar_ficheros, buscar_ficheros, ENTIDADES, TAMANO_LOTE
+
+class Command(BaseCommand):
+    help = 'Carga por lotes equipos reales, jugadores, partidos y puntuaciones desde ficheros CSV/JSON/JSONL'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--directorio', help='Directorio con ficheros <entidad>.csv/.jsonl/.json')
+        for entidad in ENTIDADES:
+            parser.add_argument(f"--{entidad.replace('_', '-')}", dest=entidad, help=f'Fichero de {entidad}')
+        parser.add_argument('--lote', type=int, default=TAMANO_LOTE, help='Filas por lote')
+
+    def handle(self, *args, **options):
+        ficheros = buscar_ficheros(options['directorio']) if options['directorio'] else {}
+        ficheros.update({entidad: options[entidad] for entidad in ENTIDADES if options[entidad]})
+        if not ficheros:
+            raise CommandError('Indica --directorio o al menos un fichero por entidad')
+
+        try:
+            informe = cargar_ficheros(ficheros, tamano_lote=options['lote'])
+        except (ValueError, OSError) as e:
+            # Cada lote se confirma por separado: lo cargado antes del error queda guardado y coherente
+            raise CommandError(f'{e} (los lotes anteriores quedan guardados; se puede relanzar la carga)')
+
+        for entidad in ENTIDADES:
+            if entidad in informe:
+                datos = informe[entidad]
+                self.stdout.write(self.style.SUCCESS(
+                    f"✅ {entidad}: {datos['filas']} filas ({datos['creados']} nuevas, "
+                    f"{datos['actualizados']} actualizadas) a {datos['filas_por_segundo']} filas/s"
+                ))
+        if 'jugadores_totalizados' in informe:
+            self.stdout.write(f"📊 Totales recalculados para {informe['jugadores_totalizados']} jugadores")
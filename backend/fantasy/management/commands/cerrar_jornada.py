@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+from fantasy.jornadas import cerrar_jornada
+from fantasy.models import Jornada
+
+class Command(BaseCommand):
+    help = 'Calcula los puntos de las alineaciones congeladas de una jornada y reparte el dinero (se puede repetir sin pagar dos veces)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--jornada', type=int, required=True, help='Número de jornada a cerrar')
+
+    def handle(self, *args, **options):
+        try:
+            jornada = Jornada.objects.get(numero=options['jornada'])
+        except Jornada.DoesNotExist:
+            raise CommandError(f"No existe la jornada {options['jornada']}")
+
+        informe = cerrar_jornada(jornada)
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Jornada {informe['jornada']}: {informe['actualizadas']} de {informe['alineaciones']} alineaciones "
+            f"actualizadas, {informe['monto_total']}€ abonados a {informe['equipos_abonados']} equipos"
+        ))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+from fantasy.jornadas import congelar_jornada, congelar_jornadas_pendientes, TAMANO_LOTE
+from fantasy.models import Jornada
+
+class Command(BaseCommand):
+    help = 'Congela las alineaciones de todos los equipos para una jornada (o para las jornadas ya iniciadas)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--jornada', type=int, help='Número de jornada a congelar')
+        parser.add_argument('--lote', type=int, default=TAMANO_LOTE, help='Equipos por lote')
+
+    def handle(self, *args, **options):
+        if options['jornada'] is not None:
+            try:
+                jornada = Jornada.objects.get(numero=options['jornada'])
+            except Jornada.DoesNotExist:
+                raise CommandError(f"No existe la jornada {options['jornada']}")
+            informes = [congelar_jornada(jornada, tamano_lote=options['lote'])]
+        else:
+            informes = congelar_jornadas_pendientes()
+
+        if not informes:
+            self.stdout.write('ℹ️ No hay jornadas pendientes de congelar')
+        for informe in informes:
+            self.stdout.write(self.style.SUCCESS(
+                f"✅ Jornada {informe['jornada']}: {informe['equipos_congelados']} alineaciones congeladas, "
+                f"{informe['ya_congelados']} ya existían, {informe['incompletas']} incompletas "
+                f"({informe['duracion_segundos']}s)"
+            ))
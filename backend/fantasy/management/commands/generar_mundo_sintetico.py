@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+from fantasy.sintetico import generar_mundo, limpiar_mundo, PREFIJO, TAMANO_LOTE
+
+class Command(BaseCommand):
+    help = 'Genera un mundo sintético reproducible (ligas, equipos, jugadores, puntuaciones...) para pruebas de carga'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ligas', type=int, default=1)
+        parser.add_argument('--equipos', type=int, default=20, help='Equipos fantasy (uno por usuario)')
+        parser.add_argument('--equipos-reales', type=int, default=12)
+        parser.add_argument('--jugadores-por-equipo', type=int, default=7)
+        parser.add_argument('--jugadores-libres', type=int, default=200)
+        parser.add_argument('--jornadas', type=int, default=10)
+        parser.add_argument('--pujas', type=int, default=100)
+        parser.add_argument('--ofertas', type=int, default=100)
+        parser.add_argument('--notificaciones', type=int, default=1000)
+        parser.add_argument('--semilla', type=int, default=42)
+        parser.add_argument('--prefijo', default=PREFIJO, help='Prefijo de los datos generados')
+        parser.add_argument('--lote', type=int, default=TAMANO_LOTE, help='Filas por inserción')
+        parser.add_argument('--limpiar', action='store_true', help='Borra antes el mundo con el mismo prefijo')
+
+    def handle(self, *args, **options):
+        if options['limpiar']:
+            self.stdout.write(f"🧹 Borrando el mundo sintético '{options['prefijo']}'...")
+            limpiar_mundo(options['prefijo'])
+
+        try:
+            informe = generar_mundo(
+                ligas=options['ligas'],
+                equipos=options['equipos'],
+                equipos_reales=options['equipos_reales'],
+                jugadores_por_equipo=options['jugadores_por_equipo'],
+                jugadores_libres=options['jugadores_libres'],
+                jornadas=options['jornadas'],
+                pujas=options['pujas'],
+                ofertas=options['ofertas'],
+                notificaciones=options['notificaciones'],
+                semilla=options['semilla'],
+                prefijo=options['prefijo'],
+                tamano_lote=options['lote'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Mundo sintético generado: {informe['total_filas']} filas en {informe['duracion_segundos']}s"
+        ))
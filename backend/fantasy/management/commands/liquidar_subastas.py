@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from fantasy.subastas import liquidar_subastas, TAMANO_LOTE
+
+class Command(BaseCommand):
+    help = 'Liquida por lotes las subastas expiradas (seguro de ejecutar en varios procesos a la vez)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=TAMANO_LOTE, help='Jugadores por lote')
+
+    def handle(self, *args, **options):
+        informe = liquidar_subastas(tamano_lote=options['lote'])
+
+        for error in informe['errores']:
+            self.stdout.write(self.style.ERROR(f"   • Lote desde el jugador {error['desde_id']}: {error['error']}"))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {informe['revisadas']} subastas revisadas en {informe['lotes']} lotes: "
+            f"{informe['transferencias']} traspasos, {informe['ofertas']} ofertas, "
+            f"{informe['sin_pujas']} sin pujas ({informe['duracion_segundos']}s)"
+        ))
@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from fantasy.mantenimiento_mercado import ejecutar_mantenimiento_exclusivo, PlanificadorMercado
+
+class Command(BaseCommand):
+    help = 'Rota el lote de agentes libres y genera las ofertas automáticas del mercado'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bucle', action='store_true', help='Repetir el mantenimiento indefinidamente')
+        parser.add_argument('--intervalo', type=int, default=settings.MERCADO_INTERVALO_MANTENIMIENTO,
+                            help='Segundos entre pasadas en modo bucle')
+
+    def handle(self, *args, **options):
+        if options['bucle']:
+            planificador = PlanificadorMercado(options['intervalo'])
+            planificador.iniciar()
+            try:
+                planificador.esperar()
+            except KeyboardInterrupt:
+                planificador.detener()
+            return
+
+        informe = ejecutar_mantenimiento_exclusivo()
+        if informe is None:
+            self.stdout.write(self.style.WARNING('⏭️ Otro proceso está manteniendo el mercado, no se hace nada'))
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Mercado actualizado: lote nuevo={informe['lote_nuevo']}, "
+            f"{informe['jugadores_lote']} en lote, {informe['retirados']} retirados, "
+            f"{informe['ofertas_automaticas']} ofertas automáticas ({informe['duracion_segundos']}s)"
+        ))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from fantasy.models import ClasificacionEquipo
+
+class Command(BaseCommand):
+    help = 'Reconstruye la clasificación materializada de todas las ligas e informa de las diferencias'
+
+    def handle(self, *args, **kwargs):
+        self.stdout.write('🔄 Recalculando clasificación de todas las ligas...')
+
+        antes = {
+            fila['equipo_id']: (fila['puntos_totales'], fila['posicion'])
+            for fila in ClasificacionEquipo.objects.values('equipo_id', 'puntos_totales', 'posicion')
+        }
+
+        with transaction.atomic():
+            ClasificacionEquipo.recalcular_todo()
+
+        despues = {
+            fila['equipo_id']: (fila['puntos_totales'], fila['posicion'])
+            for fila in ClasificacionEquipo.objects.values('equipo_id', 'puntos_totales', 'posicion')
+        }
+
+        desfasados = [equipo_id for equipo_id, valores in despues.items() if antes.get(equipo_id) != valores]
+        for equipo_id in desfasados:
+            self.stdout.write(f'   • Equipo {equipo_id}: {antes.get(equipo_id)} -> {despues[equipo_id]}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Clasificación recalculada: {len(despues)} equipos, {len(desfasados)} con diferencias'
+        ))
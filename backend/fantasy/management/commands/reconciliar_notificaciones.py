@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from fantasy.notificaciones import reconciliar_contadores, TAMANO_LOTE_CONTADORES
+
+class Command(BaseCommand):
+    help = 'Recalcula desde la BD los contadores cacheados de notificaciones no leídas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=TAMANO_LOTE_CONTADORES, help='Usuarios por lote')
+
+    def handle(self, *args, **options):
+        informe = reconciliar_contadores(tamano_lote=options['lote'])
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {informe['revisados']} contadores de privadas revisados, {informe['corregidos']} corregidos; "
+            f"contadores de públicas invalidados"
+        ))
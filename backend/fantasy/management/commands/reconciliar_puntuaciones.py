@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from fantasy.puntuaciones import reconciliar_totales, TAMANO_LOTE_RECONCILIACION
+
+class Command(BaseCommand):
+    help = 'Reconstruye los puntos y goles totales de los jugadores desde sus puntuaciones e informa de las desviaciones'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Solo informa, no corrige nada')
+        parser.add_argument('--revalorar', action='store_true', help='Corrige también el valor de mercado')
+        parser.add_argument('--lote', type=int, default=TAMANO_LOTE_RECONCILIACION, help='Jugadores por lote')
+
+    def handle(self, *args, **options):
+        informe = reconciliar_totales(
+            aplicar=not options['dry_run'],
+            revalorar=options['revalorar'],
+            tamano_lote=options['lote']
+        )
+
+        for ejemplo in informe['ejemplos']:
+            self.stdout.write(
+                f"⚠️ {ejemplo['nombre']} (id {ejemplo['jugador_id']}): "
+                f"{ejemplo['puntos_guardados']} guardados, {ejemplo['puntos_reales']} reales"
+            )
+        estilo = self.style.SUCCESS if not informe['desviados'] else self.style.WARNING
+        self.stdout.write(estilo(
+            f"✅ {informe['revisados']} jugadores revisados, {informe['desviados']} desviados "
+            f"({informe['desviacion_puntos']} puntos, {informe['desviacion_goles']} goles), "
+            f"{informe['corregidos']} corregidos en {informe['duracion_segundos']}s"
+        ))
@@ -0,0 +1,249 @@
+"""
+Mantenimiento periódico del mercado: rotación del lote diario de agentes
+libres y ofertas automáticas por jugadores con 24h en venta. La misma pasada
+congela las alineaciones de las jornadas que ya han empezado y reconcilia
+los contadores de notificaciones no leídas.
+
+Se ejecuta fuera de las peticiones, desde el comando `mantener_mercado` o
+desde el planificador en segundo plano que gunicorn.conf.py arranca dentro del
+worker (no en el maestro: así comparte caché y broker de eventos con las
+peticiones y no hereda hilos ni conexiones al hacer fork). Cada pasada toma un
+advisory lock de PostgreSQL, de modo que aunque haya varios procesos con
+planificador solo uno mantiene el mercado a la vez.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from random import Random, uniform
+from django.conf import settings
+from django.db import connection, transaction, close_old_connections
+from django.utils import timezone
+from .models import Jugador, Equipo, Oferta, LoteMercadoLibre
+from .jornadas import congelar_jornadas_pendientes
+from .notificaciones import reconciliar_contadores
+from .muestreo import muestra_aleatoria, muestrear_ids, semilla_diaria
+
+def actualizar_mercado_libre_fijo():
+    """Genera el lote diario de agentes libres o limpia los expirados. Devuelve un resumen."""
+    ahora = timezone.now()
+    limite_expiracion = ahora - timedelta(hours=24)
+    
+    dia_actual = ahora.date()
+    
+    with transaction.atomic():
+        # La fila del día (fecha única) hace de candado: solo una pasada genera el lote,
+        # aunque corran a la vez varios procesos o comandos sueltos
+        lote, lote_nuevo = LoteMercadoLibre.objects.get_or_create(fecha=dia_actual)
+        
+        if lote_nuevo:
+            print(f"🔄 Generando nuevo lote de jugadores libres para {dia_actual}")
+            
+            retirados = Jugador.objects.filter(
+                equipo__isnull=True,
+                en_venta=True
+            ).update(
+                en_venta=False,
+                fecha_mercado=None,
+                puja_actual=None,
+                equipo_pujador=None
+            )
+            
+            nuevos_jugadores = muestra_aleatoria(
+                Jugador.objects.filter(
+                    equipo__isnull=True,
+                    equipo_real__isnull=False,
+                    fecha_mercado__isnull=True,
+                    en_venta=False
+                ),
+                8,
+                semilla=semilla_diaria('mercado_libre', dia_actual)
+            )
+            
+            print(f"🎯 Seleccionados {len(nuevos_jugadores)} jugadores para el nuevo lote")
+            
+            for jugador in nuevos_jugadores:
+                jugador.poner_en_mercado()
+                print(f"➕ {jugador.nombre} añadido al mercado libre")
+            
+            lote.jugadores = len(nuevos_jugadores)
+            lote.save(update_fields=['jugadores'])
+            
+            print("✅ Lote de jugadores libres generado exitosamente")
+            return {'lote_nuevo': True, 'jugadores_lote': len(nuevos_jugadores), 'retirados': retirados}
+    
+    retirados = Jugador.objects.filter(
+        fecha_mercado__lt=limite_expiracion,
+        equipo__isnull=True
+    ).update(
+        en_venta=False,
+        fecha_mercado=None,
+        puja_actual=None,
+        equipo_pujador=None
+    )
+    return {'lote_nuevo': False, 'jugadores_lote': 0, 'retirados': retirados}
+
+TAMANO_POOL_OFERTANTES = 32
+
+def generar_ofertas_automaticas():
+    """Crea ofertas de equipos aleatorios por jugadores con 24h en venta. Devuelve cuántas creó."""
+    ahora = timezone.now()
+    limite_24h = ahora - timedelta(hours=24)
+    hoy = ahora.date()
+    
+    with transaction.atomic():
+        # Los candidatos quedan bloqueados hasta el final: una puja concurrente espera
+        # (o el jugador se salta si ya está bloqueado) y bulk_update no la pisa
+        jugadores_24h = list(Jugador.objects.filter(
+            equipo__isnull=False,
+            en_venta=True,
+            fecha_mercado__lte=limite_24h
+        ).select_related('equipo').select_for_update(skip_locked=True, of=('self',)))
+        
+        print(f"🔄 Generando ofertas automáticas para {len(jugadores_24h)} jugadores con 24h en mercado...")
+        if not jugadores_24h:
+            return 0
+        
+        # Un único sorteo de equipos candidatos para toda la pasada
+        pool_ids = muestrear_ids(
+            Equipo.objects.all(),
+            TAMANO_POOL_OFERTANTES,
+            semilla=semilla_diaria('ofertas_automaticas', hoy)
+        )
+        pool = Equipo.objects.in_bulk(pool_ids)
+        rng = Random(semilla_diaria('ofertas_automaticas_reparto', hoy))
+        
+        # Ofertas de hoy ya existentes, en una sola consulta
+        existentes = set(Oferta.objects.filter(
+            jugador__in=jugadores_24h,
+            fecha_oferta__date=hoy
+        ).values_list('jugador_id', 'equipo_ofertante_id'))
+        
+        nuevas_ofertas = []
+        jugadores_actualizados = []
+        for jugador in jugadores_24h:
+            # El sorteo es diario: sin descartar a quien ya ofertó hoy, cada pasada del día
+            # elegiría el mismo comprador y la oferta se descartaría por repetida
+            candidatos = [
+                equipo_id for equipo_id in pool_ids
+                if equipo_id != jugador.equipo_id and (jugador.id, equipo_id) not in existentes
+            ]
+            if not candidatos:
+                continue
+            equipo_ofertante = pool[rng.choice(candidatos)]
+            
+            if jugador.puja_actual:
+                monto_base = max(jugador.puja_actual + 1, jugador.valor)
+                variacion = uniform(0.01, 0.05)
+                monto_oferta = int(monto_base * (1 + variacion))
+            else:
+                variacion = uniform(-0.05, 0.05)
+                monto_oferta = int(jugador.valor * (1 + variacion))
+            
+            nuevas_ofertas.append(Oferta(
+                jugador=jugador,
+                equipo_ofertante=equipo_ofertante,
+                equipo_receptor=jugador.equipo,
+                monto=monto_oferta,
+                estado='pendiente'
+            ))
+            existentes.add((jugador.id, equipo_ofertante.id))
+            
+            if not jugador.puja_actual or monto_oferta > jugador.puja_actual:
+                jugador.puja_actual = monto_oferta
+                jugador.equipo_pujador = equipo_ofertante
+                jugadores_actualizados.append(jugador)
+            
+            print(f"✅ Oferta automática: {equipo_ofertante.nombre} -> {jugador.equipo.nombre} por {jugador.nombre} - €{monto_oferta}")
+        
+        Oferta.objects.bulk_create(nuevas_ofertas)
+        Jugador.objects.bulk_update(jugadores_actualizados, ['puja_actual', 'equipo_pujador'])
+        
+        return len(nuevas_ofertas)
+
+CANDADO_MANTENIMIENTO = 0x6d657263  # clave del advisory lock ('merc')
+
+@contextmanager
+def candado_mantenimiento():
+    """Advisory lock de sesión en PostgreSQL; devuelve si se ha obtenido (en otros motores, siempre)"""
+    if connection.vendor != 'postgresql':
+        yield True
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_try_advisory_lock(%s)', [CANDADO_MANTENIMIENTO])
+        obtenido = cursor.fetchone()[0]
+    try:
+        yield obtenido
+    finally:
+        if obtenido:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT pg_advisory_unlock(%s)', [CANDADO_MANTENIMIENTO])
+
+def ejecutar_mantenimiento_exclusivo():
+    """Ejecuta una pasada si ningún otro proceso la está ejecutando; devuelve None si se la salta"""
+    with candado_mantenimiento() as obtenido:
+        return ejecutar_mantenimiento() if obtenido else None
+
+def ejecutar_mantenimiento():
+    """Ejecuta una pasada completa de mantenimiento y devuelve un informe"""
+    inicio = time.monotonic()
+    informe = actualizar_mercado_libre_fijo()
+    informe['ofertas_automaticas'] = generar_ofertas_automaticas()
+    # Las jornadas que ya han empezado congelan sus alineaciones en esta misma pasada
+    informe['jornadas_congeladas'] = [i['jornada'] for i in congelar_jornadas_pendientes()]
+    informe['contadores_corregidos'] = reconciliar_contadores()['corregidos']
+    informe['duracion_segundos'] = round(time.monotonic() - inicio, 3)
+    return informe
+
+class PlanificadorMercado:
+    """Hilo en segundo plano que ejecuta el mantenimiento cada `intervalo` segundos"""
+
+    def __init__(self, intervalo=None):
+        self.intervalo = intervalo or settings.MERCADO_INTERVALO_MANTENIMIENTO
+        self._parar = threading.Event()
+        self._hilo = None
+
+    @property
+    def activo(self):
+        return self._hilo is not None and self._hilo.is_alive()
+
+    def iniciar(self):
+        if self.activo:
+            return
+        self._parar.clear()
+        self._hilo = threading.Thread(target=self._bucle, name='planificador-mercado', daemon=True)
+        self._hilo.start()
+        print(f"⏱️ Planificador del mercado iniciado (cada {self.intervalo}s)")
+
+    def esperar(self, timeout=None):
+        """Bloquea hasta que el hilo termine (o pase `timeout`)"""
+        if self._hilo is not None:
+            self._hilo.join(timeout)
+
+    def detener(self, timeout=None):
+        self._parar.set()
+        self.esperar(timeout)
+
+    def _bucle(self):
+        while not self._parar.is_set():
+            try:
+                informe = ejecutar_mantenimiento_exclusivo()
+                if informe is None:
+                    print("⏭️ Mantenimiento del mercado en curso en otro proceso")
+                else:
+                    print(f"✅ Mantenimiento del mercado: {informe}")
+            except Exception as e:
+                print(f"❌ Error en el mantenimiento del mercado: {e}")
+            finally:
+                close_old_connections()
+            self._parar.wait(self.intervalo)
+
+_planificador = None
+
+def iniciar_planificador(intervalo=None):
+    """Arranca (una sola vez por proceso) el planificador del mercado"""
+    global _planificador
+    if _planificador is None:
+        _planificador = PlanificadorMercado(intervalo)
+    _planificador.iniciar()
+    return _planificador
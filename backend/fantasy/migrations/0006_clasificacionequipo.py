@@ -0,0 +1,58 @@
+# Generated by Django 5.2.7 on 2026-10-18 02:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Sum
+from django.db.models.functions import Coalesce
+
+
+def poblar_clasificacion(apps, schema_editor):
+    Equipo = apps.get_model('fantasy', 'Equipo')
+    ClasificacionEquipo = apps.get_model('fantasy', 'ClasificacionEquipo')
+
+    equipos = Equipo.objects.annotate(
+        suma_puntos=Coalesce(Sum('jugadores__puntos_totales'), 0)
+    ).order_by('liga_id', '-suma_puntos', 'id')
+
+    filas = []
+    liga_actual, posicion = None, 0
+    for equipo in equipos:
+        if equipo.liga_id != liga_actual:
+            liga_actual, posicion = equipo.liga_id, 0
+        posicion += 1
+        filas.append(ClasificacionEquipo(
+            liga_id=equipo.liga_id,
+            equipo_id=equipo.id,
+            puntos_totales=equipo.suma_puntos,
+            posicion=posicion
+        ))
+    ClasificacionEquipo.objects.bulk_create(filas)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fantasy', '0005_remove_jornada_alineaciones_congeladas_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClasificacionEquipo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('puntos_totales', models.IntegerField(default=0)),
+                ('posicion', models.IntegerField(default=0)),
+                ('ultima_jornada', models.IntegerField(blank=True, help_text='Número de la última jornada con puntuaciones que afectó a este equipo', null=True)),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+                ('equipo', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='clasificacion', to='fantasy.equipo')),
+                ('liga', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='clasificacion', to='fantasy.liga')),
+            ],
+            options={
+                'verbose_name': 'Clasificación',
+                'verbose_name_plural': 'Clasificaciones',
+                'ordering': ['liga', 'posicion'],
+                'indexes': [models.Index(fields=['liga', 'posicion'], name='fantasy_cla_liga_id_5374dc_idx')],
+            },
+        ),
+        migrations.RunPython(poblar_clasificacion, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-18 02:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fantasy', '0006_clasificacionequipo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='jornada',
+            name='alineaciones_congeladas',
+            field=models.BooleanField(default=False, help_text='Indica si las alineaciones ya fueron registradas para esta jornada'),
+        ),
+        migrations.AddField(
+            model_name='jornada',
+            name='fecha_inicio',
+            field=models.DateTimeField(blank=True, help_text='Fecha y hora de inicio de la jornada. Las alineaciones se congelan en este momento.', null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 02:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fantasy', '0007_jornada_fecha_inicio_alineaciones_congeladas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='alineacioncongelada',
+            name='dinero_abonado',
+            field=models.IntegerField(default=0, help_text='Parte de dinero_ganado ya sumada al presupuesto del equipo'),
+        ),
+    ]
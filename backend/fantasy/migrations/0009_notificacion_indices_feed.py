@@ -0,0 +1,24 @@
+# Generated by Django 5.2.7 on 2026-10-18 02:57
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('fantasy', '0008_alineacioncongelada_dinero_abonado'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notificacion',
+            index=models.Index(fields=['tipo', '-fecha_creacion', '-id'], name='notif_tipo_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notificacion',
+            index=models.Index(fields=['destinatario', '-fecha_creacion', '-id'], name='notif_destinatario_fecha_idx'),
+        ),
+    ]
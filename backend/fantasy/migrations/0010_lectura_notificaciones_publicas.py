@@ -0,0 +1,59 @@
+# Generated by Django 5.2.7 on 2026-10-18 03:17
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def migrar_leidas_publicas(apps, schema_editor):
+    """
+    La marca compartida de las públicas pasa a un cursor por usuario: todos
+    empiezan con leídas hasta la pública leída más reciente.
+    """
+    Notificacion = apps.get_model('fantasy', 'Notificacion')
+    LecturaNotificaciones = apps.get_model('fantasy', 'LecturaNotificaciones')
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+
+    leidas_hasta = Notificacion.objects.filter(tipo='publica', leida=True).aggregate(
+        ultima=Max('fecha_creacion')
+    )['ultima']
+    if leidas_hasta is None:
+        return
+    LecturaNotificaciones.objects.bulk_create(
+        [LecturaNotificaciones(usuario_id=usuario_id, leidas_hasta=leidas_hasta)
+         for usuario_id in User.objects.values_list('id', flat=True).iterator()],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fantasy', '0009_notificacion_indices_feed'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LecturaNotificaciones',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('leidas_hasta', models.DateTimeField()),
+                ('usuario', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='lectura_notificaciones', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='NotificacionLeida',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha_lectura', models.DateTimeField(auto_now_add=True)),
+                ('notificacion', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lecturas', to='fantasy.notificacion')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notificaciones_leidas', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('usuario', 'notificacion')},
+            },
+        ),
+        migrations.RunPython(migrar_leidas_publicas, migrations.RunPython.noop),
+    ]
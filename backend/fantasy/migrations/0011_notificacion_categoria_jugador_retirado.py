@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 03:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fantasy', '0010_lectura_notificaciones_publicas'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='notificacion',
+            name='categoria',
+            field=models.CharField(choices=[('distribucion_dinero', 'Distribución de Dinero'), ('traspaso', 'Traspaso'), ('oferta_rechazada', 'Oferta Rechazada'), ('oferta_editada', 'Oferta Editada'), ('oferta_retirada', 'Oferta Retirada'), ('jugador_retirado', 'Jugador Retirado')], max_length=20),
+        ),
+    ]
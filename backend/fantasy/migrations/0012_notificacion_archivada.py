@@ -0,0 +1,32 @@
+# Generated by Django 5.2.7 on 2026-10-18 03:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fantasy', '0011_notificacion_categoria_jugador_retirado'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificacionArchivada',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('id_original', models.BigIntegerField(unique=True)),
+                ('tipo', models.CharField(choices=[('publica', 'Pública'), ('privada', 'Privada')], max_length=10)),
+                ('categoria', models.CharField(choices=[('distribucion_dinero', 'Distribución de Dinero'), ('traspaso', 'Traspaso'), ('oferta_rechazada', 'Oferta Rechazada'), ('oferta_editada', 'Oferta Editada'), ('oferta_retirada', 'Oferta Retirada'), ('jugador_retirado', 'Jugador Retirado')], max_length=20)),
+                ('titulo', models.CharField(max_length=200)),
+                ('mensaje', models.TextField()),
+                ('destinatario_id', models.IntegerField(blank=True, db_index=True, null=True)),
+                ('leida', models.BooleanField(default=False)),
+                ('fecha_creacion', models.DateTimeField()),
+                ('fecha_archivo', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Notificación Archivada',
+                'verbose_name_plural': 'Notificaciones Archivadas',
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.7 on 2026-10-18 04:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fantasy', '0012_notificacion_archivada'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoteMercadoLibre',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(unique=True)),
+                ('jugadores', models.PositiveIntegerField(default=0)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Lote del Mercado Libre',
+                'verbose_name_plural': 'Lotes del Mercado Libre',
+            },
+        ),
+    ]
@@ -1,6 +1,11 @@
-from django.db import models
+import threading
+
+from django.db import models, transaction
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.core.cache import cache
+from django.db.models import F, Sum, Q
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_save, post_delete, post_init
 from django.dispatch import receiver
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.contenttypes.fields import GenericForeignKey
@@ -8,6 +13,9 @@ from django.core.exceptions import ValidationError
 from datetime import datetime, timedelta
 from django.utils import timezone
 
+# Reordenación de ligas pendiente de la transacción en curso (una por hilo)
+_reordenacion = threading.local()
+
 class EquipoReal(models.Model):
     nombre = models.CharField(max_length=100, unique=True)    
     def __str__(self):
@@ -88,33 +96,42 @@ class Jugador(models.Model):
         Puja.objects.filter(jugador=self).update(es_ganadora=False)
 
     def realizar_puja(self, equipo, monto):
-        if not self.en_venta:
-            raise ValueError("El jugador no está en el mercado")
-        
-        if monto <= (self.puja_actual or 0):
-            raise ValueError("La puja debe ser mayor a la puja actual")
-        
-        # Crear nueva puja
-        puja = Puja.objects.create(
-            jugador=self,
-            equipo=equipo,
-            monto=monto
-        )
-        
-        # Actualizar puja actual
-        self.puja_actual = monto
-        self.equipo_pujador = equipo
-        self.save()
-        
-        if self.equipo and self.equipo != equipo:  # No crear oferta si es el mismo equipo
-            oferta = Oferta.objects.create(
+        with transaction.atomic():
+            # Releer la fila bloqueada: la comprobación y la escritura no pueden intercalarse
+            actual = Jugador.objects.select_for_update().only(
+                'en_venta', 'puja_actual', 'equipo_id'
+            ).get(pk=self.pk)
+            self.en_venta = actual.en_venta
+            self.puja_actual = actual.puja_actual
+            self.equipo_id = actual.equipo_id
+            
+            if not self.en_venta:
+                raise ValueError("El jugador no está en el mercado")
+            
+            if monto <= (self.puja_actual or 0):
+                raise ValueError("La puja debe ser mayor a la puja actual")
+            
+            # Crear nueva puja
+            puja = Puja.objects.create(
                 jugador=self,
-                equipo_ofertante=equipo,
-                equipo_receptor=self.equipo,
-                monto=monto,
-                estado='pendiente'
+                equipo=equipo,
+                monto=monto
             )
-            print(f"✅ Oferta creada: {equipo.nombre} -> {self.equipo.nombre} por {self.nombre} - €{monto}")
+            
+            # Actualizar puja actual
+            self.puja_actual = monto
+            self.equipo_pujador = equipo
+            self.save(update_fields=['puja_actual', 'equipo_pujador'])
+            
+            if self.equipo and self.equipo != equipo:  # No crear oferta si es el mismo equipo
+                oferta = Oferta.objects.create(
+                    jugador=self,
+                    equipo_ofertante=equipo,
+                    equipo_receptor=self.equipo,
+                    monto=monto,
+                    estado='pendiente'
+                )
+                print(f"✅ Oferta creada: {equipo.nombre} -> {self.equipo.nombre} por {self.nombre} - €{monto}")
         
         return puja
 
@@ -169,9 +186,195 @@ class Equipo(models.Model):
     def __str__(self):
         return f"{self.nombre} - {self.usuario.username}"
 
+class ClasificacionEquipo(models.Model):
+    """
+    Fila materializada de la clasificación de una liga fantasy.
+    Los puntos se ajustan por diferencias cuando cambian los puntos o el equipo
+    de un jugador, y la clasificación se sirve con una única lectura indexada.
+    Las posiciones se reordenan una sola vez al confirmar la transacción.
+    """
+    liga = models.ForeignKey(Liga, on_delete=models.CASCADE, related_name='clasificacion')
+    equipo = models.OneToOneField(Equipo, on_delete=models.CASCADE, related_name='clasificacion')
+    puntos_totales = models.IntegerField(default=0)
+    posicion = models.IntegerField(default=0)
+    ultima_jornada = models.IntegerField(
+        null=True,
+        blank=True,
+        help_text="Número de la última jornada con puntuaciones que afectó a este equipo"
+    )
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['liga', 'posicion']
+        indexes = [
+            models.Index(fields=['liga', 'posicion']),
+        ]
+        verbose_name = 'Clasificación'
+        verbose_name_plural = 'Clasificaciones'
+
+    def __str__(self):
+        return f"{self.posicion}. {self.equipo.nombre} - {self.puntos_totales} pts"
+
+    @classmethod
+    def actualizar_equipos(cls, equipo_ids):
+        """Recalcula desde cero los puntos de los equipos indicados y reordena sus ligas"""
+        equipo_ids = {equipo_id for equipo_id in equipo_ids if equipo_id}
+        if not equipo_ids:
+            return
+
+        equipos = Equipo.objects.filter(id__in=equipo_ids).annotate(
+            suma_puntos=Coalesce(Sum('jugadores__puntos_totales'), 0)
+        ).values('id', 'liga_id', 'suma_puntos')
+
+        filas = {fila.equipo_id: fila for fila in cls.objects.filter(equipo_id__in=equipo_ids)}
+        ahora = timezone.now()
+        nuevas, modificadas, ligas = [], [], set()
+
+        for equipo in equipos:
+            ligas.add(equipo['liga_id'])
+            fila = filas.get(equipo['id'])
+            if fila is None:
+                nuevas.append(cls(
+                    liga_id=equipo['liga_id'],
+                    equipo_id=equipo['id'],
+                    puntos_totales=equipo['suma_puntos']
+                ))
+            else:
+                ligas.add(fila.liga_id)
+                fila.liga_id = equipo['liga_id']
+                fila.puntos_totales = equipo['suma_puntos']
+                fila.fecha_actualizacion = ahora
+                modificadas.append(fila)
+
+        cls.objects.bulk_create(nuevas)
+        cls.objects.bulk_update(modificadas, ['liga', 'puntos_totales', 'fecha_actualizacion'])
+        cls.recalcular_posiciones(ligas)
+
+    @classmethod
+    def aplicar_delta(cls, equipo_id, delta):
+        """Suma `delta` puntos a un equipo sin volver a agregar su plantilla"""
+        if not equipo_id or not delta:
+            return
+        actualizadas = cls.objects.filter(equipo_id=equipo_id).update(
+            puntos_totales=F('puntos_totales') + delta,
+            fecha_actualizacion=timezone.now()
+        )
+        if not actualizadas:
+            # Equipo sin fila (datos previos a la tabla): construirla desde cero
+            cls.actualizar_equipos([equipo_id])
+            return
+        cls.reordenar_al_confirmar([equipo_id])
+
+    @classmethod
+    def reordenar_al_confirmar(cls, equipo_ids):
+        """
+        Reordena las ligas de estos equipos al confirmar la transacción en curso.
+        Varios cambios dentro de la misma transacción comparten una sola reordenación.
+        """
+        conexion = transaction.get_connection()
+        if not conexion.in_atomic_block:
+            cls.recalcular_posiciones_equipos(equipo_ids)
+            return
+
+        callback, pendientes = getattr(_reordenacion, 'pendiente', (None, None))
+        # Si la transacción (o el savepoint) se deshizo, el callback ya no está en la cola
+        if callback is None or not any(f is callback for _, f, _ in conexion.run_on_commit):
+            pendientes = set()
+
+            def callback():
+                _reordenacion.pendiente = (None, None)
+                cls.recalcular_posiciones_equipos(pendientes)
+
+            _reordenacion.pendiente = (callback, pendientes)
+            transaction.on_commit(callback)
+        pendientes.update(equipo_ids)
+
+    @classmethod
+    def recalcular_posiciones_equipos(cls, equipo_ids):
+        """Reordena las ligas a las que pertenecen los equipos indicados"""
+        cls.recalcular_posiciones(
+            cls.objects.filter(equipo_id__in=equipo_ids).values_list('liga_id', flat=True).distinct()
+        )
+
+    @classmethod
+    def registrar_jornada(cls, equipo_id, numero_jornada):
+        """Guarda la última jornada puntuada del equipo con un único UPDATE"""
+        if not equipo_id:
+            return
+        cls.objects.filter(equipo_id=equipo_id).filter(
+            Q(ultima_jornada__isnull=True) | Q(ultima_jornada__lt=numero_jornada)
+        ).update(ultima_jornada=numero_jornada)
+
+    @classmethod
+    def registrar_jornada_jugador(cls, jugador_id, numero_jornada):
+        """Como registrar_jornada, pero localiza el equipo del jugador en el mismo UPDATE"""
+        cls.objects.filter(equipo__jugadores__id=jugador_id).filter(
+            Q(ultima_jornada__isnull=True) | Q(ultima_jornada__lt=numero_jornada)
+        ).update(ultima_jornada=numero_jornada)
+
+    @classmethod
+    def registrar_jornada_equipos(cls, equipo_ids, numero_jornada):
+        """Como registrar_jornada, pero para varios equipos en el mismo UPDATE"""
+        equipo_ids = {equipo_id for equipo_id in equipo_ids if equipo_id}
+        if not equipo_ids:
+            return
+        cls.objects.filter(equipo_id__in=equipo_ids).filter(
+            Q(ultima_jornada__isnull=True) | Q(ultima_jornada__lt=numero_jornada)
+        ).update(ultima_jornada=numero_jornada)
+
+    @classmethod
+    def recalcular_posiciones(cls, liga_ids):
+        """Reasigna las posiciones escribiendo solo las filas que cambian"""
+        liga_ids = {liga_id for liga_id in liga_ids if liga_id}
+        if not liga_ids:
+            return
+
+        filas = cls.objects.filter(liga_id__in=liga_ids).order_by(
+            'liga_id', '-puntos_totales', 'equipo_id'
+        ).only('id', 'liga_id', 'posicion')
+
+        cambiadas = []
+        liga_actual, posicion = None, 0
+        for fila in filas:
+            if fila.liga_id != liga_actual:
+                liga_actual, posicion = fila.liga_id, 0
+            posicion += 1
+            if fila.posicion != posicion:
+                fila.posicion = posicion
+                cambiadas.append(fila)
+
+        cls.objects.bulk_update(cambiadas, ['posicion'])
+
+    @classmethod
+    def recalcular_todo(cls):
+        """Reconstruye la clasificación de todas las ligas"""
+        cls.actualizar_equipos(Equipo.objects.values_list('id', flat=True))
+
+class LoteMercadoLibre(models.Model):
+    """Marca del lote diario de agentes libres: una fila por día, creada al generarlo"""
+    fecha = models.DateField(unique=True)
+    jugadores = models.PositiveIntegerField(default=0)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Lote del Mercado Libre'
+        verbose_name_plural = 'Lotes del Mercado Libre'
+
+    def __str__(self):
+        return f"Lote {self.fecha} ({self.jugadores} jugadores)"
+
 class Jornada(models.Model):
     numero = models.IntegerField(unique=True)
     fecha = models.DateTimeField(auto_now_add=True)
+    fecha_inicio = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="Fecha y hora de inicio de la jornada. Las alineaciones se congelan en este momento."
+    )
+    alineaciones_congeladas = models.BooleanField(
+        default=False,
+        help_text="Indica si las alineaciones ya fueron registradas para esta jornada"
+    )
 
     def __str__(self):
         return f"Jornada {self.numero}"
@@ -228,6 +431,10 @@ class AlineacionCongelada(models.Model):
         default=0,
         help_text="Dinero ganado en esta jornada (puntos × 100.000€)"
     )
+    dinero_abonado = models.IntegerField(
+        default=0,
+        help_text="Parte de dinero_ganado ya sumada al presupuesto del equipo"
+    )
 
     class Meta:
         unique_together = ('equipo', 'jornada')
@@ -274,6 +481,7 @@ class Notificacion(models.Model):
         ('oferta_rechazada', 'Oferta Rechazada'),
         ('oferta_editada', 'Oferta Editada'),        
         ('oferta_retirada', 'Oferta Retirada'),      
+        ('jugador_retirado', 'Jugador Retirado'),
     )
     
     tipo = models.CharField(max_length=10, choices=TIPOS)
@@ -297,14 +505,60 @@ class Notificacion(models.Model):
     
     # Metadata
     fecha_creacion = models.DateTimeField(auto_now_add=True)
+    # Solo para privadas: las públicas se marcan por usuario (LecturaNotificaciones / NotificacionLeida)
     leida = models.BooleanField(default=False)
     
     class Meta:
         ordering = ['-fecha_creacion']
+        indexes = [
+            # Paginación por cursor (fecha_creacion, id) del feed de cada usuario
+            models.Index(fields=['tipo', '-fecha_creacion', '-id'], name='notif_tipo_fecha_idx'),
+            models.Index(fields=['destinatario', '-fecha_creacion', '-id'], name='notif_destinatario_fecha_idx'),
+        ]
     
     def __str__(self):
         return f"{self.tipo} - {self.titulo}"
 
+class LecturaNotificaciones(models.Model):
+    """Cursor de lectura de un usuario: las públicas creadas hasta `leidas_hasta` están leídas"""
+    usuario = models.OneToOneField(User, on_delete=models.CASCADE, related_name='lectura_notificaciones')
+    leidas_hasta = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.usuario.username} - leídas hasta {self.leidas_hasta}"
+
+class NotificacionLeida(models.Model):
+    """Pública posterior al cursor que el usuario ha marcado como leída suelta"""
+    usuario = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notificaciones_leidas')
+    notificacion = models.ForeignKey(Notificacion, on_delete=models.CASCADE, related_name='lecturas')
+    fecha_lectura = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('usuario', 'notificacion')
+
+    def __str__(self):
+        return f"{self.usuario.username} - {self.notificacion_id}"
+
+class NotificacionArchivada(models.Model):
+    """Copia compacta de una notificación que la retención ha sacado de la tabla activa"""
+    id_original = models.BigIntegerField(unique=True)
+    tipo = models.CharField(max_length=10, choices=Notificacion.TIPOS)
+    categoria = models.CharField(max_length=20, choices=Notificacion.CATEGORIAS)
+    titulo = models.CharField(max_length=200)
+    mensaje = models.TextField()
+    # Sin clave foránea: el archivo no se toca al borrar usuarios
+    destinatario_id = models.IntegerField(null=True, blank=True, db_index=True)
+    leida = models.BooleanField(default=False)
+    fecha_creacion = models.DateTimeField()
+    fecha_archivo = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Notificación Archivada'
+        verbose_name_plural = 'Notificaciones Archivadas'
+
+    def __str__(self):
+        return f"{self.tipo} - {self.titulo} (archivada)"
+
 class Oferta(models.Model):
     ESTADO_CHOICES = [
         ('pendiente', 'Pendiente'),
@@ -377,4 +631,57 @@ class Puja(models.Model):
         ordering = ['-monto', 'fecha_puja']
     
     def __str__(self):
-        return f"{self.equipo.nombre} puja ${self.monto} por {self.jugador.nombre}"
\ No newline at end of file
+        return f"{self.equipo.nombre} puja ${self.monto} por {self.jugador.nombre}"
+
+
+# ==================== CLASIFICACIÓN MATERIALIZADA ====================
+
+@receiver(post_init, sender=Jugador)
+def guardar_estado_original_jugador(sender, instance, **kwargs):
+    # __dict__ evita disparar consultas si los campos vienen diferidos
+    instance._equipo_id_original = instance.__dict__.get('equipo_id')
+    instance._puntos_originales = instance.__dict__.get('puntos_totales')
+
+@receiver(post_save, sender=Jugador)
+def actualizar_clasificacion_jugador(sender, instance, created, **kwargs):
+    equipo_anterior = None if created else instance._equipo_id_original
+    puntos_anteriores = 0 if created else (instance._puntos_originales or 0)
+    puntos_nuevos = instance.puntos_totales or 0
+
+    if equipo_anterior == instance.equipo_id:
+        ClasificacionEquipo.aplicar_delta(instance.equipo_id, puntos_nuevos - puntos_anteriores)
+    else:
+        ClasificacionEquipo.aplicar_delta(equipo_anterior, -puntos_anteriores)
+        ClasificacionEquipo.aplicar_delta(instance.equipo_id, puntos_nuevos)
+
+    instance._equipo_id_original = instance.equipo_id
+    instance._puntos_originales = puntos_nuevos
+
+@receiver(post_delete, sender=Jugador)
+def quitar_jugador_clasificacion(sender, instance, **kwargs):
+    ClasificacionEquipo.aplicar_delta(instance.equipo_id, -(instance.puntos_totales or 0))
+
+@receiver(post_save, sender=Equipo)
+def crear_clasificacion_equipo(sender, instance, created, **kwargs):
+    if created:
+        ClasificacionEquipo.actualizar_equipos([instance.id])
+
+@receiver(post_delete, sender=Equipo)
+def reordenar_clasificacion_equipo(sender, instance, **kwargs):
+    ClasificacionEquipo.recalcular_posiciones([instance.liga_id])
+
+def numero_de_jornada(jornada_id):
+    """Número de una jornada, cacheado: no cambia salvo que se edite la jornada"""
+    return cache.get_or_set(
+        f'jornada_numero:{jornada_id}',
+        lambda: Jornada.objects.filter(id=jornada_id).values_list('numero', flat=True).first()
+    )
+
+@receiver(post_save, sender=Jornada)
+@receiver(post_delete, sender=Jornada)
+def olvidar_numero_jornada(sender, instance, **kwargs):
+    cache.delete(f'jornada_numero:{instance.id}')
+
+@receiver(post_save, sender=Puntuacion)
+def registrar_jornada_clasificacion(sender, instance, **kwargs):
+    ClasificacionEquipo.registrar_jornada_jugador(instance.jugador_id, numero_de_jornada(instance.jornada_id))
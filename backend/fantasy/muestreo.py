@@ -0,0 +1,77 @@
+"""
+Muestreo aleatorio de filas sin ORDER BY RANDOM().
+
+Se sortean ids dentro del rango [min(id), max(id)] (consulta servida por la
+clave primaria) y se comprueba cuáles existen en el queryset; si el filtro
+es tan selectivo que el sorteo no encuentra suficientes filas, se recurre a
+un muestreo por reservorio recorriendo solo los ids. Con una semilla fija el
+resultado es reproducible (p. ej. el mismo lote durante todo el día).
+"""
+import hashlib
+import random
+from django.db.models import Min, Max
+from django.utils import timezone
+
+MAX_CANDIDATOS_POR_CONSULTA = 2000
+INTENTOS_POR_RANGO = 3
+
+def semilla_diaria(etiqueta, fecha=None):
+    """Semilla estable para `etiqueta` durante un día"""
+    fecha = fecha or timezone.now().date()
+    resumen = hashlib.sha256(f'{etiqueta}:{fecha.isoformat()}'.encode()).hexdigest()
+    return int(resumen[:16], 16)
+
+def muestrear_ids(queryset, n, semilla=None):
+    """Devuelve hasta `n` ids distintos del queryset, elegidos al azar"""
+    if n <= 0:
+        return []
+
+    rng = random.Random(semilla)
+    queryset = queryset.order_by()
+    limites = queryset.aggregate(minimo=Min('pk'), maximo=Max('pk'))
+    minimo, maximo = limites['minimo'], limites['maximo']
+    if minimo is None:
+        return []
+
+    rango = range(minimo, maximo + 1)
+    if len(rango) <= MAX_CANDIDATOS_POR_CONSULTA:
+        # Rango pequeño: basta con leer los ids y barajarlos
+        ids = sorted(queryset.values_list('pk', flat=True))
+        return rng.sample(ids, min(n, len(ids)))
+
+    elegidos = []
+    vistos = set()
+    densidad = 1.0
+    for _ in range(INTENTOS_POR_RANGO):
+        faltan = n - len(elegidos)
+        if faltan <= 0:
+            break
+
+        tamano = min(MAX_CANDIDATOS_POR_CONSULTA, max(int(faltan * 2 / densidad), 16))
+        candidatos = [i for i in rng.sample(rango, tamano) if i not in vistos]
+        vistos.update(candidatos)
+
+        existentes = set(queryset.filter(pk__in=candidatos).values_list('pk', flat=True))
+        elegidos.extend(i for i in candidatos if i in existentes)
+        densidad = max(len(existentes) / max(len(candidatos), 1), 0.001)
+
+    if len(elegidos) >= n:
+        return elegidos[:n]
+
+    # Filtro muy selectivo: reservorio sobre los ids (recorrido sin ordenar al azar)
+    reservorio = list(elegidos)
+    restantes = queryset.exclude(pk__in=elegidos).order_by('pk').values_list('pk', flat=True)
+    for visto, pk in enumerate(restantes.iterator(), start=len(reservorio)):
+        if len(reservorio) < n:
+            reservorio.append(pk)
+        else:
+            j = rng.randint(0, visto)
+            if j < n:
+                reservorio[j] = pk
+    return reservorio
+
+def muestra_aleatoria(queryset, n, semilla=None):
+    """Devuelve hasta `n` instancias del queryset elegidas al azar, en el orden del sorteo"""
+    ids = muestrear_ids(queryset, n, semilla)
+    por_id = queryset.in_bulk(ids)
+    return [por_id[i] for i in ids if i in por_id]
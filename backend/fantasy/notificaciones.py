@@ -0,0 +1,320 @@
+"""
+Feed de notificaciones de un usuario (públicas + privadas) paginado por cursor.
+
+El cursor es la pareja (fecha_creacion, id) de una notificación codificada en
+base64: `before` pide las anteriores a esa notificación (páginas hacia atrás)
+y `since` las posteriores (sondeo incremental). Una página se arma con dos
+ramas, públicas y privadas, cada una con el predicado del cursor y su LIMIT
+sobre su índice ((tipo, fecha_creacion, id) y (destinatario, fecha_creacion,
+id)); se mezclan ya ordenadas y se corta a `limite`. Un OR entre ambas en una
+sola consulta obligaría a ordenar todas las filas visibles; así, sin OFFSET,
+cada página cuesta lo mismo con cien notificaciones que con cien mil.
+
+Estado de lectura: las privadas llevan su propia marca `leida`; las públicas
+se comparten, así que cada usuario guarda un cursor (LecturaNotificaciones:
+leídas todas las creadas hasta `leidas_hasta`; sin cursor, hasta su fecha de
+alta) más las que ha leído sueltas después (NotificacionLeida). Marcar todas es un upsert del cursor y contar
+las públicas no leídas es un rango sobre (tipo, fecha_creacion).
+
+Contadores de no leídas en caché, por usuario (solo con NOTIFICACIONES_CONTADORES,
+que exige una caché compartida; si no, se cuenta en la BD en cada lectura): uno de
+privadas, que se ajusta tras el commit al crear o marcar notificaciones, y otro de
+públicas ligado a su `leidas_hasta`, que guarda hasta qué pública ha contado. Una
+pública nueva solo mueve la marca global de la última pública: cada usuario suma
+las posteriores en su siguiente lectura, sin recontar el resto. Si falta un
+contador se recalcula desde la BD; caducan a los NOTIFICACIONES_CONTADOR_TTL
+segundos y el mantenimiento periódico los reconcilia, así que cualquier desviación
+dura poco.
+"""
+import base64
+import heapq
+from collections import Counter
+from datetime import datetime
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import BooleanField, Case, Count, Exists, F, Max, OuterRef, Q, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.timesince import timesince
+from .models import Notificacion, LecturaNotificaciones, NotificacionLeida
+
+LIMITE_POR_DEFECTO = 20
+LIMITE_MAXIMO = 100
+CAMPOS_FEED = ('id', 'tipo', 'categoria', 'titulo', 'mensaje', 'leida', 'fecha_creacion')
+CLAVE_ULTIMA_PUBLICA = 'notificaciones:publicas:ultima'
+TAMANO_LOTE_CONTADORES = 1000
+
+def codificar_cursor(fecha_creacion, notificacion_id):
+    texto = f'{fecha_creacion.isoformat()}|{notificacion_id}'
+    return base64.urlsafe_b64encode(texto.encode()).decode().rstrip('=')
+
+def decodificar_cursor(cursor):
+    """Devuelve (fecha_creacion, id); lanza ValueError si el cursor no es válido"""
+    try:
+        relleno = '=' * (-len(cursor) % 4)
+        fecha, notificacion_id = base64.urlsafe_b64decode(cursor + relleno).decode().split('|')
+        return datetime.fromisoformat(fecha), int(notificacion_id)
+    except (TypeError, ValueError, UnicodeDecodeError):
+        raise ValueError('Cursor no válido')
+
+def leidas_hasta(usuario_id):
+    """
+    Fecha del cursor de lectura de públicas del usuario. Si nunca ha marcado
+    todas, su fecha de alta: las públicas anteriores no cuentan como pendientes.
+    """
+    return User.objects.filter(id=usuario_id).values_list(
+        Coalesce('lectura_notificaciones__leidas_hasta', 'date_joined'), flat=True
+    ).first()
+
+def publicas_no_leidas(usuario_id, hasta=None):
+    consulta = Notificacion.objects.filter(tipo='publica')
+    hasta = hasta or leidas_hasta(usuario_id)
+    if hasta:
+        consulta = consulta.filter(fecha_creacion__gt=hasta)
+    return consulta.exclude(lecturas__usuario_id=usuario_id)
+
+def privadas_no_leidas(usuario_id):
+    return Notificacion.objects.filter(destinatario_id=usuario_id, leida=False).exclude(tipo='publica')
+
+def _leida_publica(usuario_id, hasta):
+    """Expresión `leida` de una pública para el usuario: cursor de lectura + lecturas sueltas"""
+    leida_publica = Exists(NotificacionLeida.objects.filter(usuario_id=usuario_id, notificacion=OuterRef('pk')))
+    if hasta:
+        leida_publica = Q(fecha_creacion__lte=hasta) | Q(leida_publica)
+    return Case(When(leida_publica, then=Value(True)), default=Value(False), output_field=BooleanField())
+
+def _rama_feed(consulta, leida, limite, before=None, since=None):
+    """Una rama del feed: rango por cursor sobre su índice, en el orden de la página y con LIMIT"""
+    consulta = consulta.annotate(leida_usuario=leida)
+    if since:
+        fecha, notificacion_id = since
+        consulta = consulta.filter(
+            Q(fecha_creacion__gt=fecha) | Q(fecha_creacion=fecha, id__gt=notificacion_id)
+        ).order_by('fecha_creacion', 'id')
+    else:
+        if before:
+            fecha, notificacion_id = before
+            consulta = consulta.filter(
+                Q(fecha_creacion__lt=fecha) | Q(fecha_creacion=fecha, id__lt=notificacion_id)
+            )
+        consulta = consulta.order_by('-fecha_creacion', '-id')
+    campos = [campo for campo in CAMPOS_FEED if campo != 'leida']
+    return list(consulta.values(*campos, 'leida_usuario')[:limite])
+
+def feed_usuario(usuario, limite=LIMITE_POR_DEFECTO, before=None, since=None):
+    """
+    Página del feed del usuario, de la más reciente a la más antigua.
+    Con `since` devuelve las más antiguas de entre las posteriores al cursor, de modo
+    que repitiendo con `ultimo` se recorren todas las nuevas sin saltarse ninguna.
+    """
+    limite = max(1, min(int(limite), LIMITE_MAXIMO))
+    cursor = {
+        'before': decodificar_cursor(before) if before and not since else None,
+        'since': decodificar_cursor(since) if since else None,
+    }
+
+    # Una fila de más por rama indica si hay otra página
+    publicas = _rama_feed(
+        Notificacion.objects.filter(tipo='publica'),
+        _leida_publica(usuario.id, leidas_hasta(usuario.id)), limite + 1, **cursor
+    )
+    privadas = _rama_feed(
+        Notificacion.objects.filter(destinatario=usuario).exclude(tipo='publica'),
+        F('leida'), limite + 1, **cursor
+    )
+    filas = list(heapq.merge(
+        publicas, privadas,
+        key=lambda fila: (fila['fecha_creacion'], fila['id']),
+        reverse=not since
+    ))[:limite + 1]
+    hay_mas = len(filas) > limite
+    filas = filas[:limite]
+    for fila in filas:
+        fila['leida'] = fila.pop('leida_usuario')
+        fila['tiempo_desde_creacion'] = timesince(fila['fecha_creacion']) + ' atrás'
+    if since:
+        filas.reverse()
+
+    return {
+        'notificaciones': filas,
+        'hay_mas': hay_mas,
+        # Para pedir la página anterior (más antigua) con before
+        'siguiente': codificar_cursor(filas[-1]['fecha_creacion'], filas[-1]['id']) if filas and not since and hay_mas else None,
+        # Para el próximo sondeo con since
+        'ultimo': codificar_cursor(filas[0]['fecha_creacion'], filas[0]['id']) if filas else since,
+    }
+
+def marcar_todas_leidas(usuario):
+    """Marca como leídas las privadas del usuario y mueve su cursor de públicas a ahora"""
+    ahora = timezone.now()
+    with transaction.atomic():
+        privadas = privadas_no_leidas(usuario.id).update(leida=True)
+        publicas = publicas_no_leidas(usuario.id).count()
+        LecturaNotificaciones.objects.bulk_create(
+            [LecturaNotificaciones(usuario=usuario, leidas_hasta=ahora)],
+            update_conflicts=True,
+            unique_fields=['usuario'],
+            update_fields=['leidas_hasta']
+        )
+        # Las lecturas sueltas quedan cubiertas por el nuevo cursor
+        NotificacionLeida.objects.filter(usuario=usuario).delete()
+    reiniciar_no_leidas(usuario.id, ahora)
+    return privadas + publicas
+
+def marcar_leida(usuario, notificacion):
+    """Marca una notificación como leída para el usuario; devuelve False si ya lo estaba"""
+    if notificacion.tipo == 'publica':
+        hasta = leidas_hasta(usuario.id)
+        if hasta and notificacion.fecha_creacion <= hasta:
+            return False
+        _, marcada = NotificacionLeida.objects.get_or_create(usuario=usuario, notificacion=notificacion)
+    else:
+        marcada = bool(Notificacion.objects.filter(id=notificacion.id, leida=False).update(leida=True))
+    if marcada:
+        restar_no_leida(usuario.id, notificacion)
+    return marcada
+
+def contadores_activos():
+    """Los contadores en caché solo valen con una caché compartida entre procesos"""
+    return getattr(settings, 'NOTIFICACIONES_CONTADORES', False)
+
+def clave_no_leidas(usuario_id):
+    return f'notificaciones:no_leidas:{usuario_id}'
+
+def clave_leidas_hasta(usuario_id):
+    return f'notificaciones:leidas_hasta:{usuario_id}'
+
+def clave_publicas_no_leidas(usuario_id, hasta):
+    marca = hasta.timestamp() if hasta else 0
+    return f'notificaciones:no_leidas:publicas:{usuario_id}:{marca}'
+
+def _ttl_contadores():
+    return getattr(settings, 'NOTIFICACIONES_CONTADOR_TTL', 300)
+
+def _ultima_publica_bd():
+    return Notificacion.objects.filter(tipo='publica').aggregate(ultima=Max('id'))['ultima'] or 0
+
+def _ultima_publica():
+    """Id de la pública más reciente; solo crece, así que no invalida ningún contador"""
+    ultima = cache.get(CLAVE_ULTIMA_PUBLICA)
+    if ultima is None:
+        ultima = _ultima_publica_bd()
+        cache.add(CLAVE_ULTIMA_PUBLICA, ultima, None)
+    return ultima
+
+def _leidas_hasta_cacheado(usuario_id):
+    clave = clave_leidas_hasta(usuario_id)
+    hasta = cache.get(clave)
+    if hasta is None:
+        hasta = leidas_hasta(usuario_id)
+        cache.add(clave, hasta, _ttl_contadores())
+    return hasta
+
+def _contar_publicas(usuario_id):
+    """
+    Contador de públicas del usuario, ligado a su cursor de lectura. Guarda el total
+    y hasta qué pública llega; si se han creado más, solo cuenta las posteriores.
+    """
+    hasta = _leidas_hasta_cacheado(usuario_id)
+    clave = clave_publicas_no_leidas(usuario_id, hasta)
+    ultima = _ultima_publica()
+    contada, total = cache.get(clave, (0, None))
+    if total is not None and contada >= ultima:
+        return total
+
+    pendientes = publicas_no_leidas(usuario_id, hasta).filter(id__lte=ultima)
+    if total is None:
+        total = pendientes.count()
+    else:
+        total += pendientes.filter(id__gt=contada).count()
+    cache.set(clave, (ultima, total), _ttl_contadores())
+    return total
+
+def contar_no_leidas(usuario_id):
+    """Públicas + privadas no leídas; con contadores solo consulta la BD si falta alguno"""
+    if not contadores_activos():
+        return publicas_no_leidas(usuario_id).count() + privadas_no_leidas(usuario_id).count()
+
+    clave_privadas = clave_no_leidas(usuario_id)
+    privadas = cache.get(clave_privadas)
+    if privadas is None:
+        privadas = privadas_no_leidas(usuario_id).count()
+        # add y no set: no pisar un contador que otro proceso acabe de guardar o ajustar
+        cache.add(clave_privadas, privadas, _ttl_contadores())
+
+    return _contar_publicas(usuario_id) + privadas
+
+def _ajustar_contador(clave, delta):
+    try:
+        if cache.incr(clave, delta) < 0:
+            cache.delete(clave)
+    except ValueError:
+        # Contador no cacheado: se recalculará desde la BD en la próxima lectura
+        pass
+
+def sumar_no_leidas(notificaciones):
+    """Cuenta las notificaciones recién creadas cuando se confirme la transacción"""
+    if not contadores_activos():
+        return
+    nueva_publica = max((n.id or 0 for n in notificaciones if n.tipo == 'publica'), default=0)
+    privadas = Counter(clave_no_leidas(n.destinatario_id) for n in notificaciones if n.tipo != 'publica' and not n.leida)
+
+    def ajustar():
+        if nueva_publica > _ultima_publica():
+            cache.set(CLAVE_ULTIMA_PUBLICA, nueva_publica, None)
+        for clave, delta in privadas.items():
+            _ajustar_contador(clave, delta)
+    transaction.on_commit(ajustar)
+
+def restar_no_leida(usuario_id, notificacion):
+    """Descuenta del contador del usuario una notificación que acaba de leer"""
+    if not contadores_activos():
+        return
+
+    def ajustar():
+        if notificacion.tipo == 'publica':
+            # Se recuenta en la próxima lectura, solo para este usuario
+            cache.delete(clave_publicas_no_leidas(usuario_id, _leidas_hasta_cacheado(usuario_id)))
+        else:
+            _ajustar_contador(clave_no_leidas(usuario_id), -1)
+    transaction.on_commit(ajustar)
+
+def reiniciar_no_leidas(usuario_id, hasta):
+    """Tras marcar todas como leídas el usuario no tiene ninguna pendiente"""
+    if not contadores_activos():
+        return
+    transaction.on_commit(lambda: cache.set_many({
+        clave_leidas_hasta(usuario_id): hasta,
+        clave_publicas_no_leidas(usuario_id, hasta): (_ultima_publica(), 0),
+        clave_no_leidas(usuario_id): 0,
+    }, _ttl_contadores()))
+
+def reconciliar_contadores(tamano_lote=TAMANO_LOTE_CONTADORES):
+    """
+    Recalcula desde la BD los contadores de privadas cacheados (una consulta
+    agrupada) y corrige los desviados. La marca de la última pública se vuelve a
+    leer de la BD. Los usuarios sin contador en caché no se tocan: ya se
+    calcularán cuando los pidan.
+    """
+    informe = {'revisados': 0, 'corregidos': 0}
+    if not contadores_activos():
+        return informe
+
+    cache.set(CLAVE_ULTIMA_PUBLICA, _ultima_publica_bd(), None)
+    privadas = dict(
+        Notificacion.objects.filter(destinatario__isnull=False, leida=False).exclude(tipo='publica')
+        .values('destinatario_id').annotate(total=Count('id')).values_list('destinatario_id', 'total')
+    )
+
+    usuario_ids = list(User.objects.order_by('id').values_list('id', flat=True))
+    for inicio in range(0, len(usuario_ids), tamano_lote):
+        claves = {clave_no_leidas(u): privadas.get(u, 0) for u in usuario_ids[inicio:inicio + tamano_lote]}
+        cacheados = cache.get_many(list(claves))
+        corregir = {clave: claves[clave] for clave, valor in cacheados.items() if valor != claves[clave]}
+        if corregir:
+            cache.set_many(corregir, _ttl_contadores())
+        informe['revisados'] += len(cacheados)
+        informe['corregidos'] += len(corregir)
+    return informe
@@ -0,0 +1,14 @@
+"""
+Valoración de jugadores.
+
+El valor de mercado depende solo de los puntos acumulados. La misma función
+sirve para enteros y para expresiones de base de datos (F, Subquery...), de
+modo que los cálculos en Python y los UPDATE masivos usan la misma fórmula.
+"""
+
+VALOR_BASE = 5000000
+VALOR_POR_PUNTO = 100000
+
+def calcular_valor(puntos_totales):
+    """Valor de mercado para unos puntos totales (entero o expresión de consulta)"""
+    return VALOR_BASE + puntos_totales * VALOR_POR_PUNTO
@@ -0,0 +1,159 @@
+"""
+Carga de puntuaciones por partido o jornada completa.
+
+Las puntuaciones llegan en un solo payload, se insertan o actualizan con un
+único bulk_create(update_conflicts=True) y los totales de los jugadores
+afectados (puntos, goles y valor) se recalculan con un único UPDATE que
+agrega sus puntuaciones en subconsultas.
+
+Las ediciones sueltas mantienen los totales por diferencia; reconciliar_totales
+los reconstruye desde cero e informa de las desviaciones encontradas.
+"""
+import time
+from django.db import transaction
+from django.db.models import IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from .models import Jugador, Puntuacion, ClasificacionEquipo
+from .precios import calcular_valor
+
+def _total_por_jugador(campo):
+    """Subconsulta con la suma de `campo` de las puntuaciones del jugador"""
+    return Coalesce(Subquery(
+        Puntuacion.objects.filter(jugador=OuterRef('pk')).order_by().values('jugador').annotate(
+            total=Sum(campo)
+        ).values('total'),
+        output_field=IntegerField()
+    ), Value(0))
+
+def recalcular_totales(jugador_ids):
+    """Recalcula puntos_totales, goles y valor de los jugadores indicados en un solo UPDATE"""
+    jugador_ids = set(jugador_ids)
+    if not jugador_ids:
+        return 0
+    puntos = _total_por_jugador('puntos')
+    return Jugador.objects.filter(id__in=jugador_ids).update(
+        puntos_totales=puntos,
+        goles=_total_por_jugador('goles'),
+        valor=calcular_valor(puntos)
+    )
+
+def validar_filas(filas):
+    """Normaliza el payload a {jugador_id: (puntos, goles)}; lanza ValueError si no es válido"""
+    if not isinstance(filas, list) or not filas:
+        raise ValueError('Se requiere una lista de puntuaciones')
+    puntuaciones = {}
+    for fila in filas:
+        try:
+            jugador_id = int(fila['jugador_id'])
+            puntos = int(fila['puntos'])
+            goles = int(fila.get('goles') or 0)
+        except (KeyError, TypeError, ValueError, AttributeError):
+            raise ValueError(f'Puntuación no válida: {fila}')
+        if goles < 0:
+            raise ValueError(f'Los goles no pueden ser negativos (jugador {jugador_id})')
+        if jugador_id in puntuaciones:
+            raise ValueError(f'Jugador {jugador_id} repetido en el payload')
+        puntuaciones[jugador_id] = (puntos, goles)
+    return puntuaciones
+
+def importar_puntuaciones(jornada, filas, equipos_reales=None):
+    """
+    Guarda de una vez las puntuaciones de una jornada y actualiza los totales de los jugadores.
+    Si se indican equipos_reales (los de un partido), solo se aceptan jugadores de esos equipos.
+    """
+    puntuaciones = validar_filas(filas)
+
+    jugadores = Jugador.objects.filter(id__in=puntuaciones.keys())
+    if equipos_reales is not None:
+        jugadores = jugadores.filter(equipo_real__in=equipos_reales)
+    equipos_por_jugador = dict(jugadores.values_list('id', 'equipo_id'))
+
+    desconocidos = sorted(set(puntuaciones) - set(equipos_por_jugador))
+    if desconocidos:
+        raise ValueError(f'Jugadores no válidos para esta carga: {desconocidos}')
+
+    with transaction.atomic():
+        Puntuacion.objects.bulk_create(
+            [
+                Puntuacion(jugador_id=jugador_id, jornada=jornada, puntos=puntos, goles=goles)
+                for jugador_id, (puntos, goles) in puntuaciones.items()
+            ],
+            update_conflicts=True,
+            unique_fields=['jugador', 'jornada'],
+            update_fields=['puntos', 'goles']
+        )
+        recalcular_totales(puntuaciones.keys())
+
+        # bulk_create y update() no disparan señales: se actualiza la clasificación a mano
+        equipo_ids = {equipo_id for equipo_id in equipos_por_jugador.values() if equipo_id}
+        ClasificacionEquipo.actualizar_equipos(equipo_ids)
+        ClasificacionEquipo.registrar_jornada_equipos(equipo_ids, jornada.numero)
+
+    print(f"📊 Jornada {jornada.numero}: {len(puntuaciones)} puntuaciones importadas")
+    return {
+        'jornada': jornada.numero,
+        'puntuaciones': len(puntuaciones),
+        'equipos_afectados': len(equipo_ids),
+    }
+
+TAMANO_LOTE_RECONCILIACION = 1000
+
+def reconciliar_totales(aplicar=True, revalorar=False, tamano_lote=TAMANO_LOTE_RECONCILIACION):
+    """
+    Reconstruye puntos_totales y goles de todos los jugadores a partir de sus puntuaciones.
+    Solo escribe los jugadores desviados (con revalorar, también su valor) y devuelve un
+    informe de las desviaciones. Con aplicar=False no escribe nada.
+    """
+    inicio = time.monotonic()
+    jugadores = Jugador.objects.annotate(
+        puntos_reales=_total_por_jugador('puntos'),
+        goles_reales=_total_por_jugador('goles')
+    ).only('id', 'nombre', 'equipo_id', 'puntos_totales', 'goles', 'valor').order_by('id')
+    campos = ['puntos_totales', 'goles'] + (['valor'] if revalorar else [])
+
+    informe = {
+        'revisados': 0, 'desviados': 0, 'corregidos': 0,
+        'desviacion_puntos': 0, 'desviacion_goles': 0, 'ejemplos': [],
+    }
+    pendientes, equipo_ids = [], set()
+
+    for jugador in jugadores.iterator(chunk_size=tamano_lote):
+        informe['revisados'] += 1
+        valor_real = calcular_valor(jugador.puntos_reales)
+        if (jugador.puntos_totales == jugador.puntos_reales and jugador.goles == jugador.goles_reales
+                and (not revalorar or jugador.valor == valor_real)):
+            continue
+
+        informe['desviados'] += 1
+        informe['desviacion_puntos'] += abs(jugador.puntos_totales - jugador.puntos_reales)
+        informe['desviacion_goles'] += abs(jugador.goles - jugador.goles_reales)
+        if len(informe['ejemplos']) < 10:
+            informe['ejemplos'].append({
+                'jugador_id': jugador.id,
+                'nombre': jugador.nombre,
+                'puntos_guardados': jugador.puntos_totales,
+                'puntos_reales': jugador.puntos_reales,
+            })
+        if not aplicar:
+            continue
+
+        if jugador.puntos_totales != jugador.puntos_reales and jugador.equipo_id:
+            equipo_ids.add(jugador.equipo_id)
+        jugador.puntos_totales = jugador.puntos_reales
+        jugador.goles = jugador.goles_reales
+        jugador.valor = valor_real
+        pendientes.append(jugador)
+        if len(pendientes) >= tamano_lote:
+            Jugador.objects.bulk_update(pendientes, campos)
+            informe['corregidos'] += len(pendientes)
+            pendientes = []
+
+    if pendientes:
+        Jugador.objects.bulk_update(pendientes, campos)
+        informe['corregidos'] += len(pendientes)
+    # bulk_update no dispara señales: la clasificación se rehace para los equipos tocados
+    ClasificacionEquipo.actualizar_equipos(equipo_ids)
+
+    informe['equipos_afectados'] = len(equipo_ids)
+    informe['duracion_segundos'] = round(time.monotonic() - inicio, 3)
+    return informe
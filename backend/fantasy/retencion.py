@@ -0,0 +1,115 @@
+"""
+Retención de notificaciones: saca de la tabla activa lo que ya no se consulta.
+
+Se archivan (en NotificacionArchivada o en un fichero JSONL):
+    - las privadas leídas y las públicas con más de NOTIFICACIONES_RETENCION_DIAS
+      días (las públicas no tienen marca propia: caducan por antigüedad);
+    - las privadas que quedan fuera de las NOTIFICACIONES_MAXIMO_POR_USUARIO
+      más recientes de cada usuario, leídas o no, para acotar la tabla.
+
+Se mueve por lotes de ids, cada uno en su transacción (copia + DELETE), así que
+no hay bloqueos largos y un fallo a medias se puede reanudar: el archivo
+ignora las notificaciones que ya tenga. Al final se reconcilian los
+contadores de no leídas.
+"""
+import json
+import time
+from collections import Counter
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+from .models import Notificacion, NotificacionArchivada
+from .notificaciones import reconciliar_contadores
+
+TAMANO_LOTE_RETENCION = 1000
+CAMPOS_ARCHIVO = ('id', 'tipo', 'categoria', 'titulo', 'mensaje', 'destinatario_id', 'leida', 'fecha_creacion')
+
+def ids_antiguas(dias):
+    """Ids de las públicas y las privadas leídas creadas hace más de `dias` días"""
+    limite = timezone.now() - timedelta(days=dias)
+    return list(Notificacion.objects.filter(
+        Q(tipo='publica') | Q(leida=True),
+        fecha_creacion__lt=limite
+    ).order_by('id').values_list('id', flat=True))
+
+def ids_fuera_de_ventana(maximo_por_usuario):
+    """Ids de las privadas de cada usuario que no están entre sus `maximo_por_usuario` más recientes"""
+    return list(Notificacion.objects.filter(destinatario__isnull=False).exclude(tipo='publica').annotate(
+        orden=Window(
+            RowNumber(),
+            partition_by=[F('destinatario_id')],
+            order_by=[F('fecha_creacion').desc(), F('id').desc()]
+        )
+    ).filter(orden__gt=maximo_por_usuario).order_by('id').values_list('id', flat=True))
+
+def _archivar_en_tabla(filas):
+    NotificacionArchivada.objects.bulk_create([
+        NotificacionArchivada(
+            id_original=fila['id'],
+            tipo=fila['tipo'],
+            categoria=fila['categoria'],
+            titulo=fila['titulo'],
+            mensaje=fila['mensaje'],
+            destinatario_id=fila['destinatario_id'],
+            leida=fila['leida'],
+            fecha_creacion=fila['fecha_creacion']
+        ) for fila in filas
+    ], ignore_conflicts=True)
+
+def _archivar_en_fichero(filas, fichero):
+    for fila in filas:
+        fichero.write(json.dumps({**fila, 'fecha_creacion': fila['fecha_creacion'].isoformat()}, ensure_ascii=False) + '\n')
+    fichero.flush()
+
+def archivar_notificaciones(dias=None, maximo_por_usuario=None, tamano_lote=TAMANO_LOTE_RETENCION,
+                            ruta_jsonl=None, aplicar=True):
+    """
+    Archiva las notificaciones caducadas y las que exceden la ventana por usuario.
+    Con `ruta_jsonl` se añaden a ese fichero en lugar de a la tabla de archivo;
+    con aplicar=False solo informa de lo que se movería.
+    """
+    inicio = time.monotonic()
+    dias = settings.NOTIFICACIONES_RETENCION_DIAS if dias is None else dias
+    maximo_por_usuario = settings.NOTIFICACIONES_MAXIMO_POR_USUARIO if maximo_por_usuario is None else maximo_por_usuario
+
+    antiguas = ids_antiguas(dias)
+    fuera_de_ventana = sorted(set(ids_fuera_de_ventana(maximo_por_usuario)) - set(antiguas))
+    ids = sorted(antiguas + fuera_de_ventana)
+
+    informe = {
+        'antiguas': len(antiguas),
+        'fuera_de_ventana': len(fuera_de_ventana),
+        'archivadas': 0,
+        'por_categoria': {},
+        'lotes': 0,
+        'destino': ruta_jsonl or 'tabla',
+    }
+    if aplicar and ids:
+        por_categoria = Counter()
+        fichero = open(ruta_jsonl, 'a', encoding='utf-8') if ruta_jsonl else None
+        try:
+            for desde in range(0, len(ids), tamano_lote):
+                lote = ids[desde:desde + tamano_lote]
+                with transaction.atomic():
+                    filas = list(Notificacion.objects.filter(id__in=lote).values(*CAMPOS_ARCHIVO))
+                    if fichero:
+                        _archivar_en_fichero(filas, fichero)
+                    else:
+                        _archivar_en_tabla(filas)
+                    Notificacion.objects.filter(id__in=[fila['id'] for fila in filas]).delete()
+                por_categoria.update(fila['categoria'] for fila in filas)
+                informe['archivadas'] += len(filas)
+                informe['lotes'] += 1
+        finally:
+            if fichero:
+                fichero.close()
+        informe['por_categoria'] = dict(por_categoria)
+        # Se han podido archivar no leídas: los contadores cacheados ya no valen
+        reconciliar_contadores()
+
+    informe['restantes'] = Notificacion.objects.count()
+    informe['duracion_segundos'] = round(time.monotonic() - inicio, 3)
+    return informe
@@ -1,6 +1,11 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
-from .models import Liga, Jugador, Equipo, Jornada, Puntuacion, EquipoReal, Partido, Oferta, Puja, Notificacion, AlineacionCongelada
+from datetime import timedelta
+from django.db.models import Prefetch
+from .models import (
+    Liga, Jugador, Equipo, Jornada, Puntuacion, EquipoReal, Partido, Oferta, Puja,
+    Notificacion, AlineacionCongelada, ClasificacionEquipo
+)
 
 class LigaSerializer(serializers.ModelSerializer):
     class Meta:
@@ -15,6 +20,31 @@ class PuntuacionJornadaSerializer(serializers.ModelSerializer):
         model = Puntuacion
         fields = ['jornada_id', 'jornada_numero', 'puntos','goles']
 
+def puntuaciones_prefetch():
+    """Prefetch de las puntuaciones por jornada en el atributo `puntuaciones_prefetched`"""
+    return Prefetch(
+        'puntuacion_set',
+        queryset=Puntuacion.objects.select_related('jornada').order_by('jornada__numero'),
+        to_attr='puntuaciones_prefetched'
+    )
+
+def jugadores_con_puntuaciones(queryset=None):
+    """
+    Prepara un queryset de jugadores para serializarlo sin consultas por jugador:
+    relaciones en un JOIN y todas las puntuaciones en una única consulta extra.
+    """
+    if queryset is None:
+        queryset = Jugador.objects.all()
+    return queryset.select_related(
+        'equipo', 'equipo__usuario', 'equipo_real'
+    ).prefetch_related(puntuaciones_prefetch())
+
+def obtener_puntuaciones(jugador):
+    """Puntuaciones del jugador, usando las prefetched si están disponibles"""
+    if hasattr(jugador, 'puntuaciones_prefetched'):
+        return jugador.puntuaciones_prefetched
+    return Puntuacion.objects.filter(jugador=jugador).select_related('jornada').order_by('jornada__numero')
+
 class JugadorSerializer(serializers.ModelSerializer):
     equipo_nombre = serializers.CharField(source='equipo.nombre', read_only=True)
     usuario_vendedor = serializers.CharField(source='equipo.usuario.username', read_only=True)
@@ -30,7 +60,7 @@ class JugadorSerializer(serializers.ModelSerializer):
 
     def get_puntuaciones_jornadas(self, obj):
         # Obtener las puntuaciones del jugador por jornada
-        puntuaciones = Puntuacion.objects.filter(jugador=obj).select_related('jornada')
+        puntuaciones = obtener_puntuaciones(obj)
         return PuntuacionJornadaSerializer(puntuaciones, many=True).data
 
 class JugadorDetailSerializer(serializers.ModelSerializer):
@@ -45,7 +75,7 @@ class JugadorDetailSerializer(serializers.ModelSerializer):
 
     def get_puntuaciones_jornadas(self, obj):
         # Obtener las puntuaciones del jugador por jornada
-        puntuaciones = Puntuacion.objects.filter(jugador=obj).select_related('jornada')
+        puntuaciones = obtener_puntuaciones(obj)
         return PuntuacionJornadaSerializer(puntuaciones, many=True).data
 
 class PuntuacionSerializer(serializers.ModelSerializer):
@@ -56,30 +86,55 @@ class PuntuacionSerializer(serializers.ModelSerializer):
         model = Puntuacion
         fields = ['id', 'jugador', 'jugador_nombre', 'jornada', 'jornada_numero', 'puntos']
 
+def equipos_con_plantilla(queryset=None):
+    """Prepara un queryset de equipos con la plantilla y sus puntuaciones precargadas"""
+    if queryset is None:
+        queryset = Equipo.objects.all()
+    return queryset.select_related('usuario', 'liga').prefetch_related(
+        Prefetch('jugadores', queryset=jugadores_con_puntuaciones())
+    )
+
 class EquipoSerializer(serializers.ModelSerializer):
     usuario_username = serializers.CharField(source='usuario.username', read_only=True)
     liga_nombre = serializers.CharField(source='liga.nombre', read_only=True)
-    jugadores = JugadorSerializer(many=True, read_only=True)
-    jugadores_campo = serializers.SerializerMethodField()
-    jugadores_banquillo = serializers.SerializerMethodField() 
     
     class Meta:
         model = Equipo
         fields = [
             'id', 'nombre', 'usuario', 'usuario_username', 'liga', 'liga_nombre', 
-            'presupuesto', 'puntos_totales', 'jugadores',
-            'jugadores_campo', 'jugadores_banquillo'
+            'presupuesto', 'puntos_totales'
         ]
     
-    def get_jugadores_campo(self, obj):
-        """Jugadores en el campo (no en banquillo)"""
-        jugadores_campo = obj.jugadores.filter(en_banquillo=False)
-        return JugadorSerializer(jugadores_campo, many=True).data
-    
-    def get_jugadores_banquillo(self, obj):
-        """Jugadores en el banquillo"""
-        jugadores_banquillo = obj.jugadores.filter(en_banquillo=True)
-        return JugadorSerializer(jugadores_banquillo, many=True).data
+    def to_representation(self, instance):
+        """
+        Serializa la plantilla una sola vez y reparte campo/banquillo en memoria
+        reutilizando los mismos dicts (jugadores, jugadores_campo, jugadores_banquillo)
+        """
+        data = super().to_representation(instance)
+        
+        if 'jugadores' in getattr(instance, '_prefetched_objects_cache', {}):
+            jugadores = instance.jugadores.all()
+        else:
+            jugadores = jugadores_con_puntuaciones(instance.jugadores.all())
+        
+        jugadores_data = JugadorSerializer(jugadores, many=True).data
+        data['jugadores'] = jugadores_data
+        data['jugadores_campo'] = [j for j in jugadores_data if not j['en_banquillo']]
+        data['jugadores_banquillo'] = [j for j in jugadores_data if j['en_banquillo']]
+        return data
+
+class ClasificacionEquipoSerializer(serializers.ModelSerializer):
+    equipo_id = serializers.IntegerField(source='equipo.id', read_only=True)
+    nombre = serializers.CharField(source='equipo.nombre', read_only=True)
+    usuario = serializers.CharField(source='equipo.usuario.username', read_only=True)
+    presupuesto = serializers.IntegerField(source='equipo.presupuesto', read_only=True)
+
+    class Meta:
+        model = ClasificacionEquipo
+        fields = [
+            'equipo_id', 'nombre', 'usuario', 'puntos_totales',
+            'presupuesto', 'posicion', 'ultima_jornada'
+        ]
 
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
@@ -125,7 +180,8 @@ class JornadaSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Jornada
-        fields = ['id', 'numero', 'fecha', 'partidos_count']
+        fields = ['id', 'numero', 'fecha', 'fecha_inicio', 'alineaciones_congeladas', 'partidos_count']
+        read_only_fields = ['alineaciones_congeladas']
     
     def get_partidos_count(self, obj):
         return obj.partidos.count()
@@ -258,7 +314,7 @@ class AlineacionCongeladaSerializer(serializers.ModelSerializer):
     
     def get_jugadores_titulares_info(self, obj):
         return JugadorSerializer(
-            obj.jugadores_titulares.all(), 
+            jugadores_con_puntuaciones(obj.jugadores_titulares.all()),
             many=True
         ).data
     
@@ -292,17 +348,14 @@ class JugadorMercadoSerializer(serializers.ModelSerializer):
         ]
     
     def get_expirado(self, obj):
-        return obj.expirado
+        ahora = self.context.get('ahora')
+        if ahora is None or not obj.fecha_mercado:
+            return obj.expirado
+        return ahora > obj.fecha_mercado + timedelta(hours=24)
 
     def get_puntuaciones_jornadas(self, obj):
         try:
-            # 🆕 CORRECCIÓN: Usar el atributo prefetched o hacer la consulta
-            if hasattr(obj, 'puntuaciones_prefetched'):
-                puntuaciones = obj.puntuaciones_prefetched
-            else:
-                # Fallback si no hay prefetch
-                puntuaciones = Puntuacion.objects.filter(jugador=obj).select_related('jornada').order_by('jornada__numero')
-            
+            puntuaciones = obtener_puntuaciones(obj)
             return PuntuacionJornadaSerializer(puntuaciones, many=True).data
         except Exception as e:
             print(f"❌ Error en get_puntuaciones_jornadas para {obj.nombre}: {e}")
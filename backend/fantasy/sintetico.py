@@ -0,0 +1,254 @@
+"""
+Generador de un mundo sintético a escala de producción para pruebas de carga.
+
+Crea ligas, usuarios con su equipo fantasy, equipos reales, jugadores,
+jornadas con partidos, puntuaciones, pujas, ofertas y notificaciones usando
+solo inserciones por lotes. Con la misma semilla el resultado es siempre el
+mismo, de modo que dos ejecuciones se pueden comparar.
+
+Las puntuaciones de cada jugador salen de un generador propio sembrado con la
+semilla y el índice del jugador: así los totales se calculan antes de insertar
+los jugadores y las puntuaciones se vuelven a generar después en streaming,
+sin tener toda la temporada en memoria.
+"""
+import random
+import time
+from datetime import timedelta
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+from .carga_datos import en_lotes
+from .models import (
+    Liga, Equipo, EquipoReal, Jugador, Jornada, Partido, Puntuacion,
+    Puja, Oferta, Notificacion, ClasificacionEquipo
+)
+from .precios import calcular_valor
+
+TAMANO_LOTE = 5000
+PREFIJO = 'sint'
+FORMACION_TITULAR = ['POR', 'DEF', 'DEF', 'DEL', 'DEL']
+POSICIONES_BANQUILLO = ['DEF', 'DEL', 'POR']
+PROBABILIDAD_GOL = {'POR': 0.01, 'DEF': 0.08, 'DEL': 0.25}
+
+def puntuaciones_jugador(semilla, indice, posicion, jornadas):
+    """Lista determinista de (puntos, goles) por jornada para un jugador"""
+    rng = random.Random(semilla * 1000003 + indice)
+    resultado = []
+    for _ in range(jornadas):
+        goles = sum(1 for _ in range(3) if rng.random() < PROBABILIDAD_GOL[posicion])
+        resultado.append((rng.randint(-1, 8) + goles * 2, goles))
+    return resultado
+
+def _emparejamientos(equipos, jornada):
+    """Partidos de una jornada por el método del círculo (todos contra todos)"""
+    equipos = list(equipos)
+    if len(equipos) % 2:
+        equipos.append(None)
+    giro = jornada % (len(equipos) - 1) if len(equipos) > 1 else 0
+    rotados = [equipos[0]] + equipos[1:][giro:] + equipos[1:][:giro]
+    mitad = len(rotados) // 2
+    return [
+        (local, visitante)
+        for local, visitante in zip(rotados[:mitad], reversed(rotados[mitad:]))
+        if local is not None and visitante is not None
+    ]
+
+def limpiar_mundo(prefijo=PREFIJO):
+    """Borra los datos generados antes con el mismo prefijo"""
+    with transaction.atomic():
+        jugadores = Jugador.objects.filter(equipo_real__nombre__startswith=f'{prefijo} ')
+        # Soltar a los jugadores antes de borrar: así las señales de borrado no tocan la clasificación
+        jugadores.update(equipo=None, equipo_pujador=None)
+        Liga.objects.filter(codigo__startswith=f'{prefijo.upper()}-').delete()
+        User.objects.filter(username__startswith=f'{prefijo}_').delete()
+        EquipoReal.objects.filter(nombre__startswith=f'{prefijo} ').delete()
+
+def generar_mundo(ligas=1, equipos=20, equipos_reales=12, jugadores_por_equipo=7, jugadores_libres=200,
+                  jornadas=10, pujas=100, ofertas=100, notificaciones=1000, semilla=42,
+                  prefijo=PREFIJO, tamano_lote=TAMANO_LOTE):
+    """
+    Genera un mundo sintético completo y devuelve un informe con las filas creadas
+    y el tiempo de cada fase. Falla si ya existen datos con el mismo prefijo.
+    """
+    if Liga.objects.filter(codigo__startswith=f'{prefijo.upper()}-').exists():
+        raise ValueError(f'Ya existe un mundo sintético con el prefijo "{prefijo}" (usa limpiar_mundo)')
+    if equipos_reales < 2 or ligas < 1:
+        raise ValueError('Se necesitan al menos 2 equipos reales y 1 liga')
+
+    rng = random.Random(semilla)
+    ahora = timezone.now()
+    informe = {'filas': {}, 'segundos': {}}
+    inicio_total = time.monotonic()
+
+    def fase(nombre, filas, inicio):
+        informe['filas'][nombre] = filas
+        informe['segundos'][nombre] = round(time.monotonic() - inicio, 3)
+        print(f"🧪 {nombre}: {filas} filas en {informe['segundos'][nombre]}s")
+
+    with transaction.atomic():
+        # Ligas, usuarios y equipos fantasy
+        inicio = time.monotonic()
+        objetos_liga = Liga.objects.bulk_create([
+            Liga(nombre=f'Liga sintética {i}', codigo=f'{prefijo.upper()}-{i:05d}') for i in range(ligas)
+        ])
+        fase('ligas', len(objetos_liga), inicio)
+
+        inicio = time.monotonic()
+        # Un único hash para todos: hashear cada contraseña dominaría el tiempo total
+        password = make_password(f'{prefijo}-password')
+        usuarios = User.objects.bulk_create(
+            [User(username=f'{prefijo}_{i}', password=password) for i in range(equipos)],
+            batch_size=tamano_lote
+        )
+        objetos_equipo = Equipo.objects.bulk_create([
+            Equipo(usuario=usuario, liga=objetos_liga[i % ligas], nombre=f'Equipo sintético {i}')
+            for i, usuario in enumerate(usuarios)
+        ], batch_size=tamano_lote)
+        fase('equipos', len(objetos_equipo), inicio)
+
+        # Equipos reales y jugadores (con sus totales ya calculados)
+        inicio = time.monotonic()
+        reales = EquipoReal.objects.bulk_create([
+            EquipoReal(nombre=f'{prefijo} Real {i}') for i in range(equipos_reales)
+        ])
+        jugadores = []
+        for equipo in objetos_equipo:
+            posiciones = FORMACION_TITULAR + [
+                POSICIONES_BANQUILLO[i % len(POSICIONES_BANQUILLO)]
+                for i in range(max(jugadores_por_equipo - len(FORMACION_TITULAR), 0))
+            ]
+            for orden, posicion in enumerate(posiciones[:jugadores_por_equipo]):
+                jugadores.append(Jugador(
+                    nombre=f'Jugador {len(jugadores)}', posicion=posicion, equipo=equipo,
+                    en_banquillo=orden >= len(FORMACION_TITULAR),
+                    fecha_fichaje=ahora - timedelta(days=rng.randint(1, 120))
+                ))
+        for _ in range(jugadores_libres):
+            jugadores.append(Jugador(
+                nombre=f'Jugador {len(jugadores)}', posicion=rng.choice(['POR', 'DEF', 'DEF', 'DEL', 'DEL'])
+            ))
+
+        for indice, jugador in enumerate(jugadores):
+            jugador.equipo_real = reales[indice % equipos_reales]
+            historial = puntuaciones_jugador(semilla, indice, jugador.posicion, jornadas)
+            jugador.puntos_totales = sum(puntos for puntos, _ in historial)
+            jugador.goles = sum(goles for _, goles in historial)
+            jugador.valor = calcular_valor(jugador.puntos_totales)
+
+        # Mercado: una parte de los libres y de los de equipo, en venta en las últimas 24 h
+        libres = [jugador for jugador in jugadores if jugador.equipo is None]
+        suplentes = [jugador for jugador in jugadores if jugador.equipo is not None and jugador.en_banquillo]
+        en_venta = libres[:len(libres) // 2] + rng.sample(suplentes, k=min(len(suplentes), len(objetos_equipo) // 4))
+        for jugador in en_venta:
+            jugador.en_venta = True
+            jugador.fecha_mercado = ahora - timedelta(minutes=rng.randint(1, 23 * 60))
+            jugador.precio_venta = jugador.valor
+
+        # Pujas: se deciden antes de insertar para dejar la puja actual en el propio jugador
+        pujas_decididas = []
+        if en_venta and objetos_equipo:
+            for _ in range(pujas):
+                jugador = rng.choice(en_venta)
+                equipo = rng.choice(objetos_equipo)
+                if equipo is jugador.equipo:
+                    continue
+                monto = max(jugador.puja_actual or jugador.valor, jugador.valor) + rng.randint(1, 20) * 100000
+                jugador.puja_actual = monto
+                jugador.equipo_pujador = equipo
+                pujas_decididas.append((jugador, equipo, monto))
+
+        Jugador.objects.bulk_create(jugadores, batch_size=tamano_lote)
+        fase('jugadores', len(jugadores), inicio)
+
+        inicio = time.monotonic()
+        mejores = {}
+        objetos_puja = []
+        for jugador, equipo, monto in pujas_decididas:
+            puja = Puja(jugador=jugador, equipo=equipo, monto=monto)
+            objetos_puja.append(puja)
+            mejores[jugador.id] = puja
+        for puja in mejores.values():
+            puja.es_ganadora = True
+        Puja.objects.bulk_create(objetos_puja, batch_size=tamano_lote)
+
+        objetos_oferta = []
+        con_equipo = [jugador for jugador in jugadores if jugador.equipo is not None]
+        equipos_por_liga = {}
+        for equipo in objetos_equipo:
+            equipos_por_liga.setdefault(equipo.liga_id, []).append(equipo)
+        for _ in range(ofertas if con_equipo else 0):
+            jugador = rng.choice(con_equipo)
+            rivales = equipos_por_liga[jugador.equipo.liga_id]
+            ofertante = rng.choice(rivales)
+            if ofertante is jugador.equipo:
+                continue
+            objetos_oferta.append(Oferta(
+                jugador=jugador, equipo_ofertante=ofertante, equipo_receptor=jugador.equipo,
+                monto=jugador.valor + rng.randint(1, 30) * 100000
+            ))
+        Oferta.objects.bulk_create(objetos_oferta, batch_size=tamano_lote)
+        fase('pujas_y_ofertas', len(objetos_puja) + len(objetos_oferta), inicio)
+
+        # Jornadas, partidos y puntuaciones (se reutilizan las jornadas que ya existan)
+        inicio = time.monotonic()
+        Jornada.objects.bulk_create([Jornada(numero=numero) for numero in range(1, jornadas + 1)], ignore_conflicts=True)
+        objetos_jornada = list(Jornada.objects.filter(numero__lte=jornadas).order_by('numero'))
+        partidos = [
+            Partido(
+                jornada=jornada, equipo_local=local, equipo_visitante=visitante,
+                fecha=ahora - timedelta(days=7 * (jornadas - jornada.numero)),
+                goles_local=rng.randint(0, 6), goles_visitante=rng.randint(0, 6), jugado=True
+            )
+            for jornada in objetos_jornada
+            for local, visitante in _emparejamientos(reales, jornada.numero - 1)
+        ]
+        Partido.objects.bulk_create(partidos, batch_size=tamano_lote)
+
+        def generar_puntuaciones():
+            for indice, jugador in enumerate(jugadores):
+                historial = puntuaciones_jugador(semilla, indice, jugador.posicion, jornadas)
+                for jornada, (puntos, goles) in zip(objetos_jornada, historial):
+                    yield Puntuacion(jugador_id=jugador.id, jornada_id=jornada.id, puntos=puntos, goles=goles)
+
+        total_puntuaciones = 0
+        for lote in en_lotes(generar_puntuaciones(), tamano_lote):
+            Puntuacion.objects.bulk_create(lote)
+            total_puntuaciones += len(lote)
+        fase('jornadas_y_puntuaciones', len(partidos) + total_puntuaciones, inicio)
+
+        # Notificaciones repartidas en los últimos 30 días
+        inicio = time.monotonic()
+        categorias_privadas = ['oferta_rechazada', 'oferta_editada', 'oferta_retirada']
+        objetos_notificacion = []
+        for i in range(notificaciones):
+            if not usuarios or rng.random() < 0.3:
+                objetos_notificacion.append(Notificacion(
+                    tipo='publica', categoria=rng.choice(['traspaso', 'distribucion_dinero']),
+                    titulo=f'Aviso sintético {i}', mensaje='Notificación generada para pruebas de carga'
+                ))
+            else:
+                objetos_notificacion.append(Notificacion(
+                    tipo='privada', categoria=rng.choice(categorias_privadas), destinatario=rng.choice(usuarios),
+                    titulo=f'Aviso sintético {i}', mensaje='Notificación generada para pruebas de carga',
+                    leida=rng.random() < 0.5
+                ))
+        Notificacion.objects.bulk_create(objetos_notificacion, batch_size=tamano_lote)
+        # fecha_creacion es auto_now_add: se reparte después con un UPDATE por día
+        por_dia = {}
+        for notificacion in objetos_notificacion:
+            por_dia.setdefault(rng.randint(0, 29), []).append(notificacion.id)
+        for dias, ids in por_dia.items():
+            for lote in en_lotes(ids, tamano_lote):
+                Notificacion.objects.filter(id__in=lote).update(fecha_creacion=ahora - timedelta(days=dias))
+        fase('notificaciones', len(objetos_notificacion), inicio)
+
+        # bulk_create no dispara señales: la clasificación se construye al final
+        inicio = time.monotonic()
+        for lote in en_lotes((equipo.id for equipo in objetos_equipo), tamano_lote):
+            ClasificacionEquipo.actualizar_equipos(lote)
+        fase('clasificacion', len(objetos_equipo), inicio)
+
+    informe['duracion_segundos'] = round(time.monotonic() - inicio_total, 3)
+    informe['total_filas'] = sum(informe['filas'].values())
+    return informe
@@ -0,0 +1,191 @@
+"""
+Pujas y liquidación por lotes de las subastas del mercado.
+
+Las pujas bloquean siempre primero el jugador y después el equipo pujador,
+en ese orden, para que dos pujas simultáneas no se interbloqueen; el
+presupuesto se descuenta con una expresión F() sobre la fila bloqueada.
+Todas las demás escrituras de presupuesto (ofertas, pujas editadas o
+retiradas) pasan por cobrar/mover_presupuesto, con el mismo orden:
+jugador primero y después los equipos por id.
+
+Cada lote se bloquea con select_for_update(skip_locked=True), de modo que
+varios procesos pueden liquidar a la vez sin tocar la misma subasta: un
+jugador bloqueado por otro proceso simplemente se salta. Las escrituras de
+cada lote (ofertas, traspasos y pujas ganadoras) se hacen en bloque.
+"""
+import time
+from datetime import timedelta
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from .models import Jugador, Equipo, Oferta, Puja, ClasificacionEquipo
+
+TAMANO_LOTE = 500
+INCREMENTO_MINIMO_PUJA = 100000
+
+def cobrar(equipo_id, monto, mensaje='Presupuesto insuficiente'):
+    """
+    Descuenta `monto` con un UPDATE condicional, que no deja el presupuesto en
+    negativo aunque haya escrituras concurrentes. Lanza ValueError si no llega.
+    Devuelve el presupuesto resultante.
+    """
+    monto = int(monto)
+    if not Equipo.objects.filter(id=equipo_id, presupuesto__gte=monto).update(presupuesto=F('presupuesto') - monto):
+        raise ValueError(mensaje)
+    return Equipo.objects.values_list('presupuesto', flat=True).get(id=equipo_id)
+
+def mover_presupuesto(cambios):
+    """
+    Aplica {equipo_id: diferencia} con UPDATE F(), equipo a equipo en orden de id
+    para bloquear siempre en el mismo orden. Devuelve {equipo_id: presupuesto}.
+    """
+    ids = sorted(equipo_id for equipo_id, diferencia in cambios.items() if equipo_id is not None and diferencia)
+    for equipo_id in ids:
+        Equipo.objects.filter(id=equipo_id).update(presupuesto=F('presupuesto') + int(cambios[equipo_id]))
+    return dict(Equipo.objects.filter(id__in=ids).values_list('id', 'presupuesto'))
+
+def registrar_puja(equipo_id, jugador_id, monto):
+    """
+    Registra una puja por un agente libre con el jugador y el equipo bloqueados.
+    Lanza ValueError si la puja no es válida en el momento de aplicarla.
+    """
+    with transaction.atomic():
+        jugador = Jugador.objects.select_for_update().get(id=jugador_id)
+        equipo = Equipo.objects.select_for_update().get(id=equipo_id)
+
+        if not jugador.en_venta:
+            raise ValueError('El jugador no está en el mercado')
+        if jugador.expirado:
+            raise ValueError('La subasta ha expirado')
+
+        puja_minima = (jugador.puja_actual or jugador.valor) + INCREMENTO_MINIMO_PUJA
+        if monto <= puja_minima:
+            raise ValueError(f'La puja debe ser mayor a €{puja_minima:,}')
+        if equipo.presupuesto < monto:
+            raise ValueError('Presupuesto insuficiente')
+
+        puja = Puja.objects.create(
+            jugador=jugador,
+            equipo=equipo,
+            monto=monto,
+            activa=True
+        )
+        Jugador.objects.filter(id=jugador.id).update(puja_actual=monto, equipo_pujador=equipo)
+        Equipo.objects.filter(id=equipo.id).update(presupuesto=F('presupuesto') - monto)
+
+        jugador.puja_actual = monto
+        jugador.equipo_pujador = equipo
+        equipo.refresh_from_db(fields=['presupuesto'])
+    return puja, jugador, equipo
+
+def _liquidar_lote(lote):
+    """Liquida un lote de jugadores ya bloqueados. Devuelve los resultados del lote."""
+    resultados = []
+    ofertas = []
+    modificados = []
+    libres = {}
+
+    for jugador in lote:
+        if not jugador.equipo_pujador_id:
+            continue
+
+        if jugador.equipo_id:
+            # Jugador con equipo: la mejor puja se convierte en oferta al propietario
+            ofertas.append(Oferta(
+                jugador=jugador,
+                equipo_ofertante_id=jugador.equipo_pujador_id,
+                equipo_receptor_id=jugador.equipo_id,
+                monto=jugador.puja_actual,
+                estado='pendiente'
+            ))
+            resultados.append({
+                'jugador': jugador.nombre,
+                'jugador_id': jugador.id,
+                'tipo': 'oferta',
+                'equipo_id': jugador.equipo_pujador_id,
+                'monto': jugador.puja_actual
+            })
+            jugador.puja_actual = None
+            jugador.equipo_pujador = None
+        else:
+            # Jugador libre: se traspasa directamente al mejor postor
+            libres[jugador.id] = jugador.puja_actual
+            resultados.append({
+                'jugador': jugador.nombre,
+                'jugador_id': jugador.id,
+                'tipo': 'transferencia',
+                'equipo_id': jugador.equipo_pujador_id,
+                'monto': jugador.puja_actual
+            })
+            jugador.equipo_id = jugador.equipo_pujador_id
+            jugador.en_venta = False
+            jugador.fecha_mercado = None
+        modificados.append(jugador)
+
+    # Puja ganadora: la primera puja con el importe ganador de cada jugador libre
+    ganadoras = {}
+    if libres:
+        pujas = Puja.objects.filter(jugador_id__in=libres).order_by('fecha_puja', 'id').values_list('id', 'jugador_id', 'monto')
+        for puja_id, jugador_id, monto in pujas:
+            if jugador_id not in ganadoras and monto == libres[jugador_id]:
+                ganadoras[jugador_id] = puja_id
+
+    Oferta.objects.bulk_create(ofertas)
+    Puja.objects.filter(id__in=ganadoras.values()).update(es_ganadora=True)
+    Jugador.objects.bulk_update(
+        modificados,
+        ['equipo', 'en_venta', 'fecha_mercado', 'puja_actual', 'equipo_pujador']
+    )
+
+    # bulk_update no dispara señales: actualizar la clasificación de los equipos receptores
+    ClasificacionEquipo.actualizar_equipos(r['equipo_id'] for r in resultados if r['tipo'] == 'transferencia')
+    return resultados
+
+def liquidar_subastas(ahora=None, tamano_lote=TAMANO_LOTE):
+    """Liquida todas las subastas expiradas y devuelve un informe estructurado"""
+    inicio = time.monotonic()
+    ahora = ahora or timezone.now()
+    limite_expiracion = ahora - timedelta(hours=24)
+
+    informe = {
+        'revisadas': 0,
+        'ofertas': 0,
+        'transferencias': 0,
+        'sin_pujas': 0,
+        'lotes': 0,
+        'resultados': [],
+        'errores': [],
+    }
+
+    ultimo_id = 0
+    while True:
+        lote = []
+        try:
+            with transaction.atomic():
+                lote = list(
+                    Jugador.objects.select_for_update(skip_locked=True, of=('self',))
+                    .filter(fecha_mercado__lt=limite_expiracion, en_venta=True, id__gt=ultimo_id)
+                    .order_by('id')[:tamano_lote]
+                )
+                if not lote:
+                    break
+                ultimo_id = lote[-1].id
+                resultados = _liquidar_lote(lote)
+        except Exception as e:
+            print(f"❌ Error liquidando el lote tras el jugador {ultimo_id}: {e}")
+            informe['errores'].append({'desde_id': ultimo_id, 'error': str(e)})
+            if not lote:
+                break
+            continue
+
+        informe['lotes'] += 1
+        informe['revisadas'] += len(lote)
+        informe['sin_pujas'] += len(lote) - len(resultados)
+        informe['ofertas'] += sum(1 for r in resultados if r['tipo'] == 'oferta')
+        informe['transferencias'] += sum(1 for r in resultados if r['tipo'] == 'transferencia')
+        informe['resultados'].extend(resultados)
+
+    informe['procesadas'] = informe['ofertas'] + informe['transferencias']
+    informe['duracion_segundos'] = round(time.monotonic() - inicio, 3)
+    print(f"✅ Subastas liquidadas: {informe['procesadas']} de {informe['revisadas']} revisadas en {informe['duracion_segundos']}s")
+    return informe
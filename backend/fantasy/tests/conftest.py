@@ -3,6 +3,7 @@ Configuración de pytest y fixtures compartidos
 """
 import pytest
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from rest_framework.test import APIClient
 from unittest.mock import MagicMock
 from django.utils import timezone
@@ -13,6 +14,14 @@ from fantasy.models import (
 )
 
 
+@pytest.fixture(autouse=True)
+def cache_limpia():
+    """La caché en memoria sobrevive entre tests: se vacía para que no arrastren contadores"""
+    cache.clear()
+    yield
+    cache.clear()
+
+
 @pytest.fixture
 def api_client():
     """Cliente API de DRF sin autenticación"""
@@ -1137,13 +1146,6 @@ def jugador_en_venta_con_pujas(db, equipo, equipo2, equipo_real):
     
     return jugador
 
-@pytest.fixture
-def mock_crear_notificacion(monkeypatch):
-    """Mock para la función crear_notificacion"""
-    mock = MagicMock()
-    monkeypatch.setattr('apps.fantasy.views.equipo_views.crear_notificacion', mock)
-    return mock
-
 # Añadir estos fixtures al conftest.py existente
 
 @pytest.fixture
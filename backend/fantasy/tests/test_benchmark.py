@@ -0,0 +1,41 @@
+"""
+Benchmark de endpoints: presupuestos de consultas a escala pequeña.
+pytest.ini los excluye por defecto; se ejecutan con: pytest -m benchmark
+
+Para guardar el informe en JSON: BENCHMARK_INFORME=benchmark.json pytest -m benchmark
+"""
+import os
+import pytest
+from fantasy.benchmark import (
+    ENDPOINTS, preparar_datos, medir_endpoints, incumplimientos, construir_informe, guardar_informe
+)
+from fantasy.sintetico import generar_mundo
+
+pytestmark = [pytest.mark.benchmark, pytest.mark.django_db]
+
+
+@pytest.fixture
+def equipo_benchmark(db):
+    return preparar_datos('pequena')
+
+
+@pytest.mark.parametrize('nombre', ENDPOINTS)
+def test_presupuesto_consultas(equipo_benchmark, nombre):
+    resultados = medir_endpoints(equipo_benchmark, repeticiones=2, nombres=[nombre])
+    assert incumplimientos(resultados) == []
+
+
+def test_consultas_no_crecen_con_los_datos(equipo_benchmark):
+    """Las consultas de cada endpoint no dependen del tamaño de la base de datos"""
+    antes = medir_endpoints(equipo_benchmark, repeticiones=1)
+    generar_mundo(prefijo='mas', ligas=1, equipos=30, equipos_reales=6, jugadores_libres=200,
+                  jornadas=3, pujas=40, ofertas=40, notificaciones=300)
+    despues = medir_endpoints(equipo_benchmark, repeticiones=1)
+
+    assert {nombre: r['consultas'] for nombre, r in despues.items()} == {
+        nombre: r['consultas'] for nombre, r in antes.items()
+    }
+
+    ruta = os.environ.get('BENCHMARK_INFORME')
+    if ruta:
+        guardar_informe(construir_informe('pequena', 1, despues), ruta)
@@ -0,0 +1,157 @@
+"""
+Tests para la carga masiva de datos desde ficheros
+"""
+import json
+import pytest
+from django.core.management import call_command, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from fantasy.carga_datos import cargar_ficheros, elementos_json, en_lotes
+from fantasy.models import EquipoReal, Jugador, Jornada, Partido, Puntuacion
+
+
+def escribir_csv(ruta, cabecera, filas):
+    ruta.write_text('\n'.join([cabecera] + filas) + '\n', encoding='utf-8')
+    return ruta
+
+
+def escribir_mundo(directorio, equipos=2, jugadores_por_equipo=3, jornadas=2):
+    """Ficheros de una temporada pequeña: jugadores, partidos (CSV) y puntuaciones (JSONL)"""
+    escribir_csv(directorio / 'jugadores.csv', 'nombre,posicion,equipo_real', [
+        f'Jugador {e}-{j},DEF,Equipo {e}' for e in range(equipos) for j in range(jugadores_por_equipo)
+    ])
+    escribir_csv(directorio / 'partidos.csv', 'jornada,local,visitante,goles_local,goles_visitante,jugado', [
+        f'{jornada},Equipo 0,Equipo 1,2,1,true' for jornada in range(1, jornadas + 1)
+    ])
+    with (directorio / 'puntuaciones.jsonl').open('w', encoding='utf-8') as fichero:
+        for jornada in range(1, jornadas + 1):
+            for e in range(equipos):
+                for j in range(jugadores_por_equipo):
+                    fichero.write(json.dumps({
+                        'jugador': f'Jugador {e}-{j}', 'equipo_real': f'Equipo {e}',
+                        'jornada': jornada, 'puntos': j + 1, 'goles': 1 if j == 0 else 0
+                    }) + '\n')
+
+
+def test_en_lotes():
+    assert list(en_lotes(range(5), 2)) == [[0, 1], [2, 3], [4]]
+
+
+def test_elementos_json_por_bloques():
+    from io import StringIO
+    elementos = [{'jugador': f'J{i}', 'puntos': 10 ** i} for i in range(6)] + [{'nombre': 'ñandú, "x"'}]
+    texto = ' \n[ ' + ' ,\n'.join(json.dumps(elemento, ensure_ascii=False) for elemento in elementos) + ' ]\n'
+
+    # Bloques de 3 caracteres: los elementos quedan cortados en cualquier punto
+    assert list(elementos_json(StringIO(texto), tamano_bloque=3)) == elementos
+    assert list(elementos_json(StringIO('[]'))) == []
+    with pytest.raises(ValueError):
+        list(elementos_json(StringIO('[{"a": 1} {"b": 2}]'), tamano_bloque=4))
+    with pytest.raises(ValueError):
+        list(elementos_json(StringIO('{"a": 1}')))
+
+
+@pytest.mark.django_db
+class TestCargarDatos:
+    """Tests para cargar_ficheros y el comando cargar_datos"""
+
+    def test_carga_completa(self, tmp_path):
+        escribir_mundo(tmp_path)
+
+        call_command('cargar_datos', '--directorio', str(tmp_path), '--lote', '4')
+
+        assert EquipoReal.objects.count() == 2
+        assert Jugador.objects.count() == 6
+        assert Jornada.objects.count() == 2
+        assert Partido.objects.filter(jugado=True, goles_local=2).count() == 2
+        assert Puntuacion.objects.count() == 12
+        estrella = Jugador.objects.get(nombre='Jugador 1-2')
+        assert estrella.puntos_totales == 6
+        assert estrella.valor == 5000000 + 6 * 100000
+        assert Jugador.objects.get(nombre='Jugador 0-0').goles == 2
+
+    def test_recarga_no_duplica(self, tmp_path):
+        escribir_mundo(tmp_path)
+        cargar_ficheros({'jugadores': tmp_path / 'jugadores.csv', 'partidos': tmp_path / 'partidos.csv',
+                         'puntuaciones': tmp_path / 'puntuaciones.jsonl'})
+
+        escribir_csv(tmp_path / 'correccion.csv', 'jugador,equipo_real,jornada,puntos,goles',
+                     ['Jugador 1-2,Equipo 1,1,10,0'])
+        informe = cargar_ficheros({
+            'jugadores': tmp_path / 'jugadores.csv',
+            'partidos': tmp_path / 'partidos.csv',
+            'puntuaciones': tmp_path / 'correccion.csv',
+        })
+
+        assert informe['jugadores']['actualizados'] == 6
+        assert informe['partidos']['actualizados'] == 2
+        assert informe['puntuaciones'] == dict(informe['puntuaciones'], creados=0, actualizados=1)
+        assert Jugador.objects.count() == 6
+        assert Partido.objects.count() == 2
+        assert Jugador.objects.get(nombre='Jugador 1-2').puntos_totales == 13
+
+    def test_recarga_sin_valor_conserva_valor(self, tmp_path):
+        """Volver a cargar jugadores sin columna valor no resetea el valor de los existentes"""
+        escribir_mundo(tmp_path)
+        cargar_ficheros({'jugadores': tmp_path / 'jugadores.csv', 'puntuaciones': tmp_path / 'puntuaciones.jsonl'})
+        valores = dict(Jugador.objects.values_list('nombre', 'valor'))
+
+        escribir_csv(tmp_path / 'plantilla.csv', 'nombre,posicion,equipo_real,valor',
+                     ['Jugador 0-0,DEL,Equipo 0,', 'Jugador 0-1,DEF,Equipo 0,9000000', 'Nuevo,POR,Equipo 0,'])
+        informe = cargar_ficheros({'jugadores': tmp_path / 'plantilla.csv'})
+
+        assert informe['jugadores'] == dict(informe['jugadores'], creados=1, actualizados=2)
+        jugador = Jugador.objects.get(nombre='Jugador 0-0')
+        assert (jugador.posicion, jugador.valor) == ('DEL', valores['Jugador 0-0'])
+        assert valores['Jugador 0-0'] != 5000000
+        assert Jugador.objects.get(nombre='Jugador 0-1').valor == 9000000
+        assert Jugador.objects.get(nombre='Nuevo').valor == 5000000
+
+    def test_error_indica_fila(self, tmp_path):
+        escribir_csv(tmp_path / 'jugadores.csv', 'nombre,posicion,equipo_real', ['Bueno,DEF,A', 'Malo,XXX,A'])
+
+        with pytest.raises(CommandError, match='Fila 3'):
+            call_command('cargar_datos', '--jugadores', str(tmp_path / 'jugadores.csv'))
+
+    def test_carga_interrumpida_deja_totales_coherentes(self, tmp_path):
+        """Un error en un lote posterior no deja totales desfasados de los lotes ya guardados"""
+        escribir_mundo(tmp_path)
+        with (tmp_path / 'puntuaciones.jsonl').open('a', encoding='utf-8') as fichero:
+            fichero.write(json.dumps({'jugador': 'Nadie', 'equipo_real': 'Equipo 0', 'jornada': 3, 'puntos': 1}) + '\n')
+
+        with pytest.raises(CommandError, match='Fila 13'):
+            call_command('cargar_datos', '--directorio', str(tmp_path), '--lote', '4')
+
+        assert Puntuacion.objects.count() == 12
+        for jugador in Jugador.objects.all():
+            assert jugador.puntos_totales == sum(jugador.puntuacion_set.values_list('puntos', flat=True))
+
+    def test_carga_json_array(self, tmp_path):
+        escribir_mundo(tmp_path)
+        filas = [json.loads(linea) for linea in (tmp_path / 'puntuaciones.jsonl').read_text(encoding='utf-8').splitlines()]
+        (tmp_path / 'puntuaciones.jsonl').unlink()
+        (tmp_path / 'puntuaciones.json').write_text(json.dumps(filas), encoding='utf-8')
+
+        informe = cargar_ficheros({'jugadores': tmp_path / 'jugadores.csv', 'puntuaciones': tmp_path / 'puntuaciones.json'})
+
+        assert informe['puntuaciones']['creados'] == 12
+        assert Jugador.objects.get(nombre='Jugador 1-2').puntos_totales == 6
+
+    def test_consultas_por_lote(self, tmp_path):
+        """El número de consultas depende de los lotes, no de las filas"""
+        pequeno, grande = tmp_path / 'pequeno', tmp_path / 'grande'
+        pequeno.mkdir()
+        grande.mkdir()
+        escribir_mundo(pequeno, jugadores_por_equipo=2)
+        escribir_mundo(grande, jugadores_por_equipo=20)
+
+        with CaptureQueriesContext(connection) as pocos:
+            cargar_ficheros({'puntuaciones': pequeno / 'puntuaciones.jsonl', 'jugadores': pequeno / 'jugadores.csv'})
+        Jugador.objects.all().delete()
+        Jornada.objects.all().delete()
+        EquipoReal.objects.all().delete()
+        with CaptureQueriesContext(connection) as muchos:
+            cargar_ficheros({'puntuaciones': grande / 'puntuaciones.jsonl', 'jugadores': grande / 'jugadores.csv'})
+
+        assert Puntuacion.objects.count() == 80
+        assert len(muchos.captured_queries) == len(pocos.captured_queries)
@@ -0,0 +1,119 @@
+"""
+Tests para el pub/sub de eventos y el flujo Server-Sent Events
+"""
+import asyncio
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
+from rest_framework_simplejwt.tokens import AccessToken
+from fantasy.eventos import BrokerLocal, obtener_broker, canal_usuario, CANAL_PUBLICO, CANAL_MERCADO
+from fantasy.models import Notificacion
+
+
+def recibir(suscripcion, loop, timeout=1):
+    return loop.run_until_complete(suscripcion.siguiente(timeout))
+
+
+@pytest.fixture
+def loop():
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+class TestBrokerLocal:
+    """Tests para BrokerLocal"""
+
+    def test_reparte_por_canal(self, loop):
+        broker = BrokerLocal()
+        publico = broker.suscribir([CANAL_PUBLICO], loop=loop)
+        privado = broker.suscribir([canal_usuario(1)], loop=loop)
+
+        assert broker.publicar(canal_usuario(1), 'notificacion', {'id': 7}) == 1
+
+        assert recibir(privado, loop)['datos'] == {'id': 7}
+        with pytest.raises(asyncio.TimeoutError):
+            recibir(publico, loop, timeout=0.05)
+
+        broker.desuscribir(privado)
+        assert broker.publicar(canal_usuario(1), 'notificacion', {}) == 0
+
+
+@pytest.mark.django_db
+class TestProductores:
+    """Los helpers de notificaciones y el mercado publican tras el commit"""
+
+    def test_notificacion_publicada_tras_commit(self, loop, django_capture_on_commit_callbacks, jugador_portero,
+                                                equipo, equipo2, user, settings):
+        from fantasy.views.utils_views import crear_notificacion_traspaso, crear_notificacion_oferta_rechazada
+        settings.NOTIFICACIONES_CONTADORES = True
+        broker = obtener_broker()
+        suscripcion = broker.suscribir([CANAL_PUBLICO, canal_usuario(user.id)], loop=loop)
+        try:
+            with django_capture_on_commit_callbacks(execute=True) as callbacks:
+                traspaso = crear_notificacion_traspaso(jugador_portero, equipo, equipo2)
+                rechazo = crear_notificacion_oferta_rechazada(jugador_portero, equipo)
+                # Antes del commit no se ha publicado nada
+                with pytest.raises(asyncio.TimeoutError):
+                    recibir(suscripcion, loop, timeout=0.05)
+
+            # Por notificación: ajuste del contador de no leídas + publicación del evento
+            assert len(callbacks) == 4
+            recibidos = [recibir(suscripcion, loop), recibir(suscripcion, loop)]
+            assert [evento['datos']['id'] for evento in recibidos] == [traspaso.id, rechazo.id]
+            assert recibidos[1]['canal'] == canal_usuario(user.id)
+        finally:
+            broker.desuscribir(suscripcion)
+
+    def test_puja_publicada_en_mercado(self, loop, django_capture_on_commit_callbacks, authenticated_client,
+                                       equipo, jugador_libre_en_mercado):
+        from django.urls import reverse
+        broker = obtener_broker()
+        suscripcion = broker.suscribir([CANAL_MERCADO], loop=loop)
+        try:
+            with django_capture_on_commit_callbacks(execute=True):
+                response = authenticated_client.post(
+                    reverse('pujar_jugador', args=[equipo.id]),
+                    {'jugador_id': jugador_libre_en_mercado.id, 'monto_puja': 7000000},
+                    format='json'
+                )
+            assert response.status_code == 200
+            evento = recibir(suscripcion, loop)
+            assert evento['tipo'] == 'puja'
+            assert evento['datos']['jugador_id'] == jugador_libre_en_mercado.id
+        finally:
+            broker.desuscribir(suscripcion)
+
+
+@pytest.mark.django_db
+class TestStreamEventos:
+    """Tests para el endpoint SSE"""
+
+    def test_requiere_asgi(self, authenticated_client):
+        response = authenticated_client.get('/api/eventos/')
+        assert response.status_code == 501
+
+    def test_requiere_token(self):
+        async def pedir():
+            return await AsyncClient().get('/api/eventos/', {'token': 'invalido'})
+        assert async_to_sync(pedir)().status_code == 401
+
+    def test_reenvia_eventos_del_usuario(self, user):
+        token = str(AccessToken.for_user(user))
+
+        async def escuchar():
+            response = await AsyncClient().get('/api/eventos/', {'token': token})
+            assert response.status_code == 200
+            assert response['Content-Type'] == 'text/event-stream'
+            flujo = aiter(response.streaming_content)
+            # El primer mensaje llega ya suscrito
+            assert b'retry:' in await anext(flujo)
+            obtener_broker().publicar(canal_usuario(user.id + 1000), 'notificacion', {'id': -1})
+            obtener_broker().publicar(canal_usuario(user.id), 'notificacion', {'id': 99})
+            mensaje = await asyncio.wait_for(anext(flujo), 1)
+            await flujo.aclose()
+            return mensaje.decode()
+
+        mensaje = async_to_sync(escuchar)()
+        assert 'event: notificacion' in mensaje
+        assert '"id": 99' in mensaje
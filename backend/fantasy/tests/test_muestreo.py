@@ -0,0 +1,62 @@
+"""
+Tests para el muestreo aleatorio de filas
+"""
+import pytest
+from datetime import date
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from fantasy.models import Jugador
+from fantasy.muestreo import muestrear_ids, muestra_aleatoria, semilla_diaria
+
+
+@pytest.fixture
+def jugadores_dispersos(db, equipo_real):
+    """Jugadores con ids repartidos en un rango amplio (fuerza el sorteo por rango)"""
+    return [
+        Jugador.objects.create(
+            id=1000 + i * 97,
+            nombre=f'Disperso {i}',
+            posicion='DEF' if i % 2 else 'DEL',
+            valor=1000000,
+            equipo_real=equipo_real
+        )
+        for i in range(60)
+    ]
+
+
+@pytest.mark.django_db
+class TestMuestreo:
+    """Tests para muestrear_ids y muestra_aleatoria"""
+
+    def test_queryset_vacio(self):
+        assert muestrear_ids(Jugador.objects.all(), 5) == []
+
+    def test_devuelve_ids_distintos_del_queryset(self, jugadores_dispersos):
+        queryset = Jugador.objects.filter(posicion='DEF')
+        ids = muestrear_ids(queryset, 8, semilla=1)
+
+        assert len(ids) == 8
+        assert len(set(ids)) == 8
+        assert set(ids) <= set(queryset.values_list('id', flat=True))
+
+    def test_reproducible_con_semilla(self, jugadores_dispersos):
+        queryset = Jugador.objects.all()
+        assert muestrear_ids(queryset, 8, semilla=42) == muestrear_ids(queryset, 8, semilla=42)
+
+    def test_pide_mas_de_los_que_hay(self, jugadores_dispersos):
+        queryset = Jugador.objects.filter(nombre__in=['Disperso 3', 'Disperso 50'])
+        ids = muestrear_ids(queryset, 8, semilla=7)
+
+        assert sorted(ids) == sorted(queryset.values_list('id', flat=True))
+
+    def test_no_ordena_al_azar_en_sql(self, jugadores_dispersos):
+        with CaptureQueriesContext(connection) as consultas:
+            jugadores = muestra_aleatoria(Jugador.objects.all(), 5, semilla=3)
+
+        assert len(jugadores) == 5
+        assert all(isinstance(j, Jugador) for j in jugadores)
+        assert not any('RANDOM()' in q['sql'].upper() for q in consultas.captured_queries)
+
+    def test_semilla_diaria(self):
+        assert semilla_diaria('mercado', date(2024, 1, 1)) == semilla_diaria('mercado', date(2024, 1, 1))
+        assert semilla_diaria('mercado', date(2024, 1, 1)) != semilla_diaria('mercado', date(2024, 1, 2))
@@ -0,0 +1,61 @@
+"""
+Tests para el mantenimiento de totales de puntuaciones y la valoración de jugadores
+"""
+import pytest
+from django.core.management import call_command
+from fantasy.models import Jugador, Jornada, Puntuacion, ClasificacionEquipo
+from fantasy.precios import calcular_valor
+from fantasy.puntuaciones import reconciliar_totales
+
+
+def test_calcular_valor():
+    assert calcular_valor(0) == 5000000
+    assert calcular_valor(12) == 5000000 + 12 * 100000
+
+
+@pytest.mark.django_db
+class TestReconciliarTotales:
+    """Tests para reconciliar_totales"""
+
+    def crear_desviado(self, equipo_real, equipo, jornada):
+        jugador = Jugador.objects.create(
+            nombre='Desviado', posicion='DEF', equipo_real=equipo_real, equipo=equipo,
+            puntos_totales=3, goles=0, valor=1000000
+        )
+        # Alta directa: no pasa por la actualización de totales
+        Puntuacion.objects.create(jugador=jugador, jornada=jornada, puntos=7, goles=2)
+        return jugador
+
+    def test_corrige_desviaciones(self, equipo_real, equipo, jornada, jugador_portero):
+        jugador = self.crear_desviado(equipo_real, equipo, jornada)
+
+        informe = reconciliar_totales()
+
+        assert informe['revisados'] == 2
+        assert informe['desviados'] == informe['corregidos'] == 1
+        assert informe['desviacion_puntos'] == 4
+        assert informe['desviacion_goles'] == 2
+        assert informe['ejemplos'][0]['jugador_id'] == jugador.id
+        jugador.refresh_from_db()
+        assert (jugador.puntos_totales, jugador.goles, jugador.valor) == (7, 2, 1000000)
+        assert ClasificacionEquipo.objects.get(equipo=equipo).puntos_totales == 7
+        assert reconciliar_totales()['desviados'] == 0
+
+    def test_revalorar(self, equipo_real, equipo, jornada):
+        jugador = self.crear_desviado(equipo_real, equipo, jornada)
+
+        reconciliar_totales(revalorar=True)
+
+        jugador.refresh_from_db()
+        assert jugador.valor == calcular_valor(7)
+
+    def test_dry_run_no_escribe(self, equipo_real, equipo, jornada):
+        jugador = self.crear_desviado(equipo_real, equipo, jornada)
+
+        call_command('reconciliar_puntuaciones', '--dry-run')
+
+        jugador.refresh_from_db()
+        assert jugador.puntos_totales == 3
+        informe = reconciliar_totales(aplicar=False, tamano_lote=1)
+        assert informe['desviados'] == 1
+        assert informe['corregidos'] == 0
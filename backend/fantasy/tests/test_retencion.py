@@ -0,0 +1,87 @@
+"""
+Tests de la retención y archivo de notificaciones
+"""
+import json
+import pytest
+from datetime import timedelta
+from django.core.management import call_command
+from django.utils import timezone
+from fantasy.models import Notificacion, NotificacionArchivada, NotificacionLeida
+from fantasy.retencion import archivar_notificaciones
+
+
+def crear(dias_atras, **campos):
+    campos.setdefault('categoria', 'traspaso')
+    notificacion = Notificacion.objects.create(titulo='T', mensaje='M', **campos)
+    Notificacion.objects.filter(id=notificacion.id).update(fecha_creacion=timezone.now() - timedelta(days=dias_atras))
+    return notificacion
+
+
+@pytest.mark.django_db
+class TestArchivarNotificaciones:
+
+    def test_archiva_antiguas_leidas_y_publicas(self, user):
+        publica_vieja = crear(100, tipo='publica')
+        leida_vieja = crear(100, tipo='privada', destinatario=user, leida=True, categoria='oferta_rechazada')
+        no_leida_vieja = crear(100, tipo='privada', destinatario=user)
+        leida_reciente = crear(1, tipo='privada', destinatario=user, leida=True)
+        NotificacionLeida.objects.create(usuario=user, notificacion=publica_vieja)
+
+        informe = archivar_notificaciones(dias=90, maximo_por_usuario=50)
+
+        assert informe['antiguas'] == 2
+        assert informe['archivadas'] == 2
+        assert informe['por_categoria'] == {'traspaso': 1, 'oferta_rechazada': 1}
+        assert set(Notificacion.objects.values_list('id', flat=True)) == {no_leida_vieja.id, leida_reciente.id}
+        assert set(NotificacionArchivada.objects.values_list('id_original', flat=True)) == {publica_vieja.id, leida_vieja.id}
+        archivada = NotificacionArchivada.objects.get(id_original=leida_vieja.id)
+        assert archivada.destinatario_id == user.id and archivada.leida is True
+        assert not NotificacionLeida.objects.exists()
+
+    def test_ventana_por_usuario(self, user, user2):
+        propias = [crear(10 - i, tipo='privada', destinatario=user) for i in range(5)]
+        ajena = crear(20, tipo='privada', destinatario=user2)
+
+        informe = archivar_notificaciones(dias=90, maximo_por_usuario=3)
+
+        assert informe['fuera_de_ventana'] == 2
+        assert set(Notificacion.objects.values_list('id', flat=True)) == {n.id for n in propias[2:]} | {ajena.id}
+
+    def test_lotes_y_dry_run(self, user):
+        for _ in range(5):
+            crear(100, tipo='publica')
+
+        informe = archivar_notificaciones(dias=90, tamano_lote=2, aplicar=False)
+        assert informe['antiguas'] == 5 and informe['archivadas'] == 0
+        assert Notificacion.objects.count() == 5
+
+        informe = archivar_notificaciones(dias=90, tamano_lote=2)
+        assert informe['lotes'] == 3
+        assert informe['restantes'] == 0
+        assert NotificacionArchivada.objects.count() == 5
+
+    def test_comando_jsonl(self, user, tmp_path):
+        from io import StringIO
+        vieja = crear(100, tipo='privada', destinatario=user, leida=True, categoria='oferta_rechazada')
+        ruta = tmp_path / 'archivo.jsonl'
+        salida = StringIO()
+
+        call_command('archivar_notificaciones', '--dias', '90', '--jsonl', str(ruta), stdout=salida)
+
+        lineas = [json.loads(linea) for linea in ruta.read_text(encoding='utf-8').splitlines()]
+        assert [linea['id'] for linea in lineas] == [vieja.id]
+        assert lineas[0]['destinatario_id'] == user.id
+        assert not NotificacionArchivada.objects.exists()
+        assert not Notificacion.objects.exists()
+        assert '1 archivadas' in salida.getvalue()
+
+    def test_contadores_tras_archivar(self, authenticated_client, user):
+        from django.urls import reverse
+        for i in range(4):
+            crear(4 - i, tipo='privada', destinatario=user)
+        url = reverse('contar-no-leidas')
+        assert authenticated_client.get(url).json()['cantidad_no_leidas'] == 4
+
+        archivar_notificaciones(dias=90, maximo_por_usuario=2)
+
+        assert authenticated_client.get(url).json()['cantidad_no_leidas'] == 2
@@ -10,7 +10,8 @@ from fantasy.serializers import (
     UserSerializer, RegisterSerializer, LoginSerializer, EquipoRealSerializer,
     JornadaSerializer, PartidoSerializer, OfertaSerializer, PujaSerializer,
     NotificacionSerializer, AlineacionCongeladaSerializer, JugadorMercadoSerializer,
-    PuntuacionSerializer, PuntuacionJornadaSerializer
+    PuntuacionSerializer, PuntuacionJornadaSerializer, jugadores_con_puntuaciones,
+    equipos_con_plantilla
 )
 
 @pytest.mark.django_db
@@ -72,6 +73,24 @@ class TestJugadorSerializers:
         assert data['puntuaciones_jornadas'][0]['puntos'] == 5
         assert data['puntuaciones_jornadas'][1]['puntos'] == 7
 
+    def test_jugador_serializer_prefetch_consultas_constantes(self, equipo, equipo_real, jornada, jornada2, django_assert_num_queries):
+        # Con el queryset preparado el coste no depende del número de jugadores
+        for i in range(20):
+            jugador = Jugador.objects.create(
+                nombre=f'Jugador {i}', posicion='DEF', equipo_real=equipo_real, equipo=equipo
+            )
+            Puntuacion.objects.create(jugador=jugador, jornada=jornada2, puntos=i, goles=0)
+            Puntuacion.objects.create(jugador=jugador, jornada=jornada, puntos=1, goles=0)
+
+        # 1 consulta de jugadores (con JOINs) + 1 de puntuaciones
+        with django_assert_num_queries(2):
+            data = JugadorSerializer(jugadores_con_puntuaciones(), many=True).data
+
+        assert len(data) == 20
+        assert data[0]['equipo_nombre'] == equipo.nombre
+        assert [p['jornada_numero'] for p in data[5]['puntuaciones_jornadas']] == [1, 2]
+        assert data[5]['puntuaciones_jornadas'][1]['puntos'] == 5
+
 @pytest.mark.django_db
 class TestEquipoSerializer:
     """Tests para EquipoSerializer"""
@@ -104,6 +123,22 @@ class TestEquipoSerializer:
         for jugador in data['jugadores_banquillo']:
             assert jugador['en_banquillo'] is True
 
+    def test_equipo_serializer_una_sola_pasada(self, equipo_completo_con_jugadores, jornada, django_assert_num_queries):
+        for jugador in equipo_completo_con_jugadores.jugadores.all():
+            Puntuacion.objects.create(jugador=jugador, jornada=jornada, puntos=3, goles=0)
+
+        # Equipo (con usuario y liga) + plantilla + puntuaciones
+        with django_assert_num_queries(3):
+            equipo = equipos_con_plantilla().get(id=equipo_completo_con_jugadores.id)
+            data = EquipoSerializer(equipo).data
+
+        assert len(data['jugadores']) == 8
+        ids_campo = {j['id'] for j in data['jugadores_campo']}
+        ids_banquillo = {j['id'] for j in data['jugadores_banquillo']}
+        assert ids_campo | ids_banquillo == {j['id'] for j in data['jugadores']}
+        assert not ids_campo & ids_banquillo
+        assert all(len(j['puntuaciones_jornadas']) == 1 for j in data['jugadores'])
+
 @pytest.mark.django_db
 class TestAuthSerializers:
     """Tests para serializers de autenticación"""
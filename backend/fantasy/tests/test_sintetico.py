@@ -0,0 +1,58 @@
+"""
+Tests para el generador de mundos sintéticos
+"""
+import pytest
+from django.core.management import call_command
+from django.db.models import Sum
+from fantasy.models import Equipo, Jugador, Liga, Partido, Puntuacion, Puja, Oferta, Notificacion, ClasificacionEquipo
+from fantasy.sintetico import generar_mundo, limpiar_mundo
+
+
+PARAMETROS = dict(ligas=2, equipos=6, equipos_reales=4, jugadores_por_equipo=7, jugadores_libres=10,
+                  jornadas=3, pujas=15, ofertas=8, notificaciones=40)
+
+
+@pytest.mark.django_db
+class TestGenerarMundo:
+    """Tests para generar_mundo y limpiar_mundo"""
+
+    def test_genera_mundo_coherente(self):
+        informe = generar_mundo(**PARAMETROS)
+
+        assert informe['filas']['equipos'] == 6
+        assert Liga.objects.filter(codigo__startswith='SINT-').count() == 2
+        assert Jugador.objects.count() == 6 * 7 + 10
+        assert Partido.objects.count() == 3 * 2
+        assert Puntuacion.objects.count() == Jugador.objects.count() * 3
+        assert Notificacion.objects.count() == 40
+        assert 0 < Puja.objects.count() <= 15
+        assert 0 < Oferta.objects.count() <= 8
+
+        jugador = Jugador.objects.order_by('id').first()
+        assert jugador.puntos_totales == Puntuacion.objects.filter(jugador=jugador).aggregate(total=Sum('puntos'))['total']
+        for equipo in Equipo.objects.all():
+            titulares = list(equipo.jugadores.filter(en_banquillo=False).values_list('posicion', flat=True))
+            assert sorted(titulares) == ['DEF', 'DEF', 'DEL', 'DEL', 'POR']
+            assert ClasificacionEquipo.objects.get(equipo=equipo).puntos_totales == (
+                equipo.jugadores.aggregate(total=Sum('puntos_totales'))['total']
+            )
+
+    def test_misma_semilla_mismo_mundo(self):
+        generar_mundo(**PARAMETROS)
+        primero = list(Jugador.objects.order_by('id').values_list('nombre', 'posicion', 'puntos_totales', 'en_venta'))
+
+        call_command('generar_mundo_sintetico', '--limpiar', '--ligas', '2', '--equipos', '6', '--equipos-reales', '4',
+                     '--jugadores-libres', '10', '--jornadas', '3', '--pujas', '15', '--ofertas', '8',
+                     '--notificaciones', '40')
+        segundo = list(Jugador.objects.order_by('id').values_list('nombre', 'posicion', 'puntos_totales', 'en_venta'))
+
+        assert primero == segundo
+
+    def test_prefijo_existente(self):
+        generar_mundo(**PARAMETROS)
+        with pytest.raises(ValueError):
+            generar_mundo(**PARAMETROS)
+
+        limpiar_mundo()
+        assert not Jugador.objects.exists()
+        assert not Equipo.objects.exists()
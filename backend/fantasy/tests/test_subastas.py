@@ -0,0 +1,215 @@
+"""
+Tests para la liquidación por lotes de subastas
+"""
+import pytest
+from datetime import timedelta
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from fantasy.models import Jugador, Oferta, Puja, ClasificacionEquipo
+from fantasy.subastas import cobrar, liquidar_subastas, mover_presupuesto, registrar_puja
+
+
+def crear_subasta(equipo_real, nombre, equipo=None, pujador=None, monto=None, horas=25):
+    return Jugador.objects.create(
+        nombre=nombre, posicion='MED', valor=5000000, puntos_totales=10,
+        equipo_real=equipo_real, equipo=equipo, en_venta=True,
+        fecha_mercado=timezone.now() - timedelta(hours=horas),
+        puja_actual=monto, equipo_pujador=pujador
+    )
+
+
+@pytest.mark.django_db
+class TestLiquidarSubastas:
+    """Tests para liquidar_subastas"""
+
+    def test_liquidacion_mixta(self, equipo, equipo2, equipo_real):
+        libre = crear_subasta(equipo_real, 'Libre', pujador=equipo, monto=7000000)
+        Puja.objects.create(jugador=libre, equipo=equipo2, monto=6000000)
+        ganadora = Puja.objects.create(jugador=libre, equipo=equipo, monto=7000000)
+        vendido = crear_subasta(equipo_real, 'Con equipo', equipo=equipo2, pujador=equipo, monto=9000000)
+        sin_pujas = crear_subasta(equipo_real, 'Sin pujas')
+        vigente = crear_subasta(equipo_real, 'Vigente', pujador=equipo, monto=1000000, horas=2)
+
+        informe = liquidar_subastas()
+
+        assert informe['revisadas'] == 3
+        assert informe['transferencias'] == 1
+        assert informe['ofertas'] == 1
+        assert informe['sin_pujas'] == 1
+        assert informe['procesadas'] == 2
+
+        libre.refresh_from_db()
+        assert libre.equipo == equipo
+        assert libre.en_venta is False
+        assert libre.fecha_mercado is None
+        assert list(Puja.objects.filter(es_ganadora=True)) == [ganadora]
+
+        vendido.refresh_from_db()
+        assert vendido.puja_actual is None and vendido.equipo_pujador is None
+        oferta = Oferta.objects.get(jugador=vendido)
+        assert (oferta.equipo_ofertante, oferta.equipo_receptor, oferta.monto) == (equipo, equipo2, 9000000)
+
+        sin_pujas.refresh_from_db()
+        assert sin_pujas.en_venta is True
+        vigente.refresh_from_db()
+        assert vigente.equipo is None
+
+        # La clasificación refleja el traspaso aunque bulk_update no dispare señales
+        assert ClasificacionEquipo.objects.get(equipo=equipo).puntos_totales == sum(
+            equipo.jugadores.values_list('puntos_totales', flat=True)
+        )
+
+    def test_segunda_pasada_no_duplica(self, equipo, equipo2, equipo_real):
+        crear_subasta(equipo_real, 'Con equipo', equipo=equipo2, pujador=equipo, monto=9000000)
+
+        liquidar_subastas()
+        informe = liquidar_subastas()
+
+        assert informe['procesadas'] == 0
+        assert Oferta.objects.count() == 1
+
+    def test_lotes_consultas_constantes(self, equipo, equipo2, equipo_real):
+        """Las consultas crecen con el número de lotes, no con el de jugadores"""
+        for i in range(4):
+            crear_subasta(equipo_real, f'A{i}', equipo=equipo2, pujador=equipo, monto=1000000 + i)
+        with CaptureQueriesContext(connection) as pocas:
+            informe = liquidar_subastas(tamano_lote=50)
+        assert informe['lotes'] == 1
+
+        for i in range(40):
+            crear_subasta(equipo_real, f'B{i}', equipo=equipo2, pujador=equipo, monto=1000000 + i)
+        with CaptureQueriesContext(connection) as muchas:
+            informe = liquidar_subastas(tamano_lote=50)
+
+        assert informe['ofertas'] == 40
+        assert len(muchas.captured_queries) == len(pocas.captured_queries)
+
+    def test_varios_lotes(self, equipo, equipo_real):
+        for i in range(5):
+            crear_subasta(equipo_real, f'Libre {i}', pujador=equipo, monto=1000000)
+
+        informe = liquidar_subastas(tamano_lote=2)
+
+        assert informe['lotes'] == 3
+        assert informe['transferencias'] == 5
+        assert Jugador.objects.filter(equipo=equipo, nombre__startswith='Libre').count() == 5
+
+
+@pytest.mark.django_db
+class TestRegistrarPuja:
+    """Tests para registrar_puja"""
+
+    def test_puja_valida(self, equipo, equipo_real):
+        jugador = crear_subasta(equipo_real, 'Libre', horas=1)
+        presupuesto = equipo.presupuesto
+
+        puja, jugador, equipo_actualizado = registrar_puja(equipo.id, jugador.id, 6000000)
+
+        jugador.refresh_from_db()
+        assert jugador.puja_actual == 6000000
+        assert jugador.equipo_pujador == equipo
+        assert equipo_actualizado.presupuesto == presupuesto - 6000000
+        assert puja.activa is True
+
+    def test_puja_por_debajo_del_minimo(self, equipo, equipo_real):
+        jugador = crear_subasta(equipo_real, 'Libre', pujador=equipo, monto=6000000, horas=1)
+
+        with pytest.raises(ValueError, match='La puja debe ser mayor'):
+            registrar_puja(equipo.id, jugador.id, 6050000)
+        assert Puja.objects.count() == 0
+
+    def test_presupuesto_nunca_negativo(self, equipo, equipo_real):
+        equipo.presupuesto = 7000000
+        equipo.save()
+        primero = crear_subasta(equipo_real, 'Uno', horas=1)
+        segundo = crear_subasta(equipo_real, 'Dos', horas=1)
+
+        registrar_puja(equipo.id, primero.id, 6000000)
+        with pytest.raises(ValueError, match='Presupuesto insuficiente'):
+            registrar_puja(equipo.id, segundo.id, 6000000)
+
+        equipo.refresh_from_db()
+        assert equipo.presupuesto == 1000000
+
+    def test_subasta_expirada(self, equipo, equipo_real):
+        jugador = crear_subasta(equipo_real, 'Libre', horas=25)
+
+        with pytest.raises(ValueError, match='expirado'):
+            registrar_puja(equipo.id, jugador.id, 6000000)
+
+
+@pytest.mark.django_db
+class TestMovimientosPresupuesto:
+    """Tests para cobrar y mover_presupuesto"""
+
+    def test_cobrar(self, equipo):
+        assert cobrar(equipo.id, 1000000) == 49000000
+        equipo.refresh_from_db()
+        assert equipo.presupuesto == 49000000
+
+    def test_cobrar_sin_saldo_no_deja_negativo(self, equipo):
+        with pytest.raises(ValueError, match='Presupuesto insuficiente'):
+            cobrar(equipo.id, 60000000)
+        equipo.refresh_from_db()
+        assert equipo.presupuesto == 50000000
+
+    def test_mover_presupuesto_sobre_valor_actual(self, equipo, equipo2):
+        from fantasy.models import Equipo
+        # Un objeto en memoria desfasado no pisa la escritura
+        desfasado = Equipo.objects.get(id=equipo.id)
+        Equipo.objects.filter(id=equipo.id).update(presupuesto=40000000)
+
+        nuevos = mover_presupuesto({desfasado.id: -5000000, equipo2.id: 5000000, None: 1})
+
+        assert nuevos == {equipo.id: 35000000, equipo2.id: 55000000}
+
+
+@pytest.mark.slow
+@pytest.mark.skipif(not connection.features.has_select_for_update, reason='Requiere bloqueo de filas (PostgreSQL)')
+@pytest.mark.django_db(transaction=True)
+def test_pujas_concurrentes_un_jugador(equipo_real, liga):
+    """Cientos de pujas simultáneas por el mismo jugador: sin pujas perdidas ni presupuestos negativos"""
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+    from django.contrib.auth.models import User
+    from django.db import connections
+    from fantasy.models import Equipo
+
+    equipos = [
+        Equipo.objects.create(
+            usuario=User.objects.create_user(username=f'pujador{i}', password='x'),
+            liga=liga, nombre=f'Pujador {i}', presupuesto=20000000
+        )
+        for i in range(20)
+    ]
+    jugador = crear_subasta(equipo_real, 'Disputado', horas=1)
+    total_pujas = 300
+    barrera = threading.Barrier(10)
+
+    def pujar(i):
+        if i < 10:
+            barrera.wait()
+        try:
+            registrar_puja(equipos[i % len(equipos)].id, jugador.id, 5200000 + i * 150000)
+            return True
+        except ValueError:
+            return False
+        finally:
+            connections.close_all()
+
+    inicio = timezone.now()
+    with ThreadPoolExecutor(max_workers=10) as ejecutor:
+        aceptadas = sum(ejecutor.map(pujar, range(total_pujas)))
+    segundos = max((timezone.now() - inicio).total_seconds(), 0.001)
+    print(f"⏱️ {total_pujas} pujas en {segundos:.2f}s ({total_pujas / segundos:.0f} pujas/s), {aceptadas} aceptadas")
+
+    jugador.refresh_from_db()
+    pujas = Puja.objects.filter(jugador=jugador)
+    assert pujas.count() == aceptadas
+    # Cada puja aceptada superó a la anterior: la actual es la máxima registrada
+    assert jugador.puja_actual == max(pujas.values_list('monto', flat=True))
+    for equipo in Equipo.objects.filter(id__in=[e.id for e in equipos]):
+        gastado = sum(pujas.filter(equipo=equipo).values_list('monto', flat=True))
+        assert equipo.presupuesto == 20000000 - gastado
+        assert equipo.presupuesto >= 0
@@ -1,7 +1,11 @@
 import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from django.urls import reverse
 from rest_framework import status
-from fantasy.models import Liga, Equipo
+from django.contrib.auth.models import User
+from fantasy.models import Liga, Equipo, Jugador, ClasificacionEquipo, EquipoReal, Jornada, Partido
 
 @pytest.mark.django_db
 class TestClasificacionViewSet:
@@ -110,4 +114,152 @@ class TestClasificacionViewSet:
             # Esta es una forma simplificada de verificar optimización
             # En una implementación real, podrías usar django-debug-toolbar
             response = authenticated_client.get(url, {'liga_id': liga.id})
-            assert response.status_code == status.HTTP_200_OK
\ No newline at end of file
+            assert response.status_code == status.HTTP_200_OK
+
+    def test_list_clasificacion_consultas_constantes(self, authenticated_client, liga, equipos_clasificacion, django_assert_max_num_queries):
+        """El número de consultas no depende del número de equipos"""
+        for i in range(10):
+            usuario = User.objects.create_user(username=f'extra{i}', password='testpass123')
+            Equipo.objects.create(usuario=usuario, liga=liga, nombre=f'Extra {i}')
+
+        url = reverse('clasificacion-list')
+        # Autenticación + liga + lectura de la clasificación
+        with django_assert_max_num_queries(3):
+            response = authenticated_client.get(url, {'liga_id': liga.id})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data) == 12
+        assert [e['posicion'] for e in response.data] == list(range(1, 13))
+
+
+@pytest.mark.django_db
+class TestClasificacionMaterializada:
+    """Tests para el mantenimiento incremental de ClasificacionEquipo"""
+
+    def test_equipo_nuevo_crea_fila(self, liga, equipo):
+        fila = ClasificacionEquipo.objects.get(equipo=equipo)
+        assert fila.liga_id == liga.id
+        assert fila.puntos_totales == 0
+        assert fila.posicion == 1
+
+    def test_cambio_de_puntos_actualiza_clasificacion(self, liga, equipos_clasificacion):
+        equipo_a = Equipo.objects.get(nombre='Equipo A')
+        jugador = equipo_a.jugadores.first()
+        jugador.puntos_totales += 40
+        jugador.save()
+
+        fila = ClasificacionEquipo.objects.get(equipo=equipo_a)
+        assert fila.puntos_totales == 73
+        assert fila.posicion == 1
+        assert ClasificacionEquipo.objects.get(equipo__nombre='Equipo B').posicion == 2
+
+    def test_traspaso_mueve_los_puntos(self, liga, equipos_clasificacion):
+        equipo_a = Equipo.objects.get(nombre='Equipo A')
+        equipo_b = Equipo.objects.get(nombre='Equipo B')
+        jugador = equipo_b.jugadores.get(puntos_totales=22)
+        jugador.equipo = equipo_a
+        jugador.save()
+
+        assert ClasificacionEquipo.objects.get(equipo=equipo_a).puntos_totales == 55
+        assert ClasificacionEquipo.objects.get(equipo=equipo_b).puntos_totales == 41
+
+    def test_recalcular_todo_corrige_desfases(self, liga, equipos_clasificacion):
+        # Las actualizaciones masivas no disparan señales
+        Jugador.objects.filter(equipo__nombre='Equipo A').update(puntos_totales=100)
+        ClasificacionEquipo.recalcular_todo()
+
+        fila = ClasificacionEquipo.objects.get(equipo__nombre='Equipo A')
+        assert fila.puntos_totales == 300
+        assert fila.posicion == 1
+
+
+@pytest.mark.django_db(transaction=True)
+def test_varios_cambios_reordenan_una_vez(liga, equipos_clasificacion):
+    """Los cambios de una misma transacción comparten una sola reordenación al confirmar"""
+    from unittest.mock import patch
+    from django.db import transaction
+    from fantasy.models import Jornada, Puntuacion
+    equipo_a = Equipo.objects.get(nombre='Equipo A')
+    puntos_antes = ClasificacionEquipo.objects.get(equipo=equipo_a).puntos_totales
+    jornada = Jornada.objects.create(numero=7)
+
+    with patch.object(ClasificacionEquipo, 'recalcular_posiciones',
+                      wraps=ClasificacionEquipo.recalcular_posiciones) as reordenar:
+        with transaction.atomic():
+            for jugador in equipo_a.jugadores.all():
+                jugador.puntos_totales += 20
+                jugador.save()
+                Puntuacion.objects.create(jugador=jugador, jornada=jornada, puntos=20)
+            assert not reordenar.called
+
+    assert reordenar.call_count == 1
+    fila = ClasificacionEquipo.objects.get(equipo=equipo_a)
+    assert fila.puntos_totales == puntos_antes + 60
+    assert fila.posicion == 1
+    assert fila.ultima_jornada == 7
+    assert ClasificacionEquipo.objects.get(equipo__nombre='Equipo B').posicion == 2
+
+
+@pytest.mark.django_db
+class TestClasificacionEquiposReales:
+    """Tests para la clasificación de equipos reales"""
+
+    def _crear_liga_real(self, num_equipos, num_jornadas, prefijo):
+        equipos = [EquipoReal.objects.create(nombre=f'{prefijo} {i}') for i in range(num_equipos)]
+        for n in range(num_jornadas):
+            jornada, _ = Jornada.objects.get_or_create(numero=n + 1)
+            for i in range(0, num_equipos - 1, 2):
+                Partido.objects.create(
+                    jornada=jornada,
+                    equipo_local=equipos[i],
+                    equipo_visitante=equipos[i + 1],
+                    fecha=timezone.now(),
+                    goles_local=(i + n) % 4,
+                    goles_visitante=n % 3,
+                    jugado=True
+                )
+        return equipos
+
+    def test_clasificacion_equipos_reales_estadisticas(self, api_client, partido):
+        partido.goles_local = 3
+        partido.goles_visitante = 1
+        partido.save()
+
+        response = api_client.get(reverse('clasificacion_equipos_reales'))
+        data = response.json()
+
+        assert response.status_code == 200
+        local, visitante = data[0], data[1]
+        assert local['equipo']['id'] == partido.equipo_local_id
+        assert local['puntos'] == 3
+        assert local['partidos_ganados'] == 1
+        assert local['goles_a_favor'] == 3
+        assert local['diferencia_goles'] == 2
+        assert visitante['partidos_perdidos'] == 1
+        assert visitante['goles_en_contra'] == 3
+        assert visitante['puntos'] == 0
+
+    def test_clasificacion_equipos_reales_empate(self, api_client, partido):
+        partido.goles_local = 2
+        partido.goles_visitante = 2
+        partido.save()
+
+        data = api_client.get(reverse('clasificacion_equipos_reales')).json()
+
+        assert all(e['puntos'] == 1 and e['partidos_empatados'] == 1 for e in data)
+
+    def test_clasificacion_equipos_reales_consultas_constantes(self, api_client):
+        """El número de consultas no crece con equipos ni jornadas"""
+        url = reverse('clasificacion_equipos_reales')
+
+        self._crear_liga_real(4, 2, 'Pequeña')
+        with CaptureQueriesContext(connection) as pequena:
+            assert api_client.get(url).status_code == 200
+
+        self._crear_liga_real(20, 10, 'Grande')
+        with CaptureQueriesContext(connection) as grande:
+            response = api_client.get(url)
+
+        assert response.status_code == 200
+        assert len(response.json()) == 24
+        assert len(grande.captured_queries) == len(pequena.captured_queries) == 2
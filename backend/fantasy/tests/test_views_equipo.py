@@ -175,11 +175,12 @@ class TestPonerEnVenta:
 class TestQuitarDelMercado:
     """Tests para la vista quitar_del_mercado"""
 
-    def test_quitar_del_mercado_exitoso(self, authenticated_client, jugador_en_venta_con_pujas, mock_crear_notificacion):
+    def test_quitar_del_mercado_exitoso(self, authenticated_client, jugador_en_venta_con_pujas, django_capture_on_commit_callbacks):
         """Quitar jugador del mercado exitosamente"""
         equipo = jugador_en_venta_con_pujas.equipo
         url = reverse('quitar_del_mercado', args=[equipo.id, jugador_en_venta_con_pujas.id])
-        response = authenticated_client.post(url)
+        with django_capture_on_commit_callbacks(execute=True):
+            response = authenticated_client.post(url)
 
         assert response.status_code == status.HTTP_200_OK
         assert 'message' in response.data
@@ -193,8 +194,11 @@ class TestQuitarDelMercado:
         pujas = Puja.objects.filter(jugador=jugador_en_venta_con_pujas, activa=True)
         assert pujas.count() == 0
 
-        # Verificar que se llamó a crear_notificacion para cada puja
-        assert mock_crear_notificacion.call_count == 1
+        # Verificar que se notificó a cada pujador
+        from fantasy.models import Notificacion
+        notificaciones = Notificacion.objects.filter(categoria='jugador_retirado')
+        assert notificaciones.count() == 1
+        assert '12000000' in notificaciones.get().mensaje
 
     def test_quitar_del_mercado_sin_pujas(self, authenticated_client, equipo, jugador_usuario_en_venta):
         """Quitar jugador del mercado que no tiene pujas"""
@@ -526,4 +530,107 @@ class TestGuardarAlineacion:
         response = authenticated_client.post(url, data)
 
         assert response.status_code == status.HTTP_400_BAD_REQUEST
-        assert 'error' in response.data
\ No newline at end of file
+        assert 'error' in response.data
+@pytest.mark.django_db
+class TestConfirmarAlineacion:
+    """Tests para la vista confirmar_alineacion"""
+
+    def estados_validos(self, equipo):
+        """1 POR, 2 DEF y 2 DEL titulares; el resto al banquillo"""
+        cupos = {'POR': 1, 'DEF': 2, 'DEL': 2}
+        estados = []
+        for jugador in equipo.jugadores.order_by('id'):
+            titular = cupos.get(jugador.posicion, 0) > 0
+            if titular:
+                cupos[jugador.posicion] -= 1
+            estados.append({'jugador_id': jugador.id, 'en_banquillo': not titular})
+        return estados
+
+    def test_confirmar_alineacion_exitoso(self, authenticated_client, equipo_completo_con_jugadores):
+        """Guarda la formación completa y devuelve la alineación recalculada"""
+        url = reverse('confirmar_alineacion', args=[equipo_completo_con_jugadores.id])
+        estados = self.estados_validos(equipo_completo_con_jugadores)
+        response = authenticated_client.post(url, {'estados': estados}, format='json')
+
+        assert response.status_code == status.HTTP_200_OK
+        alineacion = response.data['alineacion']
+        assert alineacion['portero_titular']['nombre'] == 'Portero 1'
+        assert [d['nombre'] for d in alineacion['delanteros_titulares']] == ['Delantero 1', 'Delantero 2']
+        assert len(alineacion['banquillo']) == 3
+        for estado in estados:
+            assert Jugador.objects.get(id=estado['jugador_id']).en_banquillo == estado['en_banquillo']
+
+    def test_confirmar_alineacion_formacion_invalida(self, authenticated_client, equipo_completo_con_jugadores):
+        """Una formación incorrecta no guarda ningún cambio"""
+        url = reverse('confirmar_alineacion', args=[equipo_completo_con_jugadores.id])
+        estados = [{'jugador_id': j.id, 'en_banquillo': False} for j in equipo_completo_con_jugadores.jugadores.all()]
+        response = authenticated_client.post(url, {'estados': estados}, format='json')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert '1 POR, 2 DEF y 2 DEL' in response.data['error']
+        assert equipo_completo_con_jugadores.jugadores.filter(en_banquillo=True).count() == 3
+
+    def test_confirmar_alineacion_jugador_ajeno(self, authenticated_client, equipo_completo_con_jugadores, jugador_libre):
+        """Un jugador de fuera del equipo invalida toda la alineación"""
+        url = reverse('confirmar_alineacion', args=[equipo_completo_con_jugadores.id])
+        estados = self.estados_validos(equipo_completo_con_jugadores)
+        estados.append({'jugador_id': jugador_libre.id, 'en_banquillo': True})
+        response = authenticated_client.post(url, {'estados': estados}, format='json')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert equipo_completo_con_jugadores.jugadores.filter(en_banquillo=True).count() == 3
+
+    @pytest.mark.parametrize('valor', ['false', None, 0])
+    def test_confirmar_alineacion_en_banquillo_no_booleano(self, authenticated_client, equipo_completo_con_jugadores, valor):
+        """Un en_banquillo que no es booleano se rechaza sin guardar nada"""
+        url = reverse('confirmar_alineacion', args=[equipo_completo_con_jugadores.id])
+        estados = self.estados_validos(equipo_completo_con_jugadores)
+        estados[0]['en_banquillo'] = valor
+        response = authenticated_client.post(url, {'estados': estados}, format='json')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'en_banquillo' in response.data['error']
+        assert equipo_completo_con_jugadores.jugadores.filter(en_banquillo=True).count() == 3
+
+    def test_confirmar_alineacion_en_banquillo_ausente(self, authenticated_client, equipo_completo_con_jugadores):
+        """Falta en_banquillo: 400 en lugar de un error de integridad"""
+        url = reverse('confirmar_alineacion', args=[equipo_completo_con_jugadores.id])
+        estados = self.estados_validos(equipo_completo_con_jugadores)
+        del estados[0]['en_banquillo']
+        response = authenticated_client.post(url, {'estados': estados}, format='json')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    @pytest.mark.parametrize('estados', [{'jugador_id': 1}, ['no-es-un-objeto'], [{'jugador_id': '1', 'en_banquillo': True}]])
+    def test_confirmar_alineacion_estados_mal_formados(self, authenticated_client, equipo_completo_con_jugadores, estados):
+        """Estructuras inesperadas devuelven 400"""
+        url = reverse('confirmar_alineacion', args=[equipo_completo_con_jugadores.id])
+        response = authenticated_client.post(url, {'estados': estados}, format='json')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_confirmar_alineacion_equipo_ajeno(self, authenticated_client, equipo2):
+        """No se puede confirmar la alineación de otro usuario"""
+        url = reverse('confirmar_alineacion', args=[equipo2.id])
+        response = authenticated_client.post(url, {'estados': []}, format='json')
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_confirmar_alineacion_consultas_constantes(self, authenticated_client, equipo_completo_con_jugadores):
+        """Cambiar 2 o 6 jugadores cuesta las mismas consultas"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        url = reverse('confirmar_alineacion', args=[equipo_completo_con_jugadores.id])
+        estados = self.estados_validos(equipo_completo_con_jugadores)
+
+        with CaptureQueriesContext(connection) as muchos:
+            authenticated_client.post(url, {'estados': estados}, format='json')
+
+        # Intercambiar solo los delanteros 2 y 3
+        for estado in estados[-2:]:
+            estado['en_banquillo'] = not estado['en_banquillo']
+        with CaptureQueriesContext(connection) as pocos:
+            response = authenticated_client.post(url, {'estados': estados}, format='json')
+
+        assert response.data['cambios_realizados'] == 2
+        assert len(muchos.captured_queries) == len(pocos.captured_queries)
@@ -117,52 +117,98 @@ class TestMercadoViewSet:
         assert jugador_data['puja_actual'] == 6000000
         assert jugador_data['pujador_actual'] == equipo.nombre
 
-    @patch('fantasy.views.mercado_views.cache')
-    def test_actualizar_mercado_libre_fijo_nuevo_lote(self, mock_cache, authenticated_client, liga, jugadores_libres_mercado):
-        """Actualizar mercado genera nuevo lote cuando no existe en cache"""
-        # Configurar cache para devolver None (no hay lote)
-        mock_cache.get.return_value = None
+    def test_construir_fila_mercado_libre(self, jugador_libre_en_mercado_activo):
+        """La cuenta atrás se calcula a partir del `ahora` compartido"""
+        from fantasy.views.mercado_views import construir_fila_mercado
+        ahora = jugador_libre_en_mercado_activo.fecha_mercado + timedelta(hours=1, minutes=30)
+        
+        fila = construir_fila_mercado({}, jugador_libre_en_mercado_activo, ahora)
+        
+        assert fila['tipo'] == 'libre_rotatorio'
+        assert fila['vendedor'] == 'Agente libre'
+        assert fila['tiempo_restante'] == '22:30'
+
+    def test_list_mercado_filas_emparejadas(self, authenticated_client, liga, equipo, equipo_real):
+        """Cada fila del listado corresponde a su jugador aunque haya muchos"""
+        for i in range(30):
+            Jugador.objects.create(
+                nombre=f'Venta {i}', posicion='MED', valor=1000000 + i,
+                equipo_real=equipo_real, equipo=equipo, en_venta=True,
+                fecha_mercado=timezone.now()
+            )
         
-        # Llamar al listado que activa la actualización
         url = reverse('mercado-list')
         response = authenticated_client.get(url, {'liga_id': liga.id})
         
         assert response.status_code == status.HTTP_200_OK
-        # Verificar que se llamó a cache.set para guardar el nuevo lote
-        mock_cache.set.assert_called_once()
-
-    @patch('fantasy.views.mercado_views.cache')
-    def test_actualizar_mercado_libre_fijo_lote_existente(self, mock_cache, authenticated_client, liga):
-        """No genera nuevo lote cuando ya existe en cache"""
-        # Configurar cache para devolver True (lote existente)
-        mock_cache.get.return_value = True
-        
+        assert len(response.data) == 30
+        for fila in response.data:
+            assert fila['valor'] == 1000000 + int(fila['nombre'].split()[-1])
+            assert fila['vendedor'] == equipo.nombre
+            assert fila['fecha_expiracion'] == 'Hasta que se venda'
+
+    def test_actualizar_mercado_libre_fijo_nuevo_lote(self, jugadores_libres_mercado):
+        """Actualizar mercado genera nuevo lote cuando no hay lote del día"""
+        from fantasy.mantenimiento_mercado import actualizar_mercado_libre_fijo
+        from fantasy.models import LoteMercadoLibre
+        
+        informe = actualizar_mercado_libre_fijo()
+        
+        assert informe['lote_nuevo'] is True
+        # El lote queda registrado en la BD para el día
+        lote = LoteMercadoLibre.objects.get(fecha=timezone.now().date())
+        assert lote.jugadores == informe['jugadores_lote']
+
+    def test_actualizar_mercado_libre_fijo_lote_existente(self, jugador_libre_en_mercado_activo):
+        """No genera nuevo lote ni toca las pujas cuando ya existe el del día"""
+        from fantasy.mantenimiento_mercado import actualizar_mercado_libre_fijo
+        from fantasy.models import LoteMercadoLibre
+        LoteMercadoLibre.objects.create(fecha=timezone.now().date())
+        fecha_mercado = jugador_libre_en_mercado_activo.fecha_mercado
+        
+        informe = actualizar_mercado_libre_fijo()
+        
+        assert informe['lote_nuevo'] is False
+        jugador_libre_en_mercado_activo.refresh_from_db()
+        assert jugador_libre_en_mercado_activo.en_venta is True
+        assert jugador_libre_en_mercado_activo.fecha_mercado == fecha_mercado
+
+    @patch('fantasy.mantenimiento_mercado.generar_ofertas_automaticas')
+    @patch('fantasy.mantenimiento_mercado.actualizar_mercado_libre_fijo')
+    def test_list_mercado_no_ejecuta_mantenimiento(self, mock_actualizar, mock_generar, authenticated_client, liga):
+        """El listado del mercado es solo lectura: no rota el lote ni genera ofertas"""
         url = reverse('mercado-list')
         response = authenticated_client.get(url, {'liga_id': liga.id})
         
         assert response.status_code == status.HTTP_200_OK
-        # No debería llamar a cache.set porque ya existe el lote
-        mock_cache.set.assert_not_called()
+        mock_actualizar.assert_not_called()
+        mock_generar.assert_not_called()
 
-    @patch('fantasy.views.mercado_views.MercadoViewSet.generar_ofertas_automaticas')
-    def test_generar_ofertas_automaticas_llamado(self, mock_generar, authenticated_client, liga):
-        """Verificar que se llama a generar_ofertas_automaticas"""
+    def test_list_mercado_sin_escrituras(self, authenticated_client, liga, jugador_libre_en_mercado_activo, jugador_usuario_en_venta_24h):
+        """El listado no modifica jugadores ni crea ofertas"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        
         url = reverse('mercado-list')
-        response = authenticated_client.get(url, {'liga_id': liga.id})
+        with CaptureQueriesContext(connection) as consultas:
+            response = authenticated_client.get(url, {'liga_id': liga.id})
         
         assert response.status_code == status.HTTP_200_OK
-        mock_generar.assert_called_once()
+        escrituras = [
+            q['sql'] for q in consultas.captured_queries
+            if q['sql'].lstrip().upper().startswith(('INSERT', 'UPDATE', 'DELETE'))
+        ]
+        assert escrituras == []
 
     def test_generar_ofertas_automaticas_con_jugadores_24h(self, jugador_usuario_en_venta_24h, equipo):
         """Generar ofertas automáticas para jugadores con más de 24h en mercado"""
-        from fantasy.views.mercado_views import MercadoViewSet
-        viewset = MercadoViewSet()
+        from fantasy.mantenimiento_mercado import generar_ofertas_automaticas
         
         # Verificar ofertas existentes
         ofertas_antes = Oferta.objects.filter(jugador=jugador_usuario_en_venta_24h).count()
         
         # Ejecutar generación de ofertas automáticas
-        viewset.generar_ofertas_automaticas()
+        generar_ofertas_automaticas()
         
         # Verificar que se creó una oferta
         ofertas_despues = Oferta.objects.filter(jugador=jugador_usuario_en_venta_24h).count()
@@ -170,11 +216,10 @@ class TestMercadoViewSet:
 
     def test_generar_ofertas_automaticas_sin_jugadores_24h(self, jugador_usuario_en_venta):
         """No genera ofertas automáticas para jugadores con menos de 24h"""
-        from fantasy.views.mercado_views import MercadoViewSet
-        viewset = MercadoViewSet()
+        from fantasy.mantenimiento_mercado import generar_ofertas_automaticas
         
         ofertas_antes = Oferta.objects.count()
-        viewset.generar_ofertas_automaticas()
+        generar_ofertas_automaticas()
         ofertas_despues = Oferta.objects.count()
         
         # No debería crear ofertas para jugadores con menos de 24h
@@ -371,24 +416,25 @@ class TestMercadoEdgeCases:
         assert response.status_code == status.HTTP_200_OK
         # Debería manejar correctamente las múltiples puntuaciones
 
-    def test_mercado_cache_cleanup(self, authenticated_client, liga, jugador_libre_en_mercado_expirado):
+    def test_mercado_cache_cleanup(self, liga, jugador_libre_en_mercado_expirado):
         """Limpieza de jugadores expirados del cache"""
-        with patch('fantasy.views.mercado_views.cache') as mock_cache:
-            mock_cache.get.return_value = True  # Lote existente
-            
-            url = reverse('mercado-list')
-            response = authenticated_client.get(url, {'liga_id': liga.id})
-            
-            assert response.status_code == status.HTTP_200_OK
-            # Los jugadores expirados deberían ser limpiados
+        from fantasy.mantenimiento_mercado import actualizar_mercado_libre_fijo
+        from fantasy.models import LoteMercadoLibre
+        LoteMercadoLibre.objects.create(fecha=timezone.now().date())  # Lote existente
+        
+        actualizar_mercado_libre_fijo()
+        
+        # Los jugadores expirados deberían ser limpiados
+        jugador_libre_en_mercado_expirado.refresh_from_db()
+        assert jugador_libre_en_mercado_expirado.en_venta is False
+        assert jugador_libre_en_mercado_expirado.fecha_mercado is None
 
     def test_generar_ofertas_automaticas_monto_calculo(self, jugador_usuario_en_venta_24h):
         """Cálculo correcto del monto en ofertas automáticas"""
-        from fantasy.views.mercado_views import MercadoViewSet
-        viewset = MercadoViewSet()
+        from fantasy.mantenimiento_mercado import generar_ofertas_automaticas
         
         # Ejecutar generación
-        viewset.generar_ofertas_automaticas()
+        generar_ofertas_automaticas()
         
         # Verificar que se creó una oferta con monto razonable
         oferta = Oferta.objects.filter(jugador=jugador_usuario_en_venta_24h).first()
@@ -426,4 +472,95 @@ class TestMercadoEdgeCases:
         response = authenticated_client.get(url)
         
         assert response.status_code == status.HTTP_200_OK
-        # Solo debería ver pujas relacionadas con sus equipos
\ No newline at end of file
+        # Solo debería ver pujas relacionadas con sus equipos
+@pytest.mark.django_db
+class TestMantenimientoMercado:
+    """Tests para el comando de mantenimiento periódico del mercado"""
+
+    def test_comando_mantener_mercado(self, liga, jugadores_libres_mercado, jugador_usuario_en_venta_24h, equipo):
+        """El comando rota el lote de agentes libres y genera ofertas automáticas"""
+        from io import StringIO
+        from django.core.management import call_command
+        
+        salida = StringIO()
+        call_command('mantener_mercado', stdout=salida)
+        
+        assert Jugador.objects.filter(equipo__isnull=True, en_venta=True).count() == 8
+        assert Oferta.objects.filter(jugador=jugador_usuario_en_venta_24h).count() == 1
+        assert 'lote nuevo=True' in salida.getvalue()
+
+    def test_comando_sin_candado_no_mantiene(self, jugadores_libres_mercado):
+        """Si otro proceso tiene el candado del mantenimiento, la pasada se salta"""
+        from contextlib import contextmanager
+        from io import StringIO
+        from django.core.management import call_command
+        from fantasy.models import LoteMercadoLibre
+
+        @contextmanager
+        def candado_ocupado():
+            yield False
+
+        salida = StringIO()
+        with patch('fantasy.mantenimiento_mercado.candado_mantenimiento', candado_ocupado):
+            call_command('mantener_mercado', stdout=salida)
+
+        assert 'Otro proceso' in salida.getvalue()
+        assert not LoteMercadoLibre.objects.exists()
+
+    def test_mantenimiento_lote_estable_en_el_dia(self, jugadores_libres_mercado):
+        """Una segunda pasada en el mismo día no cambia el lote"""
+        from fantasy.mantenimiento_mercado import ejecutar_mantenimiento
+        
+        ejecutar_mantenimiento()
+        lote = set(Jugador.objects.filter(en_venta=True, equipo__isnull=True).values_list('id', flat=True))
+        # Un comando suelto arranca con la caché vacía: el lote del día sale de la BD
+        cache.clear()
+        informe = ejecutar_mantenimiento()
+        
+        assert informe['lote_nuevo'] is False
+        assert set(Jugador.objects.filter(en_venta=True, equipo__isnull=True).values_list('id', flat=True)) == lote
+
+    def test_ofertas_automaticas_consultas_constantes(self, equipo, equipo2, equipo_real):
+        """El número de consultas no depende de cuántos jugadores lleven 24h en venta"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from fantasy.mantenimiento_mercado import generar_ofertas_automaticas
+
+        def crear_en_venta(cantidad, inicio):
+            for i in range(inicio, inicio + cantidad):
+                Jugador.objects.create(
+                    nombre=f'En venta {i}', posicion='DEF', valor=5000000,
+                    equipo_real=equipo_real, equipo=equipo2, en_venta=True,
+                    fecha_mercado=timezone.now() - timedelta(hours=25)
+                )
+
+        crear_en_venta(2, 0)
+        with CaptureQueriesContext(connection) as pocas:
+            assert generar_ofertas_automaticas() == 2
+
+        Oferta.objects.all().delete()
+        crear_en_venta(18, 2)
+        with CaptureQueriesContext(connection) as muchas:
+            assert generar_ofertas_automaticas() == 20
+
+        assert len(muchas.captured_queries) == len(pocas.captured_queries)
+        assert Jugador.objects.filter(equipo=equipo2, equipo_pujador=equipo).count() == 20
+
+    def test_ofertas_automaticas_en_varias_pasadas_del_dia(self, liga, equipo, equipo2, equipo_real):
+        """Cada pasada del día elige un comprador que aún no ha ofertado por el jugador"""
+        from django.contrib.auth.models import User
+        from fantasy.mantenimiento_mercado import generar_ofertas_automaticas
+        tercero = Equipo.objects.create(
+            usuario=User.objects.create_user(username='tercero', password='x'), liga=liga, nombre='Tercero'
+        )
+        jugador = Jugador.objects.create(
+            nombre='En venta', posicion='DEF', valor=5000000, equipo_real=equipo_real, equipo=equipo2,
+            en_venta=True, fecha_mercado=timezone.now() - timedelta(hours=25)
+        )
+
+        assert generar_ofertas_automaticas() == 1
+        assert generar_ofertas_automaticas() == 1
+        # Ya ofertaron los dos equipos posibles: la tercera pasada no repite
+        assert generar_ofertas_automaticas() == 0
+
+        assert set(Oferta.objects.filter(jugador=jugador).values_list('equipo_ofertante_id', flat=True)) == {equipo.id, tercero.id}
@@ -85,17 +85,11 @@ class TestNotificacionesViews:
         assert response.status_code == status.HTTP_200_OK
         assert response.data['cantidad_actualizadas'] == 5  # 5 no leídas
         
-        # Verificar que todas las notificaciones relevantes están marcadas como leídas
-        notificaciones_no_leidas = Notificacion.objects.filter(
-            leida=False
-        ).filter(
-            tipo='publica'
-        ) | Notificacion.objects.filter(
-            destinatario=authenticated_client.handler._force_user,
-            leida=False
-        )
-        
-        assert notificaciones_no_leidas.count() == 0
+        # Verificar que no quedan notificaciones sin leer para el usuario
+        from fantasy.notificaciones import publicas_no_leidas, privadas_no_leidas
+        usuario = authenticated_client.handler._force_user
+        assert publicas_no_leidas(usuario.id).count() == 0
+        assert privadas_no_leidas(usuario.id).count() == 0
 
     def test_marcar_todas_leidas_sin_notificaciones(self, authenticated_client):
         """Marcar todas como leídas cuando no hay notificaciones"""
@@ -131,9 +125,8 @@ class TestNotificacionesViews:
 
         assert response.status_code == status.HTTP_200_OK
         
-        # Verificar que la notificación pública está marcada como leída
-        notificacion_publica.refresh_from_db()
-        assert notificacion_publica.leida is True
+        # Verificar que la notificación pública está marcada como leída para el usuario
+        assert notificacion_publica.lecturas.filter(usuario=authenticated_client.handler._force_user).exists()
 
     def test_marcar_como_leida_inexistente(self, authenticated_client):
         """Intento de marcar notificación inexistente como leída"""
@@ -230,4 +223,273 @@ class TestNotificacionViewSet:
         response = authenticated_client.delete(url)
 
         # Asumimos que no se permite eliminar desde la API
-        assert response.status_code in [status.HTTP_405_METHOD_NOT_ALLOWED, status.HTTP_403_FORBIDDEN]
\ No newline at end of file
+        assert response.status_code in [status.HTTP_405_METHOD_NOT_ALLOWED, status.HTTP_403_FORBIDDEN]
+
+@pytest.mark.django_db
+class TestFeedNotificaciones:
+    """Tests para el feed paginado por cursor de listar_notificaciones"""
+
+    def crear(self, cantidad, destinatario=None):
+        tipo = 'privada' if destinatario else 'publica'
+        return [
+            Notificacion.objects.create(tipo=tipo, categoria='traspaso', titulo=f'N{i}', mensaje='m',
+                                        destinatario=destinatario)
+            for i in range(cantidad)
+        ]
+
+    def test_paginas_hacia_atras(self, authenticated_client, user, user2):
+        creadas = self.crear(5) + self.crear(3, destinatario=user)
+        self.crear(4, destinatario=user2)
+        url = reverse('listar-notificaciones')
+
+        vistas, cursor = [], None
+        while True:
+            parametros = {'limite': 3}
+            if cursor:
+                parametros['before'] = cursor
+            datos = authenticated_client.get(url, parametros).json()
+            vistas += [n['id'] for n in datos['notificaciones']]
+            cursor = datos['siguiente']
+            if not datos['hay_mas']:
+                break
+
+        assert vistas == [n.id for n in reversed(creadas)]
+        assert cursor is None
+        assert set(datos['notificaciones'][0]) == {
+            'id', 'tipo', 'categoria', 'titulo', 'mensaje', 'leida', 'fecha_creacion', 'tiempo_desde_creacion'
+        }
+        assert datos['notificaciones'][0]['tiempo_desde_creacion'].endswith('atrás')
+
+    def test_since_devuelve_solo_nuevas(self, authenticated_client, user):
+        self.crear(2)
+        url = reverse('listar-notificaciones')
+        ultimo = authenticated_client.get(url).json()['ultimo']
+
+        assert authenticated_client.get(url, {'since': ultimo}).json()['notificaciones'] == []
+
+        nuevas = self.crear(3, destinatario=user)
+        datos = authenticated_client.get(url, {'since': ultimo, 'limite': 2}).json()
+        assert [n['id'] for n in datos['notificaciones']] == [nuevas[1].id, nuevas[0].id]
+        assert datos['hay_mas'] is True
+
+        datos = authenticated_client.get(url, {'since': datos['ultimo']}).json()
+        assert [n['id'] for n in datos['notificaciones']] == [nuevas[2].id]
+        assert datos['hay_mas'] is False
+
+    def test_misma_fecha_desempata_por_id(self, authenticated_client):
+        from django.utils import timezone
+        creadas = self.crear(4)
+        Notificacion.objects.update(fecha_creacion=timezone.now())
+        url = reverse('listar-notificaciones')
+
+        primera = authenticated_client.get(url, {'limite': 2}).json()
+        segunda = authenticated_client.get(url, {'limite': 2, 'before': primera['siguiente']}).json()
+
+        ids = [n['id'] for n in primera['notificaciones'] + segunda['notificaciones']]
+        assert ids == [n.id for n in reversed(creadas)]
+
+    def test_mezcla_ramas_intercaladas(self, authenticated_client, user):
+        """Públicas y privadas intercaladas en el tiempo salen en orden con consultas fijas por página"""
+        from datetime import timedelta
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from django.utils import timezone
+        from fantasy.notificaciones import feed_usuario
+        base = timezone.now() - timedelta(hours=1)
+        creadas = []
+        for i in range(6):
+            notificacion = self.crear(1, destinatario=user if i % 2 else None)[0]
+            Notificacion.objects.filter(id=notificacion.id).update(fecha_creacion=base + timedelta(minutes=i))
+            creadas.append(notificacion)
+        url = reverse('listar-notificaciones')
+
+        primera = authenticated_client.get(url, {'limite': 4}).json()
+        segunda = authenticated_client.get(url, {'limite': 4, 'before': primera['siguiente']}).json()
+
+        ids = [n['id'] for n in primera['notificaciones'] + segunda['notificaciones']]
+        assert ids == [n.id for n in reversed(creadas)]
+        assert segunda['hay_mas'] is False
+        # Cursor de lectura + una consulta por rama, con independencia del tamaño de la página
+        with CaptureQueriesContext(connection) as consultas:
+            feed_usuario(user, limite=4)
+        assert len(consultas.captured_queries) == 3
+
+    def test_cursor_invalido(self, authenticated_client):
+        response = authenticated_client.get(reverse('listar-notificaciones'), {'before': 'no-es-un-cursor'})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+class TestContadorNoLeidas:
+    """Contadores de no leídas en caché"""
+
+    @pytest.fixture(autouse=True)
+    def contadores(self, settings):
+        # En los tests la caché en memoria es compartida: un único proceso
+        settings.NOTIFICACIONES_CONTADORES = True
+
+    def contar(self, cliente):
+        return cliente.get(reverse('contar-no-leidas')).json()['cantidad_no_leidas']
+
+    def test_segunda_lectura_no_consulta_notificaciones(self, authenticated_client, multiple_notificaciones):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        assert self.contar(authenticated_client) == 5
+
+        with CaptureQueriesContext(connection) as consultas:
+            assert self.contar(authenticated_client) == 5
+        assert not any('fantasy_notificacion' in q['sql'] for q in consultas.captured_queries)
+
+    def test_helpers_incrementan_tras_commit(self, authenticated_client, equipo, equipo2, jugador_libre, django_capture_on_commit_callbacks):
+        from fantasy.views.utils_views import crear_notificacion_distribucion_dinero, crear_notificacion_oferta_rechazada
+        assert self.contar(authenticated_client) == 0
+
+        with django_capture_on_commit_callbacks(execute=True):
+            crear_notificacion_distribucion_dinero(1000)
+            crear_notificacion_oferta_rechazada(jugador_libre, equipo)
+            crear_notificacion_oferta_rechazada(jugador_libre, equipo2)
+
+        assert self.contar(authenticated_client) == 2
+
+    def test_marcar_leidas_reinicia_y_descuenta(self, authenticated_client, multiple_notificaciones, django_capture_on_commit_callbacks):
+        assert self.contar(authenticated_client) == 5
+        no_leida = Notificacion.objects.filter(tipo='publica', leida=False).first()
+
+        with django_capture_on_commit_callbacks(execute=True):
+            authenticated_client.post(reverse('marcar-notificacion-leida', args=[no_leida.id]))
+            authenticated_client.post(reverse('marcar-notificacion-leida', args=[no_leida.id]))
+        assert self.contar(authenticated_client) == 4
+
+        with django_capture_on_commit_callbacks(execute=True):
+            authenticated_client.post(reverse('marcar-todas-leidas'))
+        assert self.contar(authenticated_client) == 0
+
+    def test_publica_nueva_solo_cuenta_las_posteriores(self, authenticated_client, user, user2, multiple_notificaciones, django_capture_on_commit_callbacks):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from rest_framework.test import APIClient
+        from fantasy.notificaciones import contar_no_leidas
+        from fantasy.views.utils_views import crear_notificacion_distribucion_dinero
+        cliente2 = APIClient()
+        cliente2.force_authenticate(user=user2)
+        assert self.contar(authenticated_client) == 5
+        assert self.contar(cliente2) == 3
+
+        with django_capture_on_commit_callbacks(execute=True):
+            crear_notificacion_distribucion_dinero(1000)
+
+        with CaptureQueriesContext(connection) as consultas:
+            assert contar_no_leidas(user.id) == 6
+        # Solo el rango de públicas posteriores a las ya contadas, no un recuento completo
+        sql = [q['sql'] for q in consultas.captured_queries if 'fantasy_notificacion' in q['sql']]
+        assert len(sql) == 1
+        assert '"fantasy_notificacion"."id" >' in sql[0]
+        assert self.contar(cliente2) == 4
+
+    def test_sin_contadores_cuenta_en_bd(self, authenticated_client, settings, multiple_notificaciones):
+        from django.core.cache import cache
+        from fantasy.notificaciones import clave_no_leidas
+        settings.NOTIFICACIONES_CONTADORES = False
+        assert self.contar(authenticated_client) == 5
+        Notificacion.objects.filter(tipo='publica').delete()
+
+        assert self.contar(authenticated_client) == 2
+        assert cache.get(clave_no_leidas(authenticated_client.handler._force_user.id)) is None
+
+    def test_reconciliar_corrige_desviaciones(self, authenticated_client, user, multiple_notificaciones):
+        from django.core.cache import cache
+        from fantasy.notificaciones import reconciliar_contadores, clave_no_leidas
+        assert self.contar(authenticated_client) == 5
+        # Cambio hecho por fuera de los helpers: el contador cacheado queda desviado
+        Notificacion.objects.filter(destinatario=user).update(leida=True)
+        assert self.contar(authenticated_client) == 5
+
+        informe = reconciliar_contadores()
+
+        assert informe['corregidos'] == 1
+        assert cache.get(clave_no_leidas(user.id)) == 0
+        assert self.contar(authenticated_client) == 3
+
+
+@pytest.mark.django_db
+class TestLecturaPublicas:
+    """Estado de lectura de las notificaciones públicas por usuario"""
+
+    @pytest.fixture
+    def cliente2(self, user2):
+        from rest_framework.test import APIClient
+        cliente = APIClient()
+        cliente.force_authenticate(user=user2)
+        return cliente
+
+    def crear_publicas(self, cantidad):
+        return [
+            Notificacion.objects.create(tipo='publica', categoria='traspaso', titulo=f'P{i}', mensaje='m')
+            for i in range(cantidad)
+        ]
+
+    def contar(self, cliente):
+        return cliente.get(reverse('contar-no-leidas')).json()['cantidad_no_leidas']
+
+    def test_marcar_todas_no_afecta_a_otros_usuarios(self, authenticated_client, cliente2):
+        publicas = self.crear_publicas(3)
+
+        response = authenticated_client.post(reverse('marcar-todas-leidas'))
+
+        assert response.json()['cantidad_actualizadas'] == 3
+        assert self.contar(authenticated_client) == 0
+        assert self.contar(cliente2) == 3
+        # La fila compartida no se escribe
+        assert not Notificacion.objects.filter(id__in=[p.id for p in publicas], leida=True).exists()
+
+    def test_publica_nueva_tras_marcar_todas(self, authenticated_client):
+        from datetime import timedelta
+        from django.utils import timezone
+        self.crear_publicas(2)
+        authenticated_client.post(reverse('marcar-todas-leidas'))
+
+        nueva = self.crear_publicas(1)[0]
+        Notificacion.objects.filter(id=nueva.id).update(fecha_creacion=timezone.now() + timedelta(seconds=1))
+
+        assert self.contar(authenticated_client) == 1
+
+    def test_feed_refleja_lectura_del_usuario(self, authenticated_client, cliente2):
+        leida, pendiente = self.crear_publicas(2)
+        authenticated_client.post(reverse('marcar-notificacion-leida', args=[leida.id]))
+
+        propias = {n['id']: n['leida'] for n in authenticated_client.get(reverse('listar-notificaciones')).json()['notificaciones']}
+        ajenas = {n['id']: n['leida'] for n in cliente2.get(reverse('listar-notificaciones')).json()['notificaciones']}
+
+        assert propias == {leida.id: True, pendiente.id: False}
+        assert ajenas == {leida.id: False, pendiente.id: False}
+        assert self.contar(authenticated_client) == 1
+
+    def test_usuario_nuevo_no_hereda_publicas_anteriores(self, authenticated_client):
+        from django.contrib.auth.models import User
+        from rest_framework.test import APIClient
+        from fantasy.models import LecturaNotificaciones
+        antiguas = self.crear_publicas(2)
+        # Se registra después de las públicas y nunca ha marcado todas
+        nuevo = User.objects.create_user(username='recien_llegado', password='x')
+        posterior = self.crear_publicas(1)[0]
+        cliente = APIClient()
+        cliente.force_authenticate(user=nuevo)
+
+        feed = {n['id']: n['leida'] for n in cliente.get(reverse('listar-notificaciones')).json()['notificaciones']}
+
+        assert not LecturaNotificaciones.objects.filter(usuario=nuevo).exists()
+        assert self.contar(cliente) == 1
+        assert feed == {antiguas[0].id: True, antiguas[1].id: True, posterior.id: False}
+
+    def test_marcar_todas_consultas_constantes(self, authenticated_client, user, notificacion_privada):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from fantasy.notificaciones import marcar_todas_leidas
+
+        def medir(cantidad):
+            self.crear_publicas(cantidad)
+            with CaptureQueriesContext(connection) as consultas:
+                marcar_todas_leidas(user)
+            return len(consultas.captured_queries)
+
+        assert medir(2) == medir(40)
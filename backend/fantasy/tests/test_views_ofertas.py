@@ -364,4 +364,119 @@ class TestOfertasViews:
         url = reverse('retirar_oferta', args=[oferta_aceptada.id])
         response = authenticated_client.post(url)
 
-        assert response.status_code == status.HTTP_404_NOT_FOUND
\ No newline at end of file
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_aceptar_oferta_dos_veces(self, equipo, equipo2, oferta_pendiente):
+        """La segunda aceptación no vuelve a mover dinero"""
+        from rest_framework.test import APIClient
+        client = APIClient()
+        client.force_authenticate(user=equipo2.usuario)
+        url = reverse('aceptar_oferta', args=[oferta_pendiente.id])
+
+        assert client.post(url).status_code == status.HTTP_200_OK
+        equipo.refresh_from_db()
+        equipo2.refresh_from_db()
+        presupuestos = (equipo.presupuesto, equipo2.presupuesto)
+
+        response = client.post(url)
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        equipo.refresh_from_db()
+        equipo2.refresh_from_db()
+        assert (equipo.presupuesto, equipo2.presupuesto) == presupuestos
+
+    def test_aceptar_oferta_jugador_ya_traspasado(self, equipo, equipo2, oferta_pendiente):
+        """Si el jugador ya no es del receptor, la oferta no se cobra"""
+        from rest_framework.test import APIClient
+        client = APIClient()
+        client.force_authenticate(user=equipo2.usuario)
+        Jugador.objects.filter(id=oferta_pendiente.jugador_id).update(equipo=None)
+
+        response = client.post(reverse('aceptar_oferta', args=[oferta_pendiente.id]))
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        equipo.refresh_from_db()
+        equipo2.refresh_from_db()
+        assert (equipo.presupuesto, equipo2.presupuesto) == (50000000, 50000000)
+        oferta_pendiente.refresh_from_db()
+        assert oferta_pendiente.estado == 'pendiente'
+
+    def test_retirar_oferta_devuelve_una_vez(self, authenticated_client, equipo, oferta_pendiente):
+        """Retirar dos veces solo devuelve el dinero una vez"""
+        url = reverse('retirar_oferta', args=[oferta_pendiente.id])
+
+        assert authenticated_client.post(url).status_code == status.HTTP_200_OK
+        assert authenticated_client.post(url).status_code == status.HTTP_404_NOT_FOUND
+
+        # La fixture no reserva el monto: tras una única devolución queda sumado una vez
+        equipo.refresh_from_db()
+        assert equipo.presupuesto == 50000000 + oferta_pendiente.monto
+
+@pytest.mark.django_db
+class TestAceptarOfertaEnBloque:
+    """Aceptar una oferta rechaza y reembolsa las competidoras en bloque"""
+
+    def crear_competidoras(self, jugador, liga, cantidad, inicio=0):
+        from django.contrib.auth.models import User
+        equipos = []
+        for i in range(inicio, inicio + cantidad):
+            usuario = User.objects.create_user(username=f'competidor{i}', password='x')
+            equipo = Equipo.objects.create(usuario=usuario, liga=liga, nombre=f'Competidor {i}', presupuesto=1000000)
+            # Dos ofertas por equipo: el reembolso debe sumar ambas
+            for monto in (2000000, 3000000):
+                Oferta.objects.create(
+                    jugador=jugador, equipo_receptor=jugador.equipo,
+                    equipo_ofertante=equipo, monto=monto, estado='pendiente'
+                )
+            equipos.append(equipo)
+        return equipos
+
+    def aceptar(self, equipo2, oferta):
+        from rest_framework.test import APIClient
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        client = APIClient()
+        client.force_authenticate(user=equipo2.usuario)
+        with CaptureQueriesContext(connection) as consultas:
+            response = client.post(reverse('aceptar_oferta', args=[oferta.id]))
+        assert response.status_code == status.HTTP_200_OK
+        return len(consultas.captured_queries)
+
+    def test_reembolsos_y_notificaciones(self, equipo, equipo2, jugador_usuario, django_capture_on_commit_callbacks):
+        from fantasy.models import Notificacion
+        competidores = self.crear_competidoras(jugador_usuario, equipo.liga, 3)
+        aceptada = Oferta.objects.create(
+            jugador=jugador_usuario, equipo_receptor=equipo2,
+            equipo_ofertante=equipo, monto=9000000, estado='pendiente'
+        )
+
+        # Los avisos de rechazo se envían tras el commit
+        with django_capture_on_commit_callbacks(execute=True):
+            self.aceptar(equipo2, aceptada)
+
+        for competidor in competidores:
+            competidor.refresh_from_db()
+            assert competidor.presupuesto == 1000000 + 5000000
+        assert Oferta.objects.filter(jugador=jugador_usuario, estado='rechazada').count() == 6
+        assert Notificacion.objects.filter(categoria='oferta_rechazada').count() == 6
+        assert set(Notificacion.objects.filter(categoria='oferta_rechazada').values_list('destinatario', flat=True)) == {
+            c.usuario_id for c in competidores
+        }
+
+    def test_consultas_constantes(self, equipo, equipo2, equipo_real):
+        """El número de consultas no depende de cuántas ofertas compitan"""
+        consultas = []
+        for cantidad, inicio in ((2, 0), (25, 100)):
+            # Sin puntos, para que el traspaso no mueva la clasificación
+            jugador = Jugador.objects.create(
+                nombre=f'Jugador Caliente {inicio}', posicion='DEL', valor=7000000,
+                puntos_totales=0, equipo_real=equipo_real, equipo=equipo2, en_venta=True
+            )
+            self.crear_competidoras(jugador, equipo.liga, cantidad, inicio=inicio)
+            aceptada = Oferta.objects.create(
+                jugador=jugador, equipo_receptor=equipo2,
+                equipo_ofertante=equipo, monto=9000000, estado='pendiente'
+            )
+            consultas.append(self.aceptar(equipo2, aceptada))
+
+        assert consultas[0] == consultas[1]
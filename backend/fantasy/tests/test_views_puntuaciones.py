@@ -224,8 +224,10 @@ class TestActualizarPuntuacionJugadorView:
 
     def test_actualizar_puntuacion_actualizar_existente(self, authenticated_client, jugador_portero, jornada):
         """Actualizar puntuación existente"""
-        # Crear puntuación inicial
+        # Crear puntuación inicial (con el total del jugador ya al día)
         Puntuacion.objects.create(jugador=jugador_portero, jornada=jornada, puntos=5, goles=0)
+        jugador_portero.puntos_totales = 5
+        jugador_portero.save()
         
         data = {
             'jugador_id': jugador_portero.id,
@@ -293,6 +295,125 @@ class TestActualizarPuntuacionJugadorView:
         assert jugador_portero.puntos_totales == 14
         assert jugador_portero.valor == 5000000 + (14 * 100000)  # 5000000 + 1400000
 
+    def test_actualizar_puntuacion_aplica_diferencia(self, authenticated_client, jugador_portero, jornada):
+        """Editar una puntuación suma la diferencia sin recorrer el historial del jugador"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        url = reverse('actualizar_puntuacion_jugador')
+        data = {'jugador_id': jugador_portero.id, 'jornada_id': jornada.id, 'puntos': 4, 'goles': 1}
+
+        authenticated_client.post(url, data)
+        data['puntos'] = 5
+        with CaptureQueriesContext(connection) as corto:
+            authenticated_client.post(url, data)
+        for numero in range(2, 30):
+            Puntuacion.objects.create(jugador=jugador_portero, jornada=Jornada.objects.create(numero=numero), puntos=1)
+        data['puntos'] = 6
+        with CaptureQueriesContext(connection) as largo:
+            response = authenticated_client.post(url, data)
+
+        # Las puntuaciones creadas directamente no cuentan: solo se aplica la diferencia 6 - 4
+        assert response.data['jugador']['puntos_totales'] == 6
+        jugador_portero.refresh_from_db()
+        assert jugador_portero.goles == 1
+        assert len(largo.captured_queries) == len(corto.captured_queries)
+
+@pytest.mark.django_db
+class TestImportarPuntuacionesView:
+    """Tests para la carga en bloque de puntuaciones de un partido"""
+
+    def crear_jugadores(self, equipo_real, cantidad, equipo=None):
+        return [
+            Jugador.objects.create(nombre=f'Importado {i}', posicion='DEF', equipo_real=equipo_real,
+                                   equipo=equipo, puntos_totales=0)
+            for i in range(cantidad)
+        ]
+
+    def test_importar_sin_autenticacion(self, api_client):
+        response = api_client.post(reverse('importar_puntuaciones'), {}, format='json')
+        assert response.status_code in [status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN]
+
+    def test_importar_solo_admin(self, authenticated_client, jornada, equipo_real):
+        jugador = self.crear_jugadores(equipo_real, 1)[0]
+        data = {'jornada_id': jornada.id, 'puntuaciones': [{'jugador_id': jugador.id, 'puntos': 50}]}
+
+        response = authenticated_client.post(reverse('importar_puntuaciones'), data, format='json')
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+        assert not Puntuacion.objects.exists()
+
+    def test_importar_partido_crea_y_actualiza(self, admin_client, partido, equipo_real, equipo):
+        from fantasy.models import ClasificacionEquipo
+        jugadores = self.crear_jugadores(equipo_real, 3, equipo=equipo)
+        Puntuacion.objects.create(jugador=jugadores[0], jornada=partido.jornada, puntos=1, goles=0)
+        otra_jornada = Jornada.objects.create(numero=partido.jornada.numero + 1)
+        Puntuacion.objects.create(jugador=jugadores[0], jornada=otra_jornada, puntos=4, goles=1)
+
+        data = {
+            'partido_id': partido.id,
+            'puntuaciones': [
+                {'jugador_id': jugadores[0].id, 'puntos': 6, 'goles': 2},
+                {'jugador_id': jugadores[1].id, 'puntos': 3},
+                {'jugador_id': jugadores[2].id, 'puntos': -1, 'goles': 0},
+            ]
+        }
+        response = admin_client.post(reverse('importar_puntuaciones'), data, format='json')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['informe']['puntuaciones'] == 3
+        assert Puntuacion.objects.get(jugador=jugadores[0], jornada=partido.jornada).puntos == 6
+
+        jugadores[0].refresh_from_db()
+        assert jugadores[0].puntos_totales == 10
+        assert jugadores[0].goles == 3
+        assert jugadores[0].valor == 5000000 + 10 * 100000
+        jugadores[2].refresh_from_db()
+        assert jugadores[2].puntos_totales == -1
+
+        clasificacion = ClasificacionEquipo.objects.get(equipo=equipo)
+        assert clasificacion.puntos_totales == 12
+        assert clasificacion.ultima_jornada == otra_jornada.numero
+
+    def test_importar_rechaza_jugador_de_otro_equipo(self, admin_client, partido):
+        ajeno = EquipoReal.objects.create(nombre='Ajeno')
+        jugador = self.crear_jugadores(ajeno, 1)[0]
+        data = {'partido_id': partido.id, 'puntuaciones': [{'jugador_id': jugador.id, 'puntos': 5}]}
+
+        response = admin_client.post(reverse('importar_puntuaciones'), data, format='json')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert not Puntuacion.objects.exists()
+
+    def test_importar_payload_invalido(self, admin_client, jornada, equipo_real):
+        jugador = self.crear_jugadores(equipo_real, 1)[0]
+        url = reverse('importar_puntuaciones')
+
+        for puntuaciones in ([], [{'jugador_id': jugador.id}], [{'jugador_id': jugador.id, 'puntos': 'x'}],
+                             [{'jugador_id': jugador.id, 'puntos': 1}, {'jugador_id': jugador.id, 'puntos': 2}]):
+            response = admin_client.post(
+                url, {'jornada_id': jornada.id, 'puntuaciones': puntuaciones}, format='json'
+            )
+            assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+        response = admin_client.post(url, {'jornada_id': 9999, 'puntuaciones': []}, format='json')
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_importar_consultas_constantes(self, jornada, equipo_real, equipo):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from fantasy.puntuaciones import importar_puntuaciones
+
+        pocos_jugadores = self.crear_jugadores(equipo_real, 2, equipo=equipo)
+        with CaptureQueriesContext(connection) as pocos:
+            importar_puntuaciones(jornada, [{'jugador_id': j.id, 'puntos': 2} for j in pocos_jugadores])
+
+        muchos_jugadores = self.crear_jugadores(equipo_real, 40, equipo=equipo)
+        with CaptureQueriesContext(connection) as muchos:
+            importar_puntuaciones(jornada, [{'jugador_id': j.id, 'puntos': 2} for j in muchos_jugadores])
+
+        assert len(muchos.captured_queries) == len(pocos.captured_queries)
+
+
 @pytest.mark.django_db
 class TestEquiposDisponiblesJornadaView:
     """Tests para equipos_disponibles_jornada"""
@@ -570,4 +691,202 @@ class TestForzarCongelacionView:
         
         # Verificar que se actualizó la alineación
         alineacion_congelada.refresh_from_db()
-        assert nuevo_jugador in alineacion_congelada.jugadores_titulares.all()
\ No newline at end of file
+        assert nuevo_jugador in alineacion_congelada.jugadores_titulares.all()
+
+@pytest.mark.django_db
+class TestCongelarAlineacionesJornada:
+    """Tests para la congelación de alineaciones de toda una jornada"""
+
+    def crear_equipos(self, liga, equipo_real, cantidad, inicio=0):
+        """Equipos con formación completa: 1 POR, 2 DEF y 2 DEL titulares y un suplente"""
+        from django.contrib.auth.models import User
+        from fantasy.models import Equipo
+        for i in range(inicio, inicio + cantidad):
+            equipo = Equipo.objects.create(
+                usuario=User.objects.create_user(username=f'congelado{i}', password='x'),
+                liga=liga, nombre=f'Congelado {i}'
+            )
+            for posicion, banquillo in (('POR', False), ('DEF', False), ('DEF', False),
+                                        ('DEL', False), ('DEL', False), ('DEF', True)):
+                Jugador.objects.create(
+                    nombre=f'{posicion} {i}', posicion=posicion, valor=1000000,
+                    equipo_real=equipo_real, equipo=equipo, en_banquillo=banquillo
+                )
+
+    def test_congelar_solo_admin(self, authenticated_client, jornada):
+        url = reverse('congelar_alineaciones_jornada', args=[jornada.id])
+        response = authenticated_client.post(url)
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_congelar_todos_los_equipos(self, admin_client, jornada, liga, equipo_real, equipo_con_alineacion_futbol_sala):
+        self.crear_equipos(liga, equipo_real, 3)
+
+        url = reverse('congelar_alineaciones_jornada', args=[jornada.id])
+        response = admin_client.post(url)
+
+        assert response.status_code == status.HTTP_200_OK
+        informe = response.data['informe']
+        assert informe['equipos_congelados'] == 4
+        assert informe['titulares'] == 20
+        assert informe['incompletas'] == 1
+
+        incompleta = AlineacionCongelada.objects.get(equipo=equipo_con_alineacion_futbol_sala, jornada=jornada)
+        assert incompleta.posiciones_faltantes == ['DEL']
+        assert incompleta.jugadores_titulares.count() == 5
+        assert AlineacionCongelada.objects.filter(jornada=jornada, tiene_posiciones_completas=True).count() == 3
+        jornada.refresh_from_db()
+        assert jornada.alineaciones_congeladas is True
+
+    def test_congelar_es_idempotente(self, jornada, liga, equipo_real):
+        from fantasy.jornadas import congelar_jornada
+        self.crear_equipos(liga, equipo_real, 2)
+
+        congelar_jornada(jornada)
+        informe = congelar_jornada(jornada)
+
+        assert informe['equipos_congelados'] == 0
+        assert informe['ya_congelados'] == 2
+        assert AlineacionCongelada.objects.filter(jornada=jornada).count() == 2
+
+    def test_congelar_consultas_constantes(self, liga, equipo_real):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from fantasy.jornadas import congelar_jornada
+
+        self.crear_equipos(liga, equipo_real, 2)
+        with CaptureQueriesContext(connection) as pocos:
+            congelar_jornada(Jornada.objects.create(numero=10))
+
+        self.crear_equipos(liga, equipo_real, 20, inicio=100)
+        with CaptureQueriesContext(connection) as muchos:
+            informe = congelar_jornada(Jornada.objects.create(numero=11))
+
+        assert informe['equipos_congelados'] == 22
+        assert len(muchos.captured_queries) == len(pocos.captured_queries)
+
+    def test_congelar_jornadas_iniciadas(self, liga, equipo_real):
+        from datetime import timedelta
+        from django.utils import timezone
+        from fantasy.jornadas import congelar_jornadas_pendientes
+
+        self.crear_equipos(liga, equipo_real, 1)
+        iniciada = Jornada.objects.create(numero=20, fecha_inicio=timezone.now() - timedelta(minutes=1))
+        futura = Jornada.objects.create(numero=21, fecha_inicio=timezone.now() + timedelta(days=7))
+
+        informes = congelar_jornadas_pendientes()
+
+        assert [i['jornada'] for i in informes] == [20]
+        assert AlineacionCongelada.objects.filter(jornada=iniciada).count() == 1
+        assert not AlineacionCongelada.objects.filter(jornada=futura).exists()
+        assert congelar_jornadas_pendientes() == []
+
+
+@pytest.mark.django_db
+class TestCerrarJornada:
+    """Tests para el cierre de jornada: puntos y reparto de dinero"""
+
+    def preparar(self, liga, equipo_real, jornada, cantidad, inicio=0, puntos=2):
+        """Congela equipos completos y da `puntos` a cada titular en la jornada"""
+        from fantasy.jornadas import congelar_jornada
+        TestCongelarAlineacionesJornada().crear_equipos(liga, equipo_real, cantidad, inicio=inicio)
+        congelar_jornada(jornada)
+        for jugador in Jugador.objects.filter(equipo__nombre__startswith='Congelado', en_banquillo=False):
+            Puntuacion.objects.get_or_create(jugador=jugador, jornada=jornada, defaults={'puntos': puntos})
+
+    def test_cerrar_solo_admin(self, authenticated_client, jornada):
+        url = reverse('cerrar_jornada', args=[jornada.id])
+        response = authenticated_client.post(url)
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_cerrar_reparte_dinero(self, admin_client, liga, equipo_real, jornada):
+        from fantasy.models import Equipo, Notificacion
+        self.preparar(liga, equipo_real, jornada, 2)
+        suplente = Jugador.objects.filter(equipo__nombre='Congelado 0', en_banquillo=True).first()
+        Puntuacion.objects.create(jugador=suplente, jornada=jornada, puntos=10)
+        presupuestos = dict(Equipo.objects.values_list('id', 'presupuesto'))
+
+        response = admin_client.post(reverse('cerrar_jornada', args=[jornada.id]))
+
+        assert response.status_code == status.HTTP_200_OK
+        informe = response.data['informe']
+        assert informe['equipos_abonados'] == 2
+        assert informe['monto_total'] == 2 * 10 * 100000
+        for alineacion in AlineacionCongelada.objects.filter(jornada=jornada):
+            assert alineacion.puntos_obtenidos == 10
+            assert alineacion.dinero_ganado == alineacion.dinero_abonado == 1000000
+            assert alineacion.equipo.presupuesto == presupuestos[alineacion.equipo_id] + 1000000
+        assert Notificacion.objects.filter(categoria='distribucion_dinero').count() == 1
+
+    def test_cerrar_dos_veces_no_paga_doble(self, liga, equipo_real, jornada):
+        from fantasy.jornadas import cerrar_jornada
+        from fantasy.models import Equipo, Notificacion
+        self.preparar(liga, equipo_real, jornada, 1)
+
+        cerrar_jornada(jornada)
+        presupuesto = Equipo.objects.get(nombre='Congelado 0').presupuesto
+        informe = cerrar_jornada(jornada)
+
+        assert informe['monto_total'] == 0
+        assert informe['actualizadas'] == 0
+        assert Equipo.objects.get(nombre='Congelado 0').presupuesto == presupuesto
+        assert Notificacion.objects.filter(categoria='distribucion_dinero').count() == 1
+
+    def test_correccion_paga_solo_diferencia(self, liga, equipo_real, jornada):
+        from fantasy.jornadas import cerrar_jornada
+        from fantasy.models import Equipo
+        self.preparar(liga, equipo_real, jornada, 1)
+        cerrar_jornada(jornada)
+        presupuesto = Equipo.objects.get(nombre='Congelado 0').presupuesto
+
+        Puntuacion.objects.filter(jornada=jornada).update(puntos=3)
+        informe = cerrar_jornada(jornada)
+
+        assert informe['monto_total'] == 5 * 100000
+        assert Equipo.objects.get(nombre='Congelado 0').presupuesto == presupuesto + 5 * 100000
+        alineacion = AlineacionCongelada.objects.get(jornada=jornada)
+        assert alineacion.puntos_obtenidos == 15
+        assert alineacion.dinero_abonado == 15 * 100000
+
+    def test_correccion_a_la_baja_no_descuenta(self, liga, equipo_real, jornada):
+        from fantasy.jornadas import cerrar_jornada
+        from fantasy.models import Equipo, Notificacion
+        self.preparar(liga, equipo_real, jornada, 1)
+        cerrar_jornada(jornada)
+        presupuesto = Equipo.objects.get(nombre='Congelado 0').presupuesto
+
+        Puntuacion.objects.filter(jornada=jornada).update(puntos=1)
+        informe = cerrar_jornada(jornada)
+
+        assert informe['monto_total'] == 0
+        assert informe['equipos_sobrepagados'] == 1
+        assert informe['exceso_no_recuperado'] == 5 * 100000
+        assert Equipo.objects.get(nombre='Congelado 0').presupuesto == presupuesto
+        assert Notificacion.objects.filter(categoria='distribucion_dinero').count() == 1
+        alineacion = AlineacionCongelada.objects.get(jornada=jornada)
+        assert alineacion.puntos_obtenidos == 5
+        assert alineacion.dinero_ganado == 5 * 100000
+        assert alineacion.dinero_abonado == 10 * 100000
+
+        # Si luego vuelven a subir, solo se paga lo que supere lo ya abonado
+        Puntuacion.objects.filter(jornada=jornada).update(puntos=3)
+        informe = cerrar_jornada(jornada)
+        assert informe['monto_total'] == 5 * 100000
+        assert Equipo.objects.get(nombre='Congelado 0').presupuesto == presupuesto + 5 * 100000
+
+    def test_cerrar_consultas_constantes(self, liga, equipo_real):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from fantasy.jornadas import cerrar_jornada
+
+        pocos_jornada = Jornada.objects.create(numero=30)
+        self.preparar(liga, equipo_real, pocos_jornada, 2)
+        with CaptureQueriesContext(connection) as pocos:
+            cerrar_jornada(pocos_jornada)
+
+        muchos_jornada = Jornada.objects.create(numero=31)
+        self.preparar(liga, equipo_real, muchos_jornada, 20, inicio=100)
+        with CaptureQueriesContext(connection) as muchos:
+            informe = cerrar_jornada(muchos_jornada)
+
+        assert informe['equipos_abonados'] == 22
+        assert len(muchos.captured_queries) == len(pocos.captured_queries)
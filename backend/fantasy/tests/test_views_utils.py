@@ -374,4 +374,42 @@ class TestFinalizarSubastasView:
         response = admin_client.post(url)
         
         assert response.status_code == status.HTTP_200_OK
-        assert '1 procesadas' in response.data['message']  # Solo 1 expirado
\ No newline at end of file
+        assert '1 procesadas' in response.data['message']  # Solo 1 expirado
+
+@pytest.mark.django_db
+class TestNotificarUsuarios:
+    """Tests para el reparto de notificaciones en bloque"""
+
+    def test_un_insert_para_todos(self, equipo_real):
+        from django.contrib.auth.models import User
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from fantasy.views.utils_views import notificar_usuarios
+        usuarios = [User.objects.create_user(username=f'pujador{i}', password='x') for i in range(100)]
+
+        with CaptureQueriesContext(connection) as consultas:
+            notificar_usuarios(
+                [(u, {'monto': 1000 * i}) for i, u in enumerate(usuarios)],
+                'jugador_retirado',
+                {'jugador': 'Delantero'}
+            )
+
+        inserts = [q for q in consultas.captured_queries if q['sql'].startswith('INSERT')]
+        assert len(inserts) == 1
+        assert Notificacion.objects.filter(categoria='jugador_retirado').count() == 100
+        ultima = Notificacion.objects.get(destinatario=usuarios[-1])
+        assert ultima.mensaje == 'El jugador Delantero ha sido retirado del mercado. Tu puja de 99000€ ha sido cancelada.'
+
+    def test_despues_del_commit(self, user, user2, django_capture_on_commit_callbacks):
+        from fantasy.views.utils_views import notificar_usuarios
+
+        with django_capture_on_commit_callbacks(execute=False) as callbacks:
+            notificar_usuarios([user, user2.id], 'oferta_rechazada', {'jugador': 'Portero'}, despues_del_commit=True)
+            assert not Notificacion.objects.exists()
+
+        callbacks[0]()
+        assert set(Notificacion.objects.values_list('destinatario', flat=True)) == {user.id, user2.id}
+
+    def test_sin_destinatarios(self):
+        from fantasy.views.utils_views import notificar_usuarios
+        assert notificar_usuarios([], 'oferta_rechazada', {'jugador': 'Portero'}) == []
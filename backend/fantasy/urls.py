@@ -22,6 +22,7 @@ urlpatterns = [
     # ==================== PUNTUACIONES ====================
     path('jugadores/<int:jugador_id>/puntuaciones/', views.puntuaciones_jugador, name='puntuaciones_jugador'),
     path('puntuaciones/actualizar/', views.actualizar_puntuacion_jugador, name='actualizar_puntuacion_jugador'),
+    path('puntuaciones/importar/', views.importar_puntuaciones_view, name='importar_puntuaciones'),
     path('partidos/<int:partido_id>/puntuaciones/', views.puntuaciones_por_partido, name='puntuaciones-partido'),
     
     # ==================== AUTENTICACIÓN ====================
@@ -44,6 +45,7 @@ urlpatterns = [
     path('equipos/<int:equipo_id>/guardar_alineacion/', views.guardar_alineacion, name='guardar_alineacion'),
     path('equipos/<int:equipo_id>/actualizar_estados_banquillo/', views.actualizar_estados_banquillo, name='actualizar_estados_banquillo'),
     path('equipos/<int:equipo_id>/intercambiar_jugadores/', views.intercambiar_jugadores, name='intercambiar_jugadores'),
+    path('equipos/<int:equipo_id>/confirmar_alineacion/', views.confirmar_alineacion, name='confirmar_alineacion'),
     
     # ==================== GESTIÓN DE JUGADORES ====================
     path('equipos/<int:equipo_id>/jugadores/<int:jugador_id>/poner_en_venta/', views.poner_en_venta, name='poner_en_venta'),
@@ -69,6 +71,7 @@ urlpatterns = [
     path('notificaciones/contar-no-leidas/', views.contar_no_leidas, name='contar-no-leidas'),
     path('notificaciones/marcar-todas-leidas/', views.marcar_todas_leidas, name='marcar-todas-leidas'),
     path('notificaciones/<int:notificacion_id>/marcar-leida/', views.marcar_como_leida, name='marcar-notificacion-leida'),
+    path('eventos/', views.stream_eventos, name='stream-eventos'),
     
     # ==================== JORNADAS Y PARTIDOS ====================
     path('jornadas/<int:jornada_id>/equipos-disponibles/', views.equipos_disponibles_jornada, name='equipos_disponibles_jornada'),
@@ -76,6 +79,8 @@ urlpatterns = [
 
     path('alineacion-congelada/<int:equipo_id>/<int:jornada_id>/', views.alineacion_congelada_detalle, name='alineacion_congelada_detalle'),
     path('forzar-congelacion/', views.forzar_congelacion, name='forzar_congelacion'),
+    path('jornadas/<int:jornada_id>/congelar/', views.congelar_alineaciones_jornada, name='congelar_alineaciones_jornada'),
+    path('jornadas/<int:jornada_id>/cerrar/', views.cerrar_jornada_view, name='cerrar_jornada'),
 
     # ==================== ADMINISTRACIÓN ====================
     path('finalizar-subastas/', views.finalizar_subastas, name='finalizar_subastas'),
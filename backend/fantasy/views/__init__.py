@@ -14,6 +14,7 @@ from .notificaciones_views import (
     marcar_todas_leidas,
     marcar_como_leida,
 )
+from .eventos_views import stream_eventos
 
 # Importa las funciones de equipo_views
 from .equipo_views import (
@@ -24,18 +25,21 @@ from .equipo_views import (
     guardar_alineacion,
     mover_a_alineacion,
     plantilla_equipo,
-    actualizar_estados_banquillo
+    actualizar_estados_banquillo,
+    confirmar_alineacion
 )
 
 # Importa funciones de puntuación
 from .puntuacion_views import (
     puntuaciones_jugador, 
     actualizar_puntuacion_jugador, 
+    importar_puntuaciones_view,
     equipos_disponibles_jornada,
     puntuaciones_por_partido,
     alineacion_congelada_detalle,
-    forzar_congelacion
-    
+    forzar_congelacion,
+    congelar_alineaciones_jornada,
+    cerrar_jornada_view
 )
 
 # Importa funciones de ofertas
@@ -76,11 +80,12 @@ __all__ = [
     # Funciones de equipo
     'mi_equipo', 'poner_en_venta', 'quitar_del_mercado', 'mover_a_alineacion',
     'intercambiar_jugadores', 'guardar_alineacion', 'plantilla_equipo','actualizar_estados_banquillo',
+    'confirmar_alineacion',
     
     # Funciones de puntuación
-    'puntuaciones_jugador', 'actualizar_puntuacion_jugador',
+    'puntuaciones_jugador', 'actualizar_puntuacion_jugador', 'importar_puntuaciones_view',
     'equipos_disponibles_jornada','puntuaciones_por_partido', 'alineacion_congelada_detalle',
-    'forzar_congelacion',
+    'forzar_congelacion', 'congelar_alineaciones_jornada', 'cerrar_jornada_view',
     
     # Funciones de ofertas
     'ofertas_recibidas', 'ofertas_realizadas', 'aceptar_oferta',
@@ -91,6 +96,7 @@ __all__ = [
     
     # Notificaciones
     'contar_no_leidas','listar_notificaciones','marcar_todas_leidas','marcar_como_leida',
+    'stream_eventos',
     
     # Utilidades
     'datos_iniciales', 'current_user', 'finalizar_subastas'
@@ -1,7 +1,14 @@
 from rest_framework import viewsets, status
 from rest_framework.response import Response
-from ..models import Liga, Equipo
-from ..serializers import EquipoSerializer
+from ..models import Liga, ClasificacionEquipo
+from ..serializers import ClasificacionEquipoSerializer
+
+def obtener_clasificacion(liga):
+    """Clasificación materializada de la liga en una única lectura indexada"""
+    filas = ClasificacionEquipo.objects.filter(
+        liga=liga
+    ).select_related('equipo', 'equipo__usuario').order_by('posicion')
+    return ClasificacionEquipoSerializer(filas, many=True).data
 
 class ClasificacionViewSet(viewsets.ViewSet):
     def list(self, request):
@@ -21,24 +28,4 @@ class ClasificacionViewSet(viewsets.ViewSet):
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        equipos = Equipo.objects.filter(
-            liga=liga
-        ).select_related('usuario').prefetch_related('jugadores')
-
-        clasificacion = []
-        for equipo in equipos:
-            puntos_totales = sum(j.puntos_totales for j in equipo.jugadores.all())
-            clasificacion.append({
-                'equipo_id': equipo.id,
-                'nombre': equipo.nombre,
-                'usuario': equipo.usuario.username,
-                'puntos_totales': puntos_totales,
-                'presupuesto': equipo.presupuesto
-            })
-
-        clasificacion.sort(key=lambda x: x['puntos_totales'], reverse=True)
-
-        for idx, item in enumerate(clasificacion, 1):
-            item['posicion'] = idx
-
-        return Response(clasificacion)
\ No newline at end of file
+        return Response(obtener_clasificacion(liga))
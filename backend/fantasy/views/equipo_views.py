@@ -2,10 +2,10 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from django.utils import timezone
-from django.db.models import Prefetch
 from django.db import transaction
 from ..models import Equipo, Jugador, Puja
-from ..serializers import EquipoSerializer, JugadorSerializer
+from ..serializers import EquipoSerializer, JugadorSerializer, equipos_con_plantilla
+from .utils_views import notificar_usuarios
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
@@ -13,11 +13,7 @@ def plantilla_equipo(request, equipo_id):
     try:
         print(f"🎯 Cargando plantilla para equipo ID: {equipo_id}")
         
-        equipo = Equipo.objects.select_related(
-            'usuario', 'liga'
-        ).prefetch_related(
-            Prefetch('jugadores', queryset=Jugador.objects.all())
-        ).get(id=equipo_id)
+        equipo = equipos_con_plantilla().get(id=equipo_id)
         
         jugadores = equipo.jugadores.all()
         alineacion = calcular_alineacion_backend(jugadores)
@@ -84,11 +80,57 @@ def calcular_alineacion_backend(jugadores):
         'banquillo': JugadorSerializer(banquillo, many=True).data
     }
 
+FORMACION_TITULAR = {'POR': 1, 'DEF': 2, 'DEL': 2}
+
+def validar_formacion(jugadores):
+    """Devuelve un mensaje de error si los titulares no forman 1 POR, 2 DEF y 2 DEL"""
+    titulares = {}
+    for jugador in jugadores:
+        if not jugador.en_banquillo:
+            titulares[jugador.posicion] = titulares.get(jugador.posicion, 0) + 1
+    
+    if titulares != FORMACION_TITULAR:
+        resumen = ', '.join(f'{cantidad} {posicion}' for posicion, cantidad in sorted(titulares.items())) or 'ninguno'
+        return f'La alineación debe tener 1 POR, 2 DEF y 2 DEL titulares (recibido: {resumen})'
+    return None
+
+def aplicar_estados_banquillo(jugadores, estados):
+    """
+    Aplica en memoria los estados en_banquillo recibidos sobre los jugadores del equipo.
+    Devuelve (jugadores cambiados, ids que no pertenecen al equipo); lanza ValueError
+    si los estados no son una lista de {jugador_id: int, en_banquillo: bool}.
+    """
+    if not isinstance(estados, list):
+        raise ValueError('estados debe ser una lista')
+    for estado in estados:
+        if not isinstance(estado, dict):
+            raise ValueError('Cada estado debe ser un objeto con jugador_id y en_banquillo')
+        jugador_id = estado.get('jugador_id')
+        if not isinstance(jugador_id, int) or isinstance(jugador_id, bool):
+            raise ValueError(f'jugador_id no válido: {jugador_id!r}')
+        if not isinstance(estado.get('en_banquillo'), bool):
+            raise ValueError(f'en_banquillo debe ser true o false (jugador {jugador_id})')
+    
+    por_id = {jugador.id: jugador for jugador in jugadores}
+    cambiados, ajenos = [], []
+    
+    for estado in estados:
+        jugador = por_id.get(estado['jugador_id'])
+        if jugador is None:
+            ajenos.append(estado['jugador_id'])
+            continue
+        en_banquillo = estado['en_banquillo']
+        if jugador.en_banquillo != en_banquillo:
+            jugador.en_banquillo = en_banquillo
+            cambiados.append(jugador)
+    
+    return cambiados, ajenos
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def mi_equipo(request):
     try:
-        equipo = Equipo.objects.get(usuario=request.user)
+        equipo = equipos_con_plantilla().get(usuario=request.user)
         serializer = EquipoSerializer(equipo)
         return Response(serializer.data)
     except Equipo.DoesNotExist:
@@ -142,31 +184,22 @@ def quitar_del_mercado(request, equipo_id, jugador_id):
     
     try:
         with transaction.atomic():
-            pujas_activas = Puja.objects.filter(
+            pujas_activas = list(Puja.objects.filter(
                 jugador=jugador,
                 activa=True
-            ).select_related('equipo')
+            ).values_list('id', 'equipo__usuario_id', 'monto'))
             
-            # Notificar a cada equipo que pujó
-            for puja in pujas_activas:
-                # 🆕 Crear notificación para el equipo pujador
-                crear_notificacion(
-                    usuario=puja.equipo.usuario,
-                    tipo_codigo='jugador_no_adquirido',
-                    titulo='Jugador retirado del mercado',
-                    mensaje=f'El jugador {jugador.nombre} ha sido retirado del mercado. Tu puja ha sido cancelada.',
-                    datos_extra={
-                        'jugador_id': jugador.id,
-                        'jugador_nombre': jugador.nombre,
-                        'monto_puja': puja.monto,
-                        'tipo': 'jugador_retirado'
-                    }
-                )
-                print(f"✅ Notificación enviada a {puja.equipo.nombre}")
-                
-                # Marcar la puja como no activa
-                puja.activa = False
-                puja.save()
+            # Avisar a todos los pujadores con un solo INSERT, tras el commit
+            notificar_usuarios(
+                [(usuario_id, {'monto': monto}) for _, usuario_id, monto in pujas_activas],
+                'jugador_retirado',
+                {'jugador': jugador.nombre},
+                despues_del_commit=True
+            )
+            print(f"✅ {len(pujas_activas)} pujadores notificados")
+            
+            # Cancelar todas las pujas activas con un único UPDATE
+            Puja.objects.filter(id__in=[puja_id for puja_id, _, _ in pujas_activas]).update(activa=False)
             
             # Quitar jugador del mercado
             if hasattr(jugador, 'quitar_del_mercado') and callable(jugador.quitar_del_mercado):
@@ -223,8 +256,8 @@ def intercambiar_jugadores(request, equipo_id):
     jugador_origen.en_banquillo = destino_banquillo
     jugador_destino.en_banquillo = origen_banquillo
     
-    jugador_origen.save()
-    jugador_destino.save()
+    with transaction.atomic():
+        Jugador.objects.bulk_update([jugador_origen, jugador_destino], ['en_banquillo'])
     
     print("✅ Intercambio completado")
     
@@ -246,33 +279,24 @@ def actualizar_estados_banquillo(request, equipo_id):
     estados = request.data.get('estados', [])
     
     print(f"🔄 Actualizando estados de banquillo para equipo {equipo.nombre}")
-    print(f"📊 Estados recibidos: {len(estados)} jugadores")
     
-    cambios_realizados = 0
-    errores = 0
+    jugadores = list(equipo.jugadores.all())
+    try:
+        cambiados, ajenos = aplicar_estados_banquillo(jugadores, estados)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=400)
+    
+    for jugador_id in ajenos:
+        print(f"   ❌ Jugador {jugador_id} no encontrado en el equipo")
     
-    for estado_data in estados:
-        try:
-            jugador_id = estado_data.get('jugador_id')
-            en_banquillo = estado_data.get('en_banquillo')
-            
-            jugador = Jugador.objects.get(id=jugador_id, equipo=equipo)
-            
-            # Solo actualizar si hay cambio
-            if jugador.en_banquillo != en_banquillo:
-                jugador.en_banquillo = en_banquillo
-                jugador.save()
-                cambios_realizados += 1
-                print(f"   ✅ {jugador.nombre}: en_banquillo = {en_banquillo}")
-            else:
-                print(f"   ℹ️ {jugador.nombre}: sin cambios")
-                
-        except Jugador.DoesNotExist:
-            print(f"   ❌ Jugador {jugador_id} no encontrado en el equipo")
-            errores += 1
-        except Exception as e:
-            print(f"   ❌ Error con jugador {jugador_id}: {e}")
-            errores += 1
+    with transaction.atomic():
+        Jugador.objects.bulk_update(cambiados, ['en_banquillo'])
+    
+    for jugador in cambiados:
+        print(f"   ✅ {jugador.nombre}: en_banquillo = {jugador.en_banquillo}")
+    
+    cambios_realizados = len(cambiados)
+    errores = len(ajenos)
     
     return Response({
         'message': f'Estados actualizados: {cambios_realizados} cambios, {errores} errores',
@@ -328,23 +352,61 @@ def guardar_alineacion(request, equipo_id):
         equipo = Equipo.objects.get(id=equipo_id, usuario=request.user)
         jugadores_data = request.data.get('jugadores', [])
         
+        equipo = equipos_con_plantilla().get(id=equipo.id)
+        jugadores = list(equipo.jugadores.all())
+        cambiados, ajenos = aplicar_estados_banquillo(jugadores, jugadores_data)
+        if ajenos:
+            raise Jugador.DoesNotExist
+        
         with transaction.atomic():
-            for jugador_data in jugadores_data:
-                jugador = Jugador.objects.get(
-                    id=jugador_data['jugador_id'], 
-                    equipo=equipo
-                )
-                jugador.en_banquillo = jugador_data['en_banquillo']
-                jugador.save()
-            
-            return Response({
-                'message': 'Alineación guardada correctamente',
-                'equipo': EquipoSerializer(equipo).data
-            })
+            Jugador.objects.bulk_update(cambiados, ['en_banquillo'])
+        
+        # Los jugadores prefetched ya reflejan los cambios
+        return Response({
+            'message': 'Alineación guardada correctamente',
+            'equipo': EquipoSerializer(equipo).data
+        })
             
     except Equipo.DoesNotExist:
         return Response({'error': 'Equipo no encontrado'}, status=404)
     except Jugador.DoesNotExist:
         return Response({'error': 'Jugador no encontrado'}, status=404)
     except Exception as e:
-        return Response({'error': str(e)}, status=400)
\ No newline at end of file
+        return Response({'error': str(e)}, status=400)
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def confirmar_alineacion(request, equipo_id):
+    """Valida y guarda de una vez la alineación completa del equipo"""
+    if not Equipo.objects.filter(id=equipo_id, usuario=request.user).exists():
+        return Response({'error': 'Equipo no encontrado'}, status=404)
+    
+    estados = request.data.get('estados', [])
+    
+    with transaction.atomic():
+        # Se bloquea la plantilla para validar sobre lo que de verdad se va a guardar
+        jugadores = list(Jugador.objects.select_for_update().filter(equipo_id=equipo_id).order_by('id'))
+        
+        try:
+            cambiados, ajenos = aplicar_estados_banquillo(jugadores, estados)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=400)
+        if ajenos:
+            return Response({'error': f'Jugadores que no pertenecen al equipo: {ajenos}'}, status=400)
+        
+        error_formacion = validar_formacion(jugadores)
+        if error_formacion:
+            print(f"❌ {error_formacion}")
+            return Response({'error': error_formacion}, status=400)
+        
+        Jugador.objects.bulk_update(cambiados, ['en_banquillo'])
+    
+    equipo = equipos_con_plantilla().get(id=equipo_id)
+    print(f"✅ Alineación confirmada para {equipo.nombre}: {len(cambiados)} cambios")
+    
+    return Response({
+        'message': 'Alineación guardada correctamente',
+        'cambios_realizados': len(cambiados),
+        'alineacion': calcular_alineacion_backend(equipo.jugadores.all()),
+        'equipo': EquipoSerializer(equipo).data
+    })
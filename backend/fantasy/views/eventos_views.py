@@ -0,0 +1,37 @@
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from ..eventos import flujo_eventos, canal_usuario, CANAL_PUBLICO, CANAL_MERCADO
+
+def usuario_desde_token(request):
+    """Usuario del JWT de la cabecera Authorization o del parámetro ?token= (EventSource no envía cabeceras)"""
+    autenticacion = JWTAuthentication()
+    token = request.GET.get('token')
+    if not token:
+        cabecera = autenticacion.get_header(request)
+        token = cabecera and autenticacion.get_raw_token(cabecera)
+    if not token:
+        return None
+    try:
+        return autenticacion.get_user(autenticacion.get_validated_token(token))
+    except (InvalidToken, TokenError, AuthenticationFailed):
+        return None
+
+async def stream_eventos(request):
+    """Flujo Server-Sent Events con notificaciones públicas, del usuario y del mercado (solo ASGI)"""
+    if not isinstance(request, ASGIRequest):
+        # Con WSGI el flujo infinito bloquearía un worker entero
+        return JsonResponse({'error': 'El flujo de eventos requiere un servidor ASGI'}, status=501)
+    
+    usuario = await sync_to_async(usuario_desde_token)(request)
+    if usuario is None:
+        return JsonResponse({'error': 'No autenticado'}, status=401)
+    
+    canales = [CANAL_PUBLICO, CANAL_MERCADO, canal_usuario(usuario.id)]
+    respuesta = StreamingHttpResponse(flujo_eventos(canales), content_type='text/event-stream')
+    respuesta['Cache-Control'] = 'no-cache'
+    respuesta['X-Accel-Buffering'] = 'no'
+    return respuesta
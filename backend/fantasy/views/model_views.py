@@ -8,7 +8,8 @@ from rest_framework.permissions import IsAuthenticated
 from ..models import Liga, Jugador, Equipo, Jornada, Partido, EquipoReal, Puntuacion
 from ..serializers import (
     LigaSerializer, JugadorSerializer, EquipoSerializer, JornadaSerializer,
-    PartidoSerializer, EquipoRealSerializer, PuntuacionSerializer
+    PartidoSerializer, EquipoRealSerializer, PuntuacionSerializer, jugadores_con_puntuaciones,
+    equipos_con_plantilla
 )
 
 class LigaViewSet(viewsets.ModelViewSet):
@@ -20,7 +21,7 @@ class JugadorViewSet(viewsets.ModelViewSet):
     serializer_class = JugadorSerializer
     
     def get_queryset(self):
-        queryset = Jugador.objects.all()
+        queryset = jugadores_con_puntuaciones()
         posicion = self.request.query_params.get('posicion', None)
         equipo_id = self.request.query_params.get('equipo', None)
         
@@ -38,7 +39,7 @@ class EquipoViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        queryset = Equipo.objects.select_related('usuario', 'liga').prefetch_related('jugadores')
+        queryset = equipos_con_plantilla()
         
         if not self.request.user.is_staff and not self.request.user.is_superuser:
             print(f"🎯 Filtrando equipos para usuario: {self.request.user.username}")
@@ -143,79 +144,75 @@ def plantilla_equipo_real(request, equipo_id):
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=400)
 
+def _estadisticas_como(campo_equipo, campo_favor, campo_contra):
+    """Agrega por equipo los partidos jugados en un papel (local o visitante)"""
+    return Partido.objects.filter(
+        goles_local__isnull=False,
+        goles_visitante__isnull=False
+    ).values(
+        equipo_id=F(campo_equipo)
+    ).annotate(
+        jugados=Count('id'),
+        ganados=Count('id', filter=Q(**{f'{campo_favor}__gt': F(campo_contra)})),
+        empatados=Count('id', filter=Q(goles_local=F('goles_visitante'))),
+        goles_a_favor=Sum(campo_favor),
+        goles_en_contra=Sum(campo_contra)
+    ).order_by()
+
+def calcular_clasificacion_equipos_reales():
+    """
+    Clasificación de los equipos reales con un número constante de consultas:
+    una agregación condicional (local UNION visitante) y la lista de equipos.
+    """
+    estadisticas = _estadisticas_como('equipo_local', 'goles_local', 'goles_visitante').union(
+        _estadisticas_como('equipo_visitante', 'goles_visitante', 'goles_local'),
+        all=True
+    )
+
+    acumulado = {}
+    for fila in estadisticas:
+        totales = acumulado.setdefault(fila['equipo_id'], {
+            'jugados': 0, 'ganados': 0, 'empatados': 0, 'goles_a_favor': 0, 'goles_en_contra': 0
+        })
+        for campo in totales:
+            totales[campo] += fila[campo] or 0
+
+    clasificacion_data = []
+    for equipo in EquipoReal.objects.all():
+        totales = acumulado.get(equipo.id, {})
+        partidos_jugados = totales.get('jugados', 0)
+        partidos_ganados = totales.get('ganados', 0)
+        partidos_empatados = totales.get('empatados', 0)
+        goles_a_favor = totales.get('goles_a_favor', 0)
+        goles_en_contra = totales.get('goles_en_contra', 0)
+
+        clasificacion_data.append({
+            'id': equipo.id,
+            'equipo': {
+                'id': equipo.id,
+                'nombre': equipo.nombre
+            },
+            # Puntos (3 por victoria, 1 por empate)
+            'puntos': (partidos_ganados * 3) + partidos_empatados,
+            'partidos_jugados': partidos_jugados,
+            'partidos_ganados': partidos_ganados,
+            'partidos_empatados': partidos_empatados,
+            'partidos_perdidos': partidos_jugados - partidos_ganados - partidos_empatados,
+            'goles_a_favor': goles_a_favor,
+            'goles_en_contra': goles_en_contra,
+            'diferencia_goles': goles_a_favor - goles_en_contra
+        })
+
+    # Ordenar por puntos (descendente) y luego por diferencia de goles (descendente)
+    return sorted(
+        clasificacion_data,
+        key=lambda x: (x['puntos'], x['diferencia_goles']),
+        reverse=True
+    )
+
 def clasificacion_equipos_reales(request):
     try:
-        # Obtener todos los equipos reales
-        equipos = EquipoReal.objects.all()
-        clasificacion_data = []
-        
-        for equipo in equipos:
-            # Partidos como local
-            partidos_local = Partido.objects.filter(
-                equipo_local=equipo,
-                goles_local__isnull=False,
-                goles_visitante__isnull=False
-            )
-            
-            # Partidos como visitante
-            partidos_visitante = Partido.objects.filter(
-                equipo_visitante=equipo,
-                goles_local__isnull=False,
-                goles_visitante__isnull=False
-            )
-            
-            # Calcular estadísticas
-            partidos_jugados = partidos_local.count() + partidos_visitante.count()
-            
-            # Victorias como local
-            victorias_local = partidos_local.filter(goles_local__gt=F('goles_visitante')).count()
-            # Victorias como visitante
-            victorias_visitante = partidos_visitante.filter(goles_visitante__gt=F('goles_local')).count()
-            partidos_ganados = victorias_local + victorias_visitante
-            
-            # Empates como local
-            empates_local = partidos_local.filter(goles_local=F('goles_visitante')).count()
-            # Empates como visitante
-            empates_visitante = partidos_visitante.filter(goles_visitante=F('goles_local')).count()
-            partidos_empatados = empates_local + empates_visitante
-            
-            partidos_perdidos = partidos_jugados - partidos_ganados - partidos_empatados
-            
-            # Goles a favor
-            goles_a_favor = sum([p.goles_local for p in partidos_local]) + sum([p.goles_visitante for p in partidos_visitante])
-            
-            # Goles en contra
-            goles_en_contra = sum([p.goles_visitante for p in partidos_local]) + sum([p.goles_local for p in partidos_visitante])
-            
-            diferencia_goles = goles_a_favor - goles_en_contra
-            
-            # Puntos (3 por victoria, 1 por empate)
-            puntos = (partidos_ganados * 3) + partidos_empatados
-            
-            clasificacion_data.append({
-                'id': equipo.id,
-                'equipo': {
-                    'id': equipo.id,
-                    'nombre': equipo.nombre
-                },
-                'puntos': puntos,
-                'partidos_jugados': partidos_jugados,
-                'partidos_ganados': partidos_ganados,
-                'partidos_empatados': partidos_empatados,
-                'partidos_perdidos': partidos_perdidos,
-                'goles_a_favor': goles_a_favor,
-                'goles_en_contra': goles_en_contra,
-                'diferencia_goles': diferencia_goles
-            })
-        
-        # Ordenar por puntos (descendente) y luego por diferencia de goles (descendente)
-        clasificacion_ordenada = sorted(
-            clasificacion_data, 
-            key=lambda x: (x['puntos'], x['diferencia_goles']), 
-            reverse=True
-        )
-        
-        return JsonResponse(clasificacion_ordenada, safe=False)
+        return JsonResponse(calcular_clasificacion_equipos_reales(), safe=False)
         
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=400)
@@ -223,7 +220,7 @@ def clasificacion_equipos_reales(request):
 def goleadores(request):
     try:
         # Obtener todos los jugadores con sus goles, ordenados por goles (descendente)
-        jugadores = Jugador.objects.all().order_by('-goles')
+        jugadores = Jugador.objects.select_related('equipo_real', 'equipo').order_by('-goles')
         
         jugadores_data = []
         for jugador in jugadores:
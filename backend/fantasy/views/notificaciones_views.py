@@ -5,6 +5,10 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from ..models import Notificacion
 from ..serializers import NotificacionSerializer
+from ..notificaciones import (
+    feed_usuario, LIMITE_POR_DEFECTO, contar_no_leidas as contar_no_leidas_usuario,
+    marcar_todas_leidas as marcar_todas_leidas_usuario, marcar_leida
+)
 
 class NotificacionViewSet(viewsets.ModelViewSet):
     queryset = Notificacion.objects.all()
@@ -20,13 +24,18 @@ def listar_notificaciones(request):
     if not request.user.is_authenticated:
         return JsonResponse({'error': 'No autenticado'}, status=401)
     
-    # Notificaciones públicas + privadas del usuario
-    notificaciones = Notificacion.objects.filter(
-        Q(tipo='publica') | Q(destinatario=request.user)
-    ).order_by('-fecha_creacion')
+    # Notificaciones públicas + privadas del usuario, paginadas por cursor
+    try:
+        pagina = feed_usuario(
+            request.user,
+            limite=request.query_params.get('limite', LIMITE_POR_DEFECTO),
+            before=request.query_params.get('before'),
+            since=request.query_params.get('since')
+        )
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
     
-    serializer = NotificacionSerializer(notificaciones, many=True)
-    return JsonResponse({'notificaciones': serializer.data})
+    return JsonResponse(pagina)
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
@@ -34,10 +43,8 @@ def contar_no_leidas(request):
     if not request.user.is_authenticated:
         return JsonResponse({'error': 'No autenticado'}, status=401)
     
-    count = Notificacion.objects.filter(
-        Q(tipo='publica') | Q(destinatario=request.user),
-        leida=False
-    ).count()
+    # Contadores en caché: solo se consulta la tabla si han caducado
+    count = contar_no_leidas_usuario(request.user.id)
     
     return JsonResponse({'cantidad_no_leidas': count})
 
@@ -47,10 +54,8 @@ def marcar_todas_leidas(request):
     if not request.user.is_authenticated:
         return JsonResponse({'error': 'No autenticado'}, status=401)
     
-    actualizadas = Notificacion.objects.filter(
-        Q(tipo='publica') | Q(destinatario=request.user),
-        leida=False
-    ).update(leida=True)
+    # Privadas con un UPDATE; las públicas solo mueven el cursor de lectura del usuario
+    actualizadas = marcar_todas_leidas_usuario(request.user)
     
     return JsonResponse({
         'mensaje': f'{actualizadas} notificaciones marcadas como leídas',
@@ -67,8 +72,7 @@ def marcar_como_leida(request, notificacion_id):
         notificacion = Notificacion.objects.get(
             Q(id=notificacion_id) & (Q(tipo='publica') | Q(destinatario=request.user))
         )
-        notificacion.leida = True
-        notificacion.save()
+        marcar_leida(request.user, notificacion)
         
         return JsonResponse({
             'mensaje': 'Notificación marcada como leída',
@@ -3,15 +3,56 @@ from rest_framework.permissions import IsAuthenticated
 from django.utils import timezone
 from rest_framework.response import Response
 from django.db import transaction
+from django.db.models import F, OuterRef, Q, Subquery, Sum
 from ..models import Oferta, Equipo, Jugador, Puja
 from ..serializers import OfertaSerializer
+from ..eventos import publicar_evento, CANAL_MERCADO
+from ..subastas import cobrar, mover_presupuesto
 from .utils_views import (
     crear_notificacion_oferta_rechazada,
+    notificar_usuarios,
     crear_notificacion_oferta_editada,    
     crear_notificacion_oferta_retirada,
     crear_notificacion_traspaso   
 )
 
+def rechazar_ofertas_competidoras(jugador, excluir_id, cambios=None):
+    """
+    Rechaza en bloque las ofertas pendientes por un jugador y devuelve el dinero a sus ofertantes.
+    `cambios` ({equipo_id: diferencia}) se aplica en la misma operación: todos los equipos
+    implicados se bloquean antes con una sola consulta ordenada por id, como en mover_presupuesto.
+    Devuelve (rechazadas, presupuestos de los equipos de `cambios`).
+    """
+    cambios = cambios or {}
+    pendientes = Oferta.objects.filter(jugador=jugador, estado='pendiente').exclude(id=excluir_id)
+    # Bloqueo por orden de id antes de escribir: un UPDATE ... IN (...) los bloquearía en
+    # cualquier orden y podría interbloquearse con mover_presupuesto o registrar_puja
+    list(Equipo.objects.select_for_update().filter(
+        Q(id__in=[equipo_id for equipo_id in cambios if equipo_id is not None])
+        | Q(id__in=pendientes.values('equipo_ofertante'))
+    ).order_by('id').values_list('id', flat=True))
+    presupuestos = mover_presupuesto(cambios)
+    
+    destinatarios = list(pendientes.filter(
+        equipo_ofertante__isnull=False
+    ).values_list('equipo_ofertante__usuario_id', flat=True))
+    if not destinatarios:
+        return 0, presupuestos
+    
+    # Un único UPDATE: cada equipo recupera la suma de sus ofertas pendientes
+    total_por_equipo = pendientes.filter(
+        equipo_ofertante=OuterRef('pk')
+    ).values('equipo_ofertante').annotate(total=Sum('monto')).values('total')
+    Equipo.objects.filter(
+        id__in=pendientes.values('equipo_ofertante')
+    ).update(presupuesto=F('presupuesto') + Subquery(total_por_equipo))
+    
+    rechazadas = pendientes.update(estado='rechazada', fecha_respuesta=timezone.now())
+    
+    # Un solo INSERT para todos los avisos, fuera de la transacción del traspaso
+    notificar_usuarios(destinatarios, 'oferta_rechazada', {'jugador': jugador.nombre}, despues_del_commit=True)
+    return rechazadas, presupuestos
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def ofertas_recibidas(request, equipo_id):
@@ -119,10 +160,15 @@ def aceptar_oferta(request, oferta_id):
             )
         
         with transaction.atomic():
-            jugador = oferta.jugador
+            # Orden de bloqueo: jugador, oferta y equipos (por id), igual que en las pujas
+            jugador = Jugador.objects.select_for_update().get(id=oferta.jugador_id)
+            if not Oferta.objects.select_for_update().filter(id=oferta.id, estado='pendiente').exists():
+                raise ValueError('La oferta ya no está pendiente')
+            if jugador.equipo_id != oferta.equipo_receptor_id:
+                raise ValueError('El jugador ya no pertenece a tu equipo')
             
             # Transferir el jugador al equipo ofertante
-            equipo_anterior = jugador.equipo
+            equipo_anterior = oferta.equipo_receptor
             jugador.equipo = oferta.equipo_ofertante
             jugador.en_venta = False
             jugador.fecha_mercado = None
@@ -133,12 +179,14 @@ def aceptar_oferta(request, oferta_id):
             
             print(f"✅ Jugador transferido: {jugador.nombre} -> {oferta.equipo_ofertante.nombre}")
             
-            # Transferir dinero
-            oferta.equipo_ofertante.presupuesto -= oferta.monto
-            oferta.equipo_ofertante.save()
-            
-            oferta.equipo_receptor.presupuesto += oferta.monto
-            oferta.equipo_receptor.save()
+            # Transferir dinero con UPDATE F() y rechazar a la vez las demás ofertas por el
+            # jugador: todos los equipos se bloquean de una vez y por orden de id
+            rechazadas, presupuestos = rechazar_ofertas_competidoras(jugador, excluir_id=oferta.id, cambios={
+                oferta.equipo_ofertante_id: -oferta.monto,
+                oferta.equipo_receptor_id: oferta.monto,
+            })
+            oferta.equipo_receptor.presupuesto = presupuestos[oferta.equipo_receptor_id]
+            print(f"✅ {rechazadas} ofertas rechazadas automáticamente y notificadas")
             
             oferta.estado = 'aceptada'
             oferta.fecha_respuesta = timezone.now()
@@ -151,29 +199,12 @@ def aceptar_oferta(request, oferta_id):
                 equipo_destino=oferta.equipo_ofertante
             )
             print(f"✅ Notificación pública creada para traspaso")
-            
-            # Rechazar automáticamente otras ofertas pendientes para el mismo jugador
-            ofertas_pendientes = Oferta.objects.filter(
-                jugador=jugador,
-                estado='pendiente'
-            ).exclude(id=oferta_id)
-            
-            for oferta_pendiente in ofertas_pendientes:
-                # Devolver dinero de las ofertas rechazadas
-                equipo_rechazado = oferta_pendiente.equipo_ofertante
-                equipo_rechazado.presupuesto += oferta_pendiente.monto
-                equipo_rechazado.save()
-                
-                oferta_pendiente.estado = 'rechazada'
-                oferta_pendiente.fecha_respuesta = timezone.now()
-                oferta_pendiente.save()
-                
-                # CREAR NOTIFICACIÓN DE OFERTA RECHAZADA PARA CADA OFERTANTE
-                crear_notificacion_oferta_rechazada(
-                    jugador=jugador,
-                    ofertante=oferta_pendiente.equipo_ofertante
-                )
-                print(f"✅ Oferta {oferta_pendiente.id} rechazada automáticamente y notificación creada")
+            publicar_evento(CANAL_MERCADO, 'traspaso', {
+                'jugador_id': jugador.id,
+                'equipo_origen_id': equipo_anterior.id if equipo_anterior else None,
+                'equipo_destino_id': oferta.equipo_ofertante.id,
+                'monto': oferta.monto
+            })
         
         return Response({
             'success': True,
@@ -192,6 +223,9 @@ def aceptar_oferta(request, oferta_id):
             {'error': 'Oferta no encontrada'}, 
             status=404
         )
+    except ValueError as e:
+        print(f"❌ {e}")
+        return Response({'error': str(e)}, status=400)
     except Exception as e:
         print(f"❌ Error inesperado en aceptar_oferta: {str(e)}")
         import traceback
@@ -221,17 +255,17 @@ def rechazar_oferta(request, oferta_id):
             )
         
         with transaction.atomic():
+            # Solo una respuesta por oferta: se marca rechazada si sigue pendiente
+            if not Oferta.objects.filter(id=oferta.id, estado='pendiente').update(
+                estado='rechazada', fecha_respuesta=timezone.now()
+            ):
+                raise ValueError('La oferta ya no está pendiente')
+            print(f"✅ Oferta rechazada")
+            
             # Devolver el dinero al equipo ofertante
             equipo_ofertante = oferta.equipo_ofertante
-            equipo_ofertante.presupuesto += oferta.monto
-            equipo_ofertante.save()
+            mover_presupuesto({equipo_ofertante.id: oferta.monto})
             print(f"✅ Dinero devuelto a {equipo_ofertante.nombre}: €{oferta.monto}")
-            
-            # Actualizar estado de la oferta
-            oferta.estado = 'rechazada'
-            oferta.fecha_respuesta = timezone.now()
-            oferta.save()
-            print(f"✅ Oferta rechazada")
 
             # CREAR NOTIFICACIÓN DE OFERTA RECHAZADA
             crear_notificacion_oferta_rechazada(
@@ -252,6 +286,9 @@ def rechazar_oferta(request, oferta_id):
             {'error': 'Oferta no encontrada'}, 
             status=404
         )
+    except ValueError as e:
+        print(f"❌ {e}")
+        return Response({'error': str(e)}, status=400)
     except Exception as e:
         print(f"❌ Error inesperado en rechazar_oferta: {str(e)}")
         import traceback
@@ -294,18 +331,18 @@ def crear_oferta_directa(request):
             return Response({'error': 'Presupuesto insuficiente'}, status=400)
         
 
-        # Crear oferta
-        oferta = Oferta.objects.create(
-            jugador=jugador,
-            equipo_ofertante=equipo_ofertante,
-            equipo_receptor=jugador.equipo,
-            monto=monto,
-            estado='pendiente'
-        )
-        
-        # Bloquear presupuesto
-        equipo_ofertante.presupuesto -= monto
-        equipo_ofertante.save()
+        with transaction.atomic():
+            # Bloquear presupuesto: UPDATE condicional, nunca queda en negativo
+            cobrar(equipo_ofertante.id, monto)
+            
+            # Crear oferta
+            oferta = Oferta.objects.create(
+                jugador=jugador,
+                equipo_ofertante=equipo_ofertante,
+                equipo_receptor=jugador.equipo,
+                monto=monto,
+                estado='pendiente'
+            )
         
         print(f"✅ Oferta creada: €{monto} por {jugador.nombre}")
         
@@ -319,6 +356,8 @@ def crear_oferta_directa(request):
         return Response({'error': 'Jugador no encontrado'}, status=404)
     except Equipo.DoesNotExist:
         return Response({'error': 'Equipo no encontrado'}, status=404)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=400)
     except Exception as e:
         print(f"❌ Error: {str(e)}")
         return Response({'error': str(e)}, status=500)
@@ -366,17 +405,22 @@ def editar_oferta(request, oferta_id):
 
     try:
         with transaction.atomic():
-            # Guardar monto anterior para la notificación
-            monto_anterior = oferta.monto
+            # Releer la oferta bloqueada: la diferencia se calcula sobre el monto vigente
+            oferta_bloqueada = Oferta.objects.select_for_update().filter(id=oferta.id, estado='pendiente').first()
+            if oferta_bloqueada is None:
+                return Response({'error': 'Solo puedes editar ofertas pendientes'}, status=400)
+            monto_anterior = oferta_bloqueada.monto
+            if nuevo_monto <= monto_anterior:
+                return Response({'error': 'El nuevo monto debe ser mayor al monto actual'}, status=400)
+            diferencia = nuevo_monto - monto_anterior
+            
+            # Restar diferencia del presupuesto (UPDATE condicional)
+            equipo.presupuesto = cobrar(equipo.id, diferencia, 'Presupuesto insuficiente para aumentar la oferta')
             
             # Actualizar la oferta
             oferta.monto = nuevo_monto
             oferta.fecha_oferta = timezone.now()
-            oferta.save()
-
-            # Restar diferencia del presupuesto
-            equipo.presupuesto -= diferencia
-            equipo.save()
+            oferta.save(update_fields=['monto', 'fecha_oferta'])
 
             # CREAR NOTIFICACIÓN DE OFERTA EDITADA
             crear_notificacion_oferta_editada(
@@ -396,6 +440,8 @@ def editar_oferta(request, oferta_id):
             'nuevo_presupuesto': equipo.presupuesto
         })
 
+    except ValueError as e:
+        return Response({'error': str(e)}, status=400)
     except Exception as e:
         print(f"❌ Error editando oferta: {str(e)}")
         import traceback
@@ -419,15 +465,15 @@ def retirar_oferta(request, oferta_id):
     
     try:
         with transaction.atomic():
+            # Marcar la oferta como retirada solo si sigue pendiente (una única devolución)
+            if not Oferta.objects.filter(id=oferta.id, estado='pendiente').update(
+                estado='retirada', fecha_respuesta=timezone.now()
+            ):
+                return Response({'error': 'Oferta no encontrada o no se puede retirar'}, status=404)
+            
             # Devolver el dinero al equipo ofertante
             equipo = oferta.equipo_ofertante
-            equipo.presupuesto += oferta.monto
-            equipo.save()
-            
-            # Marcar la oferta como retirada
-            oferta.estado = 'retirada'
-            oferta.fecha_respuesta = timezone.now()
-            oferta.save()
+            equipo.presupuesto = mover_presupuesto({equipo.id: oferta.monto})[equipo.id]
             
             # CREAR NOTIFICACIÓN DE OFERTA RETIRADA
             crear_notificacion_oferta_retirada(
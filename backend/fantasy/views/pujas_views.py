@@ -5,6 +5,8 @@ from django.db import transaction
 from django.utils import timezone
 from ..models import Puja, Equipo, Jugador, Oferta
 from ..serializers import PujaSerializer
+from ..subastas import registrar_puja, cobrar, mover_presupuesto
+from ..eventos import publicar_evento, CANAL_MERCADO
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
@@ -112,6 +114,13 @@ def crear_oferta_usuario(request, equipo, jugador, monto_puja):
             )
         
         with transaction.atomic():
+            # Orden de bloqueo: jugador y después equipo
+            jugador = Jugador.objects.select_for_update().get(id=jugador.id)
+            
+            # Restar presupuesto al ofertante (UPDATE condicional, nunca en negativo)
+            equipo.presupuesto = cobrar(equipo.id, monto_puja)
+            print(f"✅ Presupuesto actualizado: {equipo.presupuesto}")
+            
             # Crear la oferta
             oferta = Oferta.objects.create(
                 jugador=jugador,
@@ -122,11 +131,6 @@ def crear_oferta_usuario(request, equipo, jugador, monto_puja):
             )
             print(f"✅ Oferta creada: ID {oferta.id}")
             
-            # Restar presupuesto al ofertante
-            equipo.presupuesto -= monto_puja
-            equipo.save()
-            print(f"✅ Presupuesto actualizado: {equipo.presupuesto}")
-            
             # Actualizar mejor oferta del jugador
             mejor_oferta_actual = Oferta.objects.filter(
                 jugador=jugador, 
@@ -148,6 +152,9 @@ def crear_oferta_usuario(request, equipo, jugador, monto_puja):
             'oferta_id': oferta.id
         })
         
+    except ValueError as e:
+        print(f"❌ {e}")
+        return Response({'error': str(e)}, status=400)
     except Exception as e:
         print(f"❌ ERROR creando oferta: {str(e)}")
         import traceback
@@ -160,32 +167,17 @@ def crear_oferta_usuario(request, equipo, jugador, monto_puja):
 def crear_puja_mercado(request, equipo, jugador, monto_puja):
     """Crear una puja por jugador del mercado"""
     try:
-        puja_minima = (jugador.puja_actual or jugador.valor) + 100000
-        if monto_puja <= puja_minima:
-            print(f"❌ Puja demasiado baja: {monto_puja} <= {puja_minima}")
-            return Response(
-                {'error': f'La puja debe ser mayor a €{puja_minima:,}'}, 
-                status=400
-            )
-        
-        with transaction.atomic():
-            # Crear puja con campo activa=True
-            puja = Puja.objects.create(
-                jugador=jugador,
-                equipo=equipo,
-                monto=monto_puja,
-                activa=True  # Asegurar que se crea como activa
-            )
-            print(f"✅ Puja creada: ID {puja.id}")
-            
-            jugador.puja_actual = monto_puja
-            jugador.equipo_pujador = equipo
-            jugador.save()
-            print(f"✅ Jugador actualizado: puja_actual = {monto_puja}")
-            
-            equipo.presupuesto -= monto_puja
-            equipo.save()
-            print(f"✅ Presupuesto actualizado: {equipo.presupuesto}")
+        # Validación y escritura con jugador y equipo bloqueados
+        puja, jugador, equipo = registrar_puja(equipo.id, jugador.id, monto_puja)
+        print(f"✅ Puja creada: ID {puja.id}")
+        publicar_evento(CANAL_MERCADO, 'puja', {
+            'jugador_id': jugador.id,
+            'puja_id': puja.id,
+            'monto': puja.monto,
+            'equipo_pujador_id': equipo.id,
+            'equipo_pujador': equipo.nombre
+        })
+        print(f"✅ Presupuesto actualizado: {equipo.presupuesto}")
         
         print("🎉 Puja al mercado realizada exitosamente")
         return Response({
@@ -196,6 +188,10 @@ def crear_puja_mercado(request, equipo, jugador, monto_puja):
             'pujador_actual': equipo.nombre,
             'nuevo_presupuesto': equipo.presupuesto
         })
+    
+    except ValueError as e:
+        print(f"❌ Puja rechazada: {e}")
+        return Response({'error': str(e)}, status=400)
         
     except Exception as e:
         print(f"❌ ERROR en puja: {str(e)}")
@@ -275,6 +271,15 @@ def retirar_puja(request, puja_id):
         with transaction.atomic():
             equipo = puja.equipo
             
+            # Bloquear jugador y releer la puja: solo se devuelve el dinero una vez
+            jugador = Jugador.objects.select_for_update().get(id=jugador.id)
+            if not Puja.objects.select_for_update().filter(id=puja.id, activa=True).exists():
+                return Response({
+                    'success': True,
+                    'message': 'Puja ya fue retirada anteriormente',
+                    'nuevo_presupuesto': Equipo.objects.values_list('presupuesto', flat=True).get(id=equipo.id)
+                })
+            
             # Solo actualizar el estado del jugador si todavía está en venta y no expirado
             if jugador.en_venta and not jugador.expirado:
                 if jugador.puja_actual == puja.monto and jugador.equipo_pujador == equipo:
@@ -305,8 +310,7 @@ def retirar_puja(request, puja_id):
                     jugador.save()
             
             # Devolver el dinero siempre
-            equipo.presupuesto += puja.monto
-            equipo.save()
+            equipo.presupuesto = mover_presupuesto({equipo.id: puja.monto})[equipo.id]
             print(f"✅ Dinero devuelto: €{puja.monto}. Nuevo presupuesto: €{equipo.presupuesto}")
 
             # Marcar puja como inactiva si existe el campo, sino eliminarla
@@ -382,20 +386,30 @@ def editar_puja(request, puja_id):
 
     try:
         with transaction.atomic():
+            # Revalidar con jugador y puja bloqueados (mismo orden que registrar_puja)
+            jugador = Jugador.objects.select_for_update().get(id=jugador.id)
+            puja_bloqueada = Puja.objects.select_for_update().filter(id=puja.id, activa=True).first()
+            if puja_bloqueada is None:
+                return Response({'error': 'No puedes editar una puja retirada'}, status=400)
+            if not jugador.en_venta or jugador.expirado:
+                return Response({'error': 'El jugador ya no está en venta'}, status=400)
+            if jugador.puja_actual is not None and nuevo_monto <= jugador.puja_actual:
+                return Response({'error': 'El nuevo monto debe ser mayor a la puja actual'}, status=400)
+            puja_anterior = puja_bloqueada.monto
+            diferencia = nuevo_monto - puja_anterior
+
+            # Restar diferencia del presupuesto (UPDATE condicional)
+            equipo.presupuesto = cobrar(equipo.id, diferencia, 'Presupuesto insuficiente para aumentar la puja')
+
             # Actualizar la puja
-            puja_anterior = puja.monto
             puja.monto = nuevo_monto
             puja.fecha_puja = timezone.now()
-            puja.save()
+            puja.save(update_fields=['monto', 'fecha_puja'])
 
             # Actualizar puja actual del jugador
             jugador.puja_actual = nuevo_monto
             jugador.equipo_pujador = equipo
-            jugador.save()
-
-            # Restar diferencia del presupuesto
-            equipo.presupuesto -= diferencia
-            equipo.save()
+            jugador.save(update_fields=['puja_actual', 'equipo_pujador'])
 
             print(f"✅ Puja actualizada: €{puja_anterior} -> €{nuevo_monto}. Diferencia: €{diferencia}")
 
@@ -406,6 +420,8 @@ def editar_puja(request, puja_id):
             'nuevo_presupuesto': equipo.presupuesto
         })
 
+    except ValueError as e:
+        return Response({'error': str(e)}, status=400)
     except Exception as e:
         print(f"❌ Error editando puja: {str(e)}")
         import traceback
@@ -1,9 +1,16 @@
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from django.db import transaction
 from django.db.models import Sum
-from ..models import Jugador, Jornada, Puntuacion, EquipoReal, Partido
-from ..serializers import PuntuacionJornadaSerializer, EquipoRealSerializer
+from ..models import Jugador, Jornada, Puntuacion, EquipoReal, Partido, Equipo, AlineacionCongelada
+from ..serializers import PuntuacionJornadaSerializer, EquipoRealSerializer, AlineacionCongeladaSerializer
+from ..jornadas import (
+    congelar_jornada, cerrar_jornada, DINERO_POR_PUNTO,
+    posiciones_faltantes as calcular_posiciones_faltantes
+)
+from ..puntuaciones import importar_puntuaciones
+from ..precios import calcular_valor
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
@@ -107,25 +114,28 @@ def actualizar_puntuacion_jugador(request):
     goles = request.data.get('goles', 0)
     
     try:
-        jugador = Jugador.objects.get(id=jugador_id)
         jornada = Jornada.objects.get(id=jornada_id)
         
-        puntuacion, created = Puntuacion.objects.update_or_create(
-            jugador=jugador,
-            jornada=jornada,
-            defaults={
-                'puntos': puntos,
-                'goles': goles
-            }
+        with transaction.atomic():
+            # Bloquear al jugador serializa las ediciones concurrentes de sus totales
+            jugador = Jugador.objects.select_for_update().get(id=jugador_id)
+            anterior = Puntuacion.objects.filter(jugador=jugador, jornada=jornada).values('puntos', 'goles').first()
+            anterior = anterior or {'puntos': 0, 'goles': 0}
             
-        )
-        
-        jugador.puntos_totales = Puntuacion.objects.filter(jugador=jugador).aggregate(
-            total=Sum('puntos')
-        )['total'] or 0
-        
-        jugador.valor = 5000000 + (jugador.puntos_totales * 100000)
-        jugador.save()
+            puntuacion, created = Puntuacion.objects.update_or_create(
+                jugador=jugador,
+                jornada=jornada,
+                defaults={
+                    'puntos': puntos,
+                    'goles': goles
+                }
+            )
+            
+            # Totales por diferencia: no se recorre el historial del jugador
+            jugador.puntos_totales += int(puntuacion.puntos) - anterior['puntos']
+            jugador.goles += int(puntuacion.goles) - anterior['goles']
+            jugador.valor = calcular_valor(jugador.puntos_totales)
+            jugador.save(update_fields=['puntos_totales', 'goles', 'valor'])
         
         return Response({
             'message': 'Puntuación actualizada correctamente',
@@ -142,6 +152,41 @@ def actualizar_puntuacion_jugador(request):
             status=404
         )
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def importar_puntuaciones_view(request):
+    """
+    Guarda de una vez las puntuaciones de un partido o de una jornada.
+    Body: {'partido_id' o 'jornada_id', 'puntuaciones': [{'jugador_id', 'puntos', 'goles'}, ...]}
+    Solo admin: cambia valores de jugadores y la clasificación de todas las ligas.
+    """
+    if not request.user.is_superuser:
+        return Response({'error': 'Solo administradores pueden ejecutar esta acción'}, status=403)
+    
+    partido_id = request.data.get('partido_id')
+    jornada_id = request.data.get('jornada_id')
+    equipos_reales = None
+    
+    try:
+        if partido_id:
+            partido = Partido.objects.select_related('jornada').get(id=partido_id)
+            jornada = partido.jornada
+            equipos_reales = [partido.equipo_local_id, partido.equipo_visitante_id]
+        else:
+            jornada = Jornada.objects.get(id=jornada_id)
+    except (Partido.DoesNotExist, Jornada.DoesNotExist) as e:
+        return Response({"error": str(e)}, status=404)
+    
+    try:
+        informe = importar_puntuaciones(jornada, request.data.get('puntuaciones'), equipos_reales)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=400)
+    
+    return Response({
+        'message': f"{informe['puntuaciones']} puntuaciones guardadas en la jornada {jornada.numero}",
+        'informe': informe
+    })
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def equipos_disponibles_jornada(request, jornada_id):
@@ -187,7 +232,6 @@ def alineacion_congelada_detalle(request, equipo_id, jornada_id):
         )
         
         # Serializer para AlineacionCongelada
-        from .serializers import AlineacionCongeladaSerializer
         serializer = AlineacionCongeladaSerializer(alineacion)
         return Response(serializer.data)
         
@@ -213,23 +257,10 @@ def forzar_congelacion(request):
         equipo = Equipo.objects.get(id=equipo_id, usuario=request.user)
         jornada = Jornada.objects.get(id=jornada_id)
         
-        # Obtener jugadores titulares actuales
-        jugadores_titulares = equipo.jugadores.filter(en_banquillo=False)
-        
-        # Verificar formación mínima
-        por_count = jugadores_titulares.filter(posicion='POR').count()
-        def_count = jugadores_titulares.filter(posicion='DEF').count()
-        del_count = jugadores_titulares.filter(posicion='DEL').count()
-        
-        tiene_posiciones_completas = (por_count >= 1 and def_count >= 2 and del_count >= 2)
-        posiciones_faltantes = []
-        
-        if por_count < 1:
-            posiciones_faltantes.append('POR')
-        if def_count < 2:
-            posiciones_faltantes.append('DEF')
-        if del_count < 2:
-            posiciones_faltantes.append('DEL')
+        # Obtener jugadores titulares actuales (la formación se comprueba en memoria)
+        jugadores_titulares = list(equipo.jugadores.filter(en_banquillo=False))
+        posiciones_faltantes = calcular_posiciones_faltantes(j.posicion for j in jugadores_titulares)
+        tiene_posiciones_completas = not posiciones_faltantes
         
         # Crear o actualizar alineación congelada
         alineacion, created = AlineacionCongelada.objects.get_or_create(
@@ -245,19 +276,17 @@ def forzar_congelacion(request):
         alineacion.jugadores_titulares.set(jugadores_titulares)
         
         # Calcular puntos si ya hay puntuaciones
-        puntos_totales = 0
-        for jugador in jugadores_titulares:
-            try:
-                puntuacion = Puntuacion.objects.get(jugador=jugador, jornada=jornada)
-                puntos_totales += puntuacion.puntos
-            except Puntuacion.DoesNotExist:
-                pass
+        puntos_totales = Puntuacion.objects.filter(
+            jugador__in=jugadores_titulares,
+            jornada=jornada
+        ).aggregate(total=Sum('puntos'))['total'] or 0
         
+        alineacion.tiene_posiciones_completas = tiene_posiciones_completas
+        alineacion.posiciones_faltantes = posiciones_faltantes
         alineacion.puntos_obtenidos = puntos_totales
-        alineacion.dinero_ganado = puntos_totales * 100000
+        alineacion.dinero_ganado = puntos_totales * DINERO_POR_PUNTO
         alineacion.save()
         
-        from .serializers import AlineacionCongeladaSerializer
         serializer = AlineacionCongeladaSerializer(alineacion)
         
         return Response({
@@ -275,4 +304,40 @@ def forzar_congelacion(request):
         return Response(
             {"error": "Jornada no encontrada"},
             status=404
-        )
\ No newline at end of file
+        )
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def congelar_alineaciones_jornada(request, jornada_id):
+    """Congela de una vez las alineaciones de todos los equipos en una jornada (solo admin)"""
+    if not request.user.is_superuser:
+        return Response({'error': 'Solo administradores pueden ejecutar esta acción'}, status=403)
+    
+    try:
+        jornada = Jornada.objects.get(id=jornada_id)
+    except Jornada.DoesNotExist:
+        return Response({"error": "Jornada no encontrada"}, status=404)
+    
+    informe = congelar_jornada(jornada)
+    return Response({
+        'message': f"Jornada {jornada.numero}: {informe['equipos_congelados']} alineaciones congeladas",
+        'informe': informe
+    })
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def cerrar_jornada_view(request, jornada_id):
+    """Calcula los puntos de la jornada y reparte el dinero a los equipos (solo admin)"""
+    if not request.user.is_superuser:
+        return Response({'error': 'Solo administradores pueden ejecutar esta acción'}, status=403)
+    
+    try:
+        jornada = Jornada.objects.get(id=jornada_id)
+    except Jornada.DoesNotExist:
+        return Response({"error": "Jornada no encontrada"}, status=404)
+    
+    informe = cerrar_jornada(jornada)
+    return Response({
+        'message': f"Jornada {jornada.numero} cerrada: {informe['monto_total']}€ repartidos",
+        'informe': informe
+    })
@@ -3,10 +3,69 @@ from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
 from django.contrib.auth.models import User
 from django.utils import timezone
-from datetime import timedelta
 from django.db import transaction
 from ..models import Equipo, Jugador, Liga, Oferta, EquipoReal, Notificacion
-from ..serializers import EquipoRealSerializer, EquipoSerializer, JugadorSerializer
+from .clasificacion_views import obtener_clasificacion
+from ..muestreo import muestrear_ids, semilla_diaria
+from ..subastas import liquidar_subastas
+from ..eventos import publicar_notificaciones
+from ..notificaciones import sumar_no_leidas
+from ..serializers import (
+    EquipoRealSerializer, EquipoSerializer, JugadorSerializer,
+    jugadores_con_puntuaciones, equipos_con_plantilla
+)
+
+TAMANO_LOTE_NOTIFICACIONES = 500
+
+# plantilla -> (categoría, título, mensaje); título y mensaje se rellenan con str.format
+PLANTILLAS_NOTIFICACION = {
+    'oferta_rechazada': ('oferta_rechazada', 'Oferta rechazada', 'Tu oferta por {jugador} ha sido rechazada'),
+    'jugador_retirado': (
+        'jugador_retirado',
+        'Jugador retirado del mercado',
+        'El jugador {jugador} ha sido retirado del mercado. Tu puja de {monto}€ ha sido cancelada.'
+    ),
+}
+
+def _guardar_y_publicar(notificaciones):
+    notificaciones = Notificacion.objects.bulk_create(notificaciones, batch_size=TAMANO_LOTE_NOTIFICACIONES)
+    sumar_no_leidas(notificaciones)
+    publicar_notificaciones(notificaciones)
+    return notificaciones
+
+def notificar_usuarios(destinatarios, plantilla, contexto=None, despues_del_commit=False):
+    """
+    Envía una notificación privada a cada destinatario con un único bulk_create.
+    Los destinatarios son usuarios, ids de usuario o pares (usuario, contexto propio)
+    que completan el contexto común. Con despues_del_commit=True el INSERT se hace
+    cuando se confirme la transacción actual y no la alarga.
+    """
+    categoria, titulo, mensaje = PLANTILLAS_NOTIFICACION[plantilla]
+    notificaciones = []
+    for destinatario in destinatarios:
+        usuario, propio = destinatario if isinstance(destinatario, tuple) else (destinatario, None)
+        valores = {**(contexto or {}), **(propio or {})}
+        notificaciones.append(Notificacion(
+            tipo='privada',
+            categoria=categoria,
+            titulo=titulo.format(**valores),
+            mensaje=mensaje.format(**valores),
+            destinatario_id=getattr(usuario, 'pk', usuario)
+        ))
+    if not notificaciones:
+        return []
+    if despues_del_commit:
+        # Si falla el envío no se rompe la respuesta de una operación ya confirmada
+        transaction.on_commit(lambda: _guardar_y_publicar(notificaciones), robust=True)
+        return notificaciones
+    return _guardar_y_publicar(notificaciones)
+
+def crear_y_publicar(**campos):
+    """Crea la notificación, la suma al contador de no leídas y la anuncia tras el commit"""
+    notificacion = Notificacion.objects.create(**campos)
+    sumar_no_leidas([notificacion])
+    publicar_notificaciones([notificacion])
+    return notificacion
 
 def crear_notificacion_distribucion_dinero(monto_total, jornada=None):
     """Crea una notificación pública de distribución de dinero"""
@@ -14,7 +73,7 @@ def crear_notificacion_distribucion_dinero(monto_total, jornada=None):
     if jornada:
         mensaje += f' {jornada.numero}'
     
-    return Notificacion.objects.create(
+    return crear_y_publicar(
         tipo='publica',
         categoria='distribucion_dinero',
         titulo='Distribución de dinero',
@@ -23,7 +82,7 @@ def crear_notificacion_distribucion_dinero(monto_total, jornada=None):
 
 def crear_notificacion_traspaso(jugador, equipo_origen, equipo_destino):
     """Crea una notificación pública de traspaso"""
-    return Notificacion.objects.create(
+    return crear_y_publicar(
         tipo='publica',
         categoria='traspaso',
         titulo=f'Traspaso: {jugador.nombre}',
@@ -32,17 +91,11 @@ def crear_notificacion_traspaso(jugador, equipo_origen, equipo_destino):
 
 def crear_notificacion_oferta_rechazada(jugador, ofertante):
     """Crea una notificación privada de oferta rechazada"""
-    return Notificacion.objects.create(
-        tipo='privada',
-        categoria='oferta_rechazada',
-        titulo='Oferta rechazada',
-        mensaje=f'Tu oferta por {jugador.nombre} ha sido rechazada',
-        destinatario=ofertante.usuario
-    )
+    return notificar_usuarios([ofertante.usuario_id], 'oferta_rechazada', {'jugador': jugador.nombre})[0]
 
 def crear_notificacion_publica(categoria, titulo, mensaje, objeto_relacionado=None):
     """Crea una notificación pública"""
-    notificacion = Notificacion.objects.create(
+    notificacion = crear_y_publicar(
         tipo='publica',
         categoria=categoria,
         titulo=titulo,
@@ -53,7 +106,7 @@ def crear_notificacion_publica(categoria, titulo, mensaje, objeto_relacionado=No
 
 def crear_notificacion_privada(destinatario, categoria, titulo, mensaje, objeto_relacionado=None):
     """Crea una notificación privada para un usuario específico"""
-    notificacion = Notificacion.objects.create(
+    notificacion = crear_y_publicar(
         tipo='privada',
         categoria=categoria,
         titulo=titulo,
@@ -65,7 +118,7 @@ def crear_notificacion_privada(destinatario, categoria, titulo, mensaje, objeto_
 
 def crear_notificacion_oferta_editada(jugador, ofertante, monto_anterior, monto_nuevo):
     """Crea una notificación privada de oferta editada"""
-    return Notificacion.objects.create(
+    return crear_y_publicar(
         tipo='privada',
         categoria='oferta_editada',
         titulo='Oferta editada',
@@ -75,7 +128,7 @@ def crear_notificacion_oferta_editada(jugador, ofertante, monto_anterior, monto_
 
 def crear_notificacion_oferta_retirada(jugador, ofertante, monto):
     """Crea una notificación privada de oferta retirada"""
-    return Notificacion.objects.create(
+    return crear_y_publicar(
         tipo='privada',
         categoria='oferta_retirada',
         titulo='Oferta retirada',
@@ -97,7 +150,7 @@ def datos_iniciales(request):
         if request.user.is_superuser or request.user.is_staff:
             print(f"🛠️ Cargando datos para ADMIN: {request.user.username}")
             
-            jugadores = Jugador.objects.all().select_related('equipo_real', 'equipo', 'equipo__usuario')
+            jugadores = jugadores_con_puntuaciones()
             jugadores_data = JugadorSerializer(jugadores, many=True).data
             
             equipos_reales = EquipoReal.objects.all()
@@ -127,7 +180,7 @@ def datos_iniciales(request):
         print(f"👤 Cargando datos para USUARIO NORMAL: {request.user.username}")
         
         # Buscar equipo del usuario
-        equipo = Equipo.objects.filter(usuario=request.user).first()
+        equipo = equipos_con_plantilla(Equipo.objects.filter(usuario=request.user)).first()
         
         if not equipo:
             print(f"❌ ERROR: No se encontró equipo para usuario {request.user.username}")
@@ -190,16 +243,19 @@ def datos_iniciales(request):
             except Exception as e:
                 print(f"⚠️ Error asignando jugadores: {e}")
         
-        jugadores_data = JugadorSerializer(jugadores, many=True).data
+        jugadores_data = JugadorSerializer(jugadores_con_puntuaciones(jugadores), many=True).data
         print(f"📊 Jugadores serializados: {len(jugadores_data)}")
         
         # 🎯 CARGAR MERCADO (jugadores sin equipo)
         mercado_data = []
         try:
-            mercado_jugadores = Jugador.objects.filter(
-                equipo__isnull=True
-            ).order_by('?')[:8]
-            mercado_data = JugadorSerializer(mercado_jugadores, many=True).data
+            mercado_ids = muestrear_ids(
+                Jugador.objects.filter(equipo__isnull=True),
+                8,
+                semilla=semilla_diaria('datos_iniciales_mercado')
+            )
+            mercado_jugadores = Jugador.objects.filter(id__in=mercado_ids)
+            mercado_data = JugadorSerializer(jugadores_con_puntuaciones(mercado_jugadores), many=True).data
             print(f"🛒 Jugadores en mercado: {len(mercado_data)}")
         except Exception as e:
             print(f"⚠️ Error cargando mercado: {e}")
@@ -208,29 +264,7 @@ def datos_iniciales(request):
         # 🎯 CARGAR CLASIFICACIÓN MEJORADA
         clasificacion_data = []
         try:
-            equipos_liga = Equipo.objects.filter(liga=equipo.liga)
-            print(f"🏅 Equipos en la liga: {equipos_liga.count()}")
-            
-            clasificacion = []
-            for eq in equipos_liga:
-                # Calcular puntos totales sumando puntos de todos los jugadores
-                puntos_totales = sum(j.puntos_totales for j in eq.jugadores.all())
-                clasificacion.append({
-                    'equipo_id': eq.id,
-                    'nombre': eq.nombre,  # 🎯 clave 'nombre' para coincidir con frontend
-                    'usuario': eq.usuario.username,
-                    'puntos_totales': puntos_totales,
-                    'presupuesto': eq.presupuesto
-                })
-            
-            # Ordenar por puntos (mayor a menor)
-            clasificacion.sort(key=lambda x: x['puntos_totales'], reverse=True)
-            
-            # Asignar posiciones
-            for idx, item in enumerate(clasificacion, 1):
-                item['posicion'] = idx
-            
-            clasificacion_data = clasificacion
+            clasificacion_data = obtener_clasificacion(equipo.liga)
             print(f"📈 Clasificación calculada: {len(clasificacion_data)} equipos")
             
         except Exception as e:
@@ -284,7 +318,7 @@ def datos_iniciales(request):
 def current_user(request):
     user = request.user
     try:
-        equipo = Equipo.objects.get(usuario=user)
+        equipo = equipos_con_plantilla().get(usuario=user)
         equipo_data = EquipoSerializer(equipo).data
     except Equipo.DoesNotExist:
         equipo_data = None
@@ -306,31 +340,10 @@ def finalizar_subastas(request):
     if not request.user.is_superuser:
         return Response({'error': 'Solo administradores pueden ejecutar esta acción'}, status=403)
     
-    ahora = timezone.now()
-    limite_expiracion = ahora - timedelta(hours=24)
-    
-    jugadores_expirados = Jugador.objects.filter(
-        fecha_mercado__lt=limite_expiracion,
-        en_venta=True
-    )
-    
-    resultados = []
-    for jugador in jugadores_expirados:
-        try:
-            with transaction.atomic():
-                resultado = jugador.finalizar_subasta()
-                if resultado:
-                    resultados.append({
-                        'jugador': jugador.nombre,
-                        'resultado': resultado
-                    })
-        except Exception as e:
-            resultados.append({
-                'jugador': jugador.nombre,
-                'error': str(e)
-            })
+    informe = liquidar_subastas()
     
     return Response({
-        'message': f'Subastas finalizadas: {len(resultados)} procesadas',
-        'resultados': resultados
+        'message': f"Subastas finalizadas: {informe['procesadas']} procesadas",
+        'resultados': informe['resultados'] + informe['errores'],
+        'informe': {clave: valor for clave, valor in informe.items() if clave not in ('resultados', 'errores')}
     })
\ No newline at end of file
@@ -0,0 +1,30 @@
+# Configuración de gunicorn (se carga automáticamente desde el directorio de trabajo)
+# Se arranca con workers de uvicorn (backend.asgi) para que /api/eventos/ pueda mantener el flujo SSE
+import logging
+import os
+import re
+from decouple import config
+
+# Un único worker: el broker de eventos (fantasy.eventos.BrokerLocal), la caché en memoria
+# y el planificador del mercado viven en el proceso. Con más workers los eventos publicados
+# en uno no llegarían a los clientes SSE conectados a otro. No se lee de WEB_CONCURRENCY a propósito.
+workers = 1
+
+class OcultarToken(logging.Filter):
+    """Quita el JWT de ?token= (lo usa EventSource) de las líneas del log de accesos"""
+    patron = re.compile(r'([?&]token=)[^&\s]*')
+
+    def filter(self, record):
+        if record.args:
+            record.args = tuple(self.patron.sub(r'\1***', arg) if isinstance(arg, str) else arg for arg in record.args)
+        return True
+
+def post_worker_init(worker):
+    logging.getLogger('uvicorn.access').addFilter(OcultarToken())
+
+    # El planificador del mercado corre en el worker, ya cargada la app: en el maestro
+    # se heredarían hilo y conexión al hacer fork y su caché no la leería ningún worker.
+    # Cada pasada toma un advisory lock, así que otro proceso con planificador no la duplica.
+    if config('MERCADO_PLANIFICADOR', default=True, cast=bool):
+        from fantasy.mantenimiento_mercado import iniciar_planificador
+        iniciar_planificador()
@@ -11,13 +11,16 @@ import {
 const MovimientosMercadoScreen = () => {
   const [notificaciones, setNotificaciones] = useState([]);
   const [cargando, setCargando] = useState(true);
+  const [siguiente, setSiguiente] = useState(null); // cursor de la página anterior (más antigua)
+  const [cargandoMas, setCargandoMas] = useState(false);
   const [filtro, setFiltro] = useState('todas'); // 'todas', 'no-leidas', 'publicas', 'privadas'
 
   const cargarNotificaciones = async () => {
     setCargando(true);
     try {
-      const datos = await obtenerNotificaciones();
-      setNotificaciones(datos.notificaciones);
+      const pagina = await obtenerNotificaciones();
+      setNotificaciones(pagina.notificaciones);
+      setSiguiente(pagina.hay_mas ? pagina.siguiente : null);
     } catch (error) {
       console.error('Error cargando movimientos:', error);
     } finally {
@@ -25,6 +28,20 @@ const MovimientosMercadoScreen = () => {
     }
   };
 
+  const cargarMas = async () => {
+    if (!siguiente) return;
+    setCargandoMas(true);
+    try {
+      const pagina = await obtenerNotificaciones({ before: siguiente });
+      setNotificaciones(anteriores => [...anteriores, ...pagina.notificaciones]);
+      setSiguiente(pagina.hay_mas ? pagina.siguiente : null);
+    } catch (error) {
+      console.error('Error cargando más movimientos:', error);
+    } finally {
+      setCargandoMas(false);
+    }
+  };
+
   const manejarMarcarTodasLeidas = async () => {
     try {
       await marcarTodasNotificacionesLeidas();
@@ -273,6 +290,19 @@ const MovimientosMercadoScreen = () => {
             </div>
           )}
         </div>
+
+        {/* Paginación por cursor: el feed llega por páginas */}
+        {!cargando && siguiente && (
+          <div className="mt-4 text-center">
+            <button
+              onClick={cargarMas}
+              disabled={cargandoMas}
+              className="bg-gray-200 text-gray-700 px-4 py-2 rounded-lg hover:bg-gray-300 transition-colors disabled:opacity-50"
+            >
+              {cargandoMas ? 'Cargando...' : 'Cargar más'}
+            </button>
+          </div>
+        )}
       </div>
     </div>
   );
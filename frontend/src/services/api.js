@@ -1209,9 +1209,16 @@ export const getNotificaciones = async () => {
   return await response.json();
 };
 
-export const obtenerNotificaciones = async () => {
+// Devuelve una página del feed: { notificaciones, hay_mas, siguiente, ultimo }.
+// Con `before: pagina.siguiente` se piden las anteriores y con `since: pagina.ultimo` las nuevas.
+export const obtenerNotificaciones = async ({ before, since, limite } = {}) => {
   const token = localStorage.getItem('access_token');
-  const response = await fetch(`${API_URL}/notificaciones/usuario/`, {
+  const parametros = new URLSearchParams();
+  if (before) parametros.append('before', before);
+  if (since) parametros.append('since', since);
+  if (limite) parametros.append('limite', limite);
+  const query = parametros.toString() ? `?${parametros.toString()}` : '';
+  const response = await fetch(`${API_URL}/notificaciones/usuario/${query}`, {
     headers: {
       'Content-Type': 'application/json',
       'Authorization': `Bearer ${token}`